@@ -0,0 +1,6 @@
+"""
+The Gemara <-> ampel converters and the helpers built on them.
+
+Installed as `gemara_ampel.tools`; see `tool_modules` for how the modules are
+imported from a checkout.
+"""
@@ -0,0 +1,5 @@
+"""
+ampel results -> Gemara Layer 4: the `ampel_to_gemara.py` converter (loaded
+with `tool_modules.load_ampel_to_gemara()`), the SQLite evaluation store, and
+the rollup and diff tools.
+"""
@@ -0,0 +1,1670 @@
+#!/usr/bin/env python3
+"""
+Convert ampel verify results to Gemara Layer 4 evaluation format.
+
+Usage:
+    python ampel-to-gemara.py <ampel-result.json> [output.yaml]
+    python ampel-to-gemara.py --jsonl <attestations.jsonl> [output.yaml]
+    python ampel-to-gemara.py --batch <directory|glob> [merged.yaml] [--output-dir DIR]
+    python ampel-to-gemara.py --expand-evidence <compact-l4.yaml> [output.yaml]
+    python ampel-to-gemara.py --follow <attestations.jsonl> <output.yaml> [--checkpoint FILE]
+"""
+
+# yaml, json, datetime and the modules only some inputs need are imported by
+# the functions that use them, so `--help` and argument errors start fast
+import argparse
+import contextlib
+import functools
+import itertools
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, TextIO, Tuple
+
+if __package__:
+    from ..tool_modules import default_cache_dir, import_module
+else:
+    # Run as a script from a checkout: tool_modules.py is in the parent directory
+    import runpy
+    _tool_modules = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tool_modules.py'))
+    default_cache_dir, import_module = _tool_modules['default_cache_dir'], _tool_modules['import_module']
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_dumper() -> type:
+    """Return libyaml's safe dumper when PyYAML was built with it, else the pure-Python one."""
+    import yaml
+    return getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def parse_timestamp(ts_str: str) -> str:
+    """Parse timestamp string to ISO format."""
+    return ts_str
+
+
+def calculate_duration_ms(start: str, end: str) -> int:
+    """Calculate duration in milliseconds between two timestamps."""
+    from datetime import datetime
+
+    try:
+        start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+        return int((end_dt - start_dt).total_seconds() * 1000)
+    except Exception:
+        return 0
+
+
+def map_subject(ampel_subject: Dict[str, Any]) -> Dict[str, Any]:
+    """Map ampel subject to Gemara subject format."""
+    if not ampel_subject:
+        return {
+            'name': 'unknown',
+            'type': 'artifact',
+            'identifiers': []
+        }
+
+    identifiers = []
+    for algo, value in ampel_subject.get('digest', {}).items():
+        identifiers.append({
+            'type': algo,
+            'value': value
+        })
+
+    return {
+        'name': ampel_subject.get('name', 'unknown'),
+        'type': 'artifact',
+        'identifiers': identifiers
+    }
+
+
+def map_finding(eval_result: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Map ampel eval_result to Gemara finding."""
+    finding = {
+        'id': eval_result.get('id', f'check-{index}'),
+        'status': eval_result.get('status', 'UNKNOWN'),
+        'timestamp': eval_result.get('date', '')
+    }
+
+    # Add description from assessment or error
+    if eval_result.get('status') == 'PASS':
+        assessment = eval_result.get('assessment', {})
+        finding['description'] = assessment.get('message', '')
+    else:
+        error = eval_result.get('error', {})
+        finding['description'] = error.get('message', '')
+        if error.get('guidance'):
+            finding['error'] = {
+                'message': error.get('message', ''),
+                'remediation': error.get('guidance', '')
+            }
+
+    # Add outputs if present
+    if eval_result.get('output'):
+        finding['outputs'] = eval_result.get('output')
+
+    # Add evidence from statements
+    statements = eval_result.get('statements', [])
+    if statements:
+        finding['evidence'] = []
+        for stmt in statements:
+            finding['evidence'].append({
+                'type': stmt.get('type', 'attestation'),
+                'digest': stmt.get('digest', '')
+            })
+
+    return finding
+
+
+def map_controls(meta: Dict[str, Any], status: str) -> List[Dict[str, Any]]:
+    """Map ampel controls to Gemara controls."""
+    controls = []
+    for control in meta.get('controls', []):
+        controls.append({
+            'id': control.get('id', ''),
+            'framework': control.get('class', 'custom'),
+            'status': status
+        })
+    return controls
+
+
+def map_result_to_evaluation(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a single ampel Result to Gemara Layer 4 evaluation."""
+    policy = result.get('policy', {})
+    meta = result.get('meta', {})
+
+    # Calculate duration
+    duration_ms = calculate_duration_ms(
+        result.get('date_start', ''),
+        result.get('date_end', '')
+    )
+
+    # Determine overall assessment
+    status = result.get('status', 'UNKNOWN')
+    summary = meta.get('description', '')
+    if status == 'PASS':
+        summary = summary or 'All policy tenets validated successfully'
+    elif status == 'FAIL':
+        # Try to get failure summary from first failed check
+        for eval_result in result.get('eval_results', []):
+            if eval_result.get('status') != 'PASS':
+                error = eval_result.get('error', {})
+                summary = error.get('message', summary)
+                break
+
+    evaluation = {
+        'evaluation': {
+            'id': f"ampel-eval-{result.get('date_end', '').replace(':', '').replace('.', '').replace('Z', '')}",
+            'timestamp': result.get('date_end', ''),
+            'duration_ms': duration_ms,
+            'evaluator': 'ampel',
+            'evaluator_version': '1.0'
+        },
+        'subject': map_subject(result.get('subject', {})),
+        'assessment': {
+            'status': status,
+            'summary': summary
+        },
+        'policy': {
+            'id': policy.get('id', ''),
+            'version': policy.get('version', ''),
+            'description': meta.get('description', '')
+        }
+    }
+
+    # Add controls if present
+    controls = map_controls(meta, status)
+    if controls:
+        evaluation['controls'] = controls
+
+    # Map findings
+    findings = []
+    for idx, eval_result in enumerate(result.get('eval_results', [])):
+        findings.append(map_finding(eval_result, idx))
+
+    if findings:
+        evaluation['findings'] = findings
+
+    # Add context if present
+    if result.get('context'):
+        evaluation['context'] = {
+            'runtime': meta.get('runtime', ''),
+            'assert_mode': meta.get('assert_mode', ''),
+            'values': result.get('context')
+        }
+
+    return evaluation
+
+
+def results_source(ampel_data: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    """Return the path to the ampel Results in an attestation, ResultSet or Result.
+
+    A path ending in 'results' names a list of Results, any other path (the
+    empty one included) a single Result. Returns None if there are none.
+    """
+    # Check if this is an in-toto statement
+    if ampel_data.get('_type') == 'https://in-toto.io/Statement/v1':
+        predicate = ampel_data.get('predicate', {})
+
+        # Handle ResultSet
+        if 'results' in predicate:
+            return ('predicate', 'results')
+
+        # Handle single Result wrapped in ResultSet
+        elif 'policy' in predicate:
+            return ('predicate',)
+
+    # Direct Result or ResultSet (not in attestation wrapper)
+    elif 'status' in ampel_data and 'policy' in ampel_data:
+        return ()
+    elif 'results' in ampel_data:
+        return ('results',)
+
+    # Handle raw predicate format (predicateType at top level)
+    elif 'predicateType' in ampel_data and 'predicate' in ampel_data:
+        predicate = ampel_data.get('predicate', {})
+        if 'results' in predicate:
+            return ('predicate', 'results')
+        elif 'policy' in predicate:
+            return ('predicate',)
+
+    return None
+
+
+def iter_ampel_results(ampel_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield the ampel Results contained in an attestation, ResultSet or Result."""
+    source = results_source(ampel_data)
+    if source is None:
+        return
+    value = ampel_data
+    for key in source:
+        value = value[key]
+    if source[-1:] == ('results',):
+        yield from value
+    else:
+        yield value
+
+
+def iter_evaluations(ampel_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Lazily map each ampel Result in `ampel_data` to a Gemara evaluation."""
+    for result in iter_ampel_results(ampel_data):
+        yield map_result_to_evaluation(result)
+
+
+def convert_ampel_to_gemara(ampel_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert ampel attestation format to Gemara Layer 4 format."""
+    return list(iter_evaluations(ampel_data))
+
+
+class IncrementalJSONReader:
+    """Pull-based JSON reader that decodes one value at a time from a text source.
+
+    Only the value being decoded is buffered, so the members of an object or
+    the elements of an array can be walked without materialising the
+    enclosing document.
+    """
+
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    # Longest token a decode error can point into while still being cut off by
+    # the end of the buffer (a surrogate pair escape such as \ud83d\ude00)
+    _TRUNCATION_MARGIN = 16
+
+    def __init__(self, read: Callable[[int], str], chunk_size: int = 1 << 16):
+        self._read = read
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.offset = 0
+        self.eof = False
+        import json
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        data = self._read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _error(self, message: str, pos: Optional[int] = None) -> ValueError:
+        return ValueError(f"{message} at offset {self.offset + (self.pos if pos is None else pos)}")
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            self.pos = self._WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise self._error(f"Expected {char!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        import json
+
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # Reading more only helps when the failure may be input cut off by the buffer end
+                truncated = (e.pos + self._TRUNCATION_MARGIN >= len(self.buf)
+                             or e.msg.startswith('Unterminated string'))
+                if not truncated or not self._fill(size):
+                    raise self._error(e.msg, e.pos) from None
+            else:
+                # A number running into the end of the buffer may be truncated
+                if end < len(self.buf) or not self._fill(size):
+                    self.pos = end
+                    return value
+            size = max(size, len(self.buf) - self.pos)
+
+    def members(self) -> Iterator[str]:
+        """Yield the keys of the next object; the caller must consume each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self._error("Expected an object key")
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                self.pos -= 1
+                raise self._error("Expected ',' or '}'")
+
+    def items(self) -> Iterator[Any]:
+        """Yield the decoded elements of the next array."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                self.pos -= 1
+                raise self._error("Expected ',' or ']'")
+
+
+# Placeholder for a results array whose elements were yielded as they were decoded
+_STREAMED = ()
+
+
+def iter_ampel_results_incremental(reader: IncrementalJSONReader) -> Iterator[Dict[str, Any]]:
+    """Yield ampel Results from a document without loading it whole.
+
+    The Results are picked with `results_source`, like `iter_ampel_results`.
+    A `results` or `predicate.results` array is streamed when the members
+    read before it already select it; otherwise it is collected with the
+    other members and the choice is made at the end of the document. If a
+    member after a streamed array selects different Results, ValueError is
+    raised.
+    """
+    ampel_data = {}
+    streamed = None
+
+    def read_results(container: Dict[str, Any], path: Tuple[str, ...]) -> Iterator[Dict[str, Any]]:
+        nonlocal streamed
+        container['results'] = _STREAMED
+        if streamed is None and results_source(ampel_data) == path:
+            streamed = path
+            yield from reader.items()
+        else:
+            container['results'] = reader.value()
+
+    for key in reader.members():
+        if key == 'results' and reader.peek() == '[':
+            yield from read_results(ampel_data, ('results',))
+        elif key == 'predicate' and reader.peek() == '{':
+            predicate = ampel_data['predicate'] = {}
+            for predicate_key in reader.members():
+                if predicate_key == 'results' and reader.peek() == '[':
+                    yield from read_results(predicate, ('predicate', 'results'))
+                else:
+                    predicate[predicate_key] = reader.value()
+        else:
+            ampel_data[key] = reader.value()
+
+    if reader.peek() != '':
+        raise reader._error("Extra data after JSON document")
+
+    if streamed is None:
+        yield from iter_ampel_results(ampel_data)
+    elif results_source(ampel_data) != streamed:
+        raise ValueError(f"Ambiguous ampel document: converted {'.'.join(streamed)}, "
+                         f"but its later members select other Results")
+
+
+@contextlib.contextmanager
+def open_json_reader(input_file: str) -> Iterator[IncrementalJSONReader]:
+    """Open an input for incremental parsing, memory-mapping regular files."""
+    if input_file == '-':
+        yield IncrementalJSONReader(sys.stdin.read)
+        return
+
+    import codecs
+    import mmap
+
+    with open(input_file, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and non-regular files cannot be mapped
+            decoder = codecs.getincrementaldecoder('utf-8')()
+
+            def read_stream(size: int) -> str:
+                data = f.read(size)
+                # A multibyte sequence cut off by the end of input is an error, not dropped
+                return decoder.decode(data, final=not data)
+
+            yield IncrementalJSONReader(read_stream)
+            return
+
+        with mapped:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+
+            position = 0
+
+            def read(size: int) -> str:
+                nonlocal position
+                start, position = position, min(position + size, len(mapped))
+                return decoder.decode(mapped[start:position], final=position == len(mapped))
+
+            yield IncrementalJSONReader(read)
+
+
+def iter_file_results(input_file: str) -> Iterator[Dict[str, Any]]:
+    """Lazily yield the ampel Results of a single document, parsing it incrementally."""
+    with open_json_reader(input_file) as reader:
+        yield from iter_ampel_results_incremental(reader)
+
+
+def iter_file_evaluations(input_file: str) -> Iterator[Dict[str, Any]]:
+    """Lazily convert a single ampel result document, parsing it incrementally."""
+    for result in iter_file_results(input_file):
+        yield map_result_to_evaluation(result)
+
+
+def render_evaluation(evaluation: Dict[str, Any]) -> str:
+    """Serialise one evaluation as an item of the Layer 4 `evaluations` sequence."""
+    import yaml
+
+    # A top-level block sequence has the same layout as the
+    # `evaluations` sequence nested under the header mapping.
+    return yaml.dump([evaluation], Dumper=yaml_dumper(), default_flow_style=False,
+                     sort_keys=False, allow_unicode=True)
+
+
+class ConversionCache:
+    """Content-addressed cache of rendered evaluations, keyed by Result digest.
+
+    Mapping a Result is cheap compared to serialising the evaluation, so the
+    cache stores the YAML fragment written for each Result. Entries live in a
+    SQLite database and are evicted least-recently-used first once the cache
+    grows past `max_bytes`.
+
+    The database is shared by parallel runs and batch workers, so writes are
+    buffered and committed in short transactions of `COMMIT_EVERY` entries,
+    and a lock held by another process is only waited for `BUSY_TIMEOUT`
+    seconds. The cache is an optimisation only: any SQLite error disables it
+    for the rest of the run and the Result is converted as a miss.
+    """
+
+    # Bump when the mapping or the rendered layout changes
+    VERSION = 1
+    COMMIT_EVERY = 100
+    BUSY_TIMEOUT = 2.0
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        import sqlite3
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.error = None
+        self._used = []
+        self._pending = []
+        self._salt = f'{self.VERSION}:{yaml_dumper().__name__}:'.encode()
+        self._errors = (sqlite3.Error, OSError)
+        self._db = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.directory / 'cache.sqlite3'), timeout=self.BUSY_TIMEOUT)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, fragment TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+            self._db.commit()
+        except self._errors as e:
+            self._disable(e)
+
+    def _disable(self, error: Exception):
+        """Stop using the cache after an error; the conversion itself carries on."""
+        if self.error is None:
+            self.error = error
+            print(f"Warning: conversion cache disabled: {error}", file=sys.stderr)
+        if self._db is not None:
+            try:
+                self._db.close()
+            except self._errors:
+                pass
+        self._db = None
+        self._used = []
+        self._pending = []
+
+    def key(self, result: Dict[str, Any]) -> str:
+        import hashlib
+        import json
+
+        canonical = json.dumps(result, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(self._salt + canonical.encode()).hexdigest()
+
+    def lookup(self, result: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """Return the key of `result` and its cached fragment (None on a miss or with the cache disabled)."""
+        if self._db is None:
+            return None, None
+        key = self.key(result)
+        try:
+            row = self._db.execute('SELECT fragment FROM entries WHERE key = ?', (key,)).fetchone()
+        except self._errors as e:
+            self._disable(e)
+            row = None
+        return key, row[0] if row is not None else None
+
+    def render(self, result: Dict[str, Any]) -> str:
+        """Return the rendered evaluation for `result`, converting it on a miss."""
+        key, fragment = self.lookup(result)
+        if fragment is not None:
+            self.hits += 1
+            self._used.append(key)
+            return fragment
+
+        self.misses += 1
+        fragment = render_evaluation(map_result_to_evaluation(result))
+        if self._db is not None:
+            self._pending.append((key, fragment, len(fragment), time.time()))
+            if len(self._pending) + len(self._used) >= self.COMMIT_EVERY:
+                self.flush()
+        return fragment
+
+    def flush(self):
+        """Write buffered entries and hits in one short transaction."""
+        if self._db is None or not (self._pending or self._used):
+            return
+        now = time.time()
+        try:
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO entries (key, fragment, size, used) VALUES (?, ?, ?, ?)', self._pending
+                )
+                self._db.executemany('UPDATE entries SET used = ? WHERE key = ?', ((now, key) for key in self._used))
+        except self._errors as e:
+            self._disable(e)
+            return
+        self._pending = []
+        self._used = []
+
+    def close(self):
+        """Write buffered entries, evict least-recently-used entries and close."""
+        self.flush()
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+                if total > self.max_bytes:
+                    evict = []
+                    for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY used'):
+                        if total <= self.max_bytes:
+                            break
+                        evict.append((key,))
+                        total -= size
+                    self._db.executemany('DELETE FROM entries WHERE key = ?', evict)
+            self._db.close()
+        except self._errors as e:
+            self._disable(e)
+        self._db = None
+
+
+def load_evaluation_store():
+    """Import evaluation_store.py, the optional SQLite evaluation sink."""
+    return import_module('ampel2gemara.evaluation_store')
+
+
+def load_layer4_model():
+    """Import layer4_model.py, the compact form in which batch workers return evaluations.
+
+    It is imported the same way as this module, so the main process can
+    unpickle the classes the workers send.
+    """
+    if __package__:
+        from . import layer4_model
+    else:
+        import layer4_model
+    return layer4_model
+
+
+def open_evaluation_store(path: str):
+    return load_evaluation_store().EvaluationStore(path)
+
+
+def load_schema_validation():
+    """Import tools/schema_validation.py, which is shared with gemara_to_ampel.py."""
+    return import_module('schema_validation')
+
+
+def validate_results(
+    results: Iterable[Dict[str, Any]],
+    validate: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield `results` unchanged, raising SchemaError (a ValueError) at the first invalid one."""
+    schemas = load_schema_validation()
+    return schemas.validate_each(results, validate or schemas.validate_ampel_result)
+
+
+def render_result(result: Dict[str, Any], cache: Optional[ConversionCache] = None) -> str:
+    """Map and serialise one ampel Result, going through the cache when given."""
+    if cache is None:
+        return render_evaluation(map_result_to_evaluation(result))
+    return cache.render(result)
+
+
+def _rename_key(mapping: Dict[str, Any], old: str, new: str, value: Any) -> Dict[str, Any]:
+    """Copy `mapping` with `old` replaced by `new` (set to `value`), keeping the key order."""
+    return {(new if key == old else key): (value if key == old else item) for key, item in mapping.items()}
+
+
+class EvidenceTable:
+    """Per-document table of distinct evidence entries.
+
+    Findings of one policy usually cite the same statements, so each
+    distinct `{type, digest}` is stored once in the document's top-level
+    `evidence` list and findings carry `evidence_refs`, indices into it.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._index = {}
+
+    def intern(self, entry: Dict[str, Any]) -> int:
+        import json
+
+        key = json.dumps(entry, sort_keys=True)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.entries)
+            self.entries.append(entry)
+        return index
+
+    def compact(self, evaluation: Dict[str, Any]) -> Dict[str, Any]:
+        """Return `evaluation` with each finding's `evidence` replaced by `evidence_refs`."""
+        findings = evaluation.get('findings')
+        if not findings:
+            return evaluation
+        compacted = []
+        for finding in findings:
+            if 'evidence' in finding:
+                refs = [self.intern(entry) for entry in finding['evidence']]
+                finding = _rename_key(finding, 'evidence', 'evidence_refs', refs)
+            compacted.append(finding)
+        return dict(evaluation, findings=compacted)
+
+
+def expand_evidence(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve `evidence_refs` against the document's evidence table, in place.
+
+    The result has the shape written without --evidence-table: each finding
+    gets its own `evidence` list in the same position and the table is
+    removed. Documents without a table are returned unchanged.
+    """
+    table = document.pop('evidence', None)
+    if table is None:
+        return document
+    for evaluation in document.get('evaluations') or []:
+        findings = evaluation.get('findings') or []
+        for index, finding in enumerate(findings):
+            if 'evidence_refs' in finding:
+                evidence = [dict(table[ref]) for ref in finding['evidence_refs']]
+                findings[index] = _rename_key(finding, 'evidence_refs', 'evidence', evidence)
+    return document
+
+
+class Layer4Writer:
+    """Write a Gemara Layer 4 document one evaluation at a time.
+
+    The header is written with the first evaluation and every evaluation is
+    serialised as soon as it is passed in, so only one evaluation is held in
+    memory. The output matches a single `yaml.dump` of the whole document.
+
+    With `evidence_table`, evaluations passed to `write()` reference evidence
+    through an `EvidenceTable` that is written after the evaluations on
+    `close()`; pre-rendered fragments cannot be combined with it.
+    """
+
+    HEADER = {
+        'gemara_version': '1.0',
+        'layer': 4,
+        'type': 'evaluation'
+    }
+
+    def __init__(self, stream: TextIO, evidence_table: bool = False, resume: bool = False):
+        self.stream = stream
+        self.count = 0
+        self.evidence = EvidenceTable() if evidence_table else None
+        # Appending to a document whose header is already written
+        self.resume = resume
+
+    def _dump(self, data: Any) -> str:
+        import yaml
+
+        return yaml.dump(data, Dumper=yaml_dumper(), default_flow_style=False,
+                         sort_keys=False, allow_unicode=True)
+
+    def write(self, evaluation: Dict[str, Any]):
+        if self.evidence is not None:
+            evaluation = self.evidence.compact(evaluation)
+        self._append(render_evaluation(evaluation))
+
+    def write_fragment(self, fragment: str, count: int = 1):
+        """Append already rendered evaluations (see `render_evaluation`)."""
+        if self.evidence is not None:
+            raise ValueError("rendered fragments cannot be written with an evidence table")
+        self._append(fragment, count)
+
+    def _append(self, fragment: str, count: int = 1):
+        if self.count == 0 and not self.resume:
+            self.stream.write(self._dump(self.HEADER))
+            self.stream.write('evaluations:\n')
+        self.stream.write(fragment)
+        self.count += count
+
+    def close(self):
+        if self.count == 0 and not self.resume:
+            self.stream.write(self._dump(dict(self.HEADER, evaluations=[])))
+        elif self.evidence is not None and self.evidence.entries:
+            self.stream.write(self._dump({'evidence': self.evidence.entries}))
+        self.stream.flush()
+
+
+def write_layer4(evaluations: Iterable[Dict[str, Any]], stream: TextIO) -> int:
+    """Stream evaluations into a Layer 4 document, returning how many were written."""
+    writer = Layer4Writer(stream)
+    for evaluation in evaluations:
+        writer.write(evaluation)
+    writer.close()
+    return writer.count
+
+
+def unwrap_statement(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the in-toto statement carried by a JSONL record.
+
+    `bnd pack` writes one sigstore bundle per line with the statement
+    base64-encoded in a DSSE envelope. Bare DSSE envelopes and plain
+    statements are accepted as well.
+    """
+    envelope = record.get('dsseEnvelope', record)
+    if 'payload' in envelope and 'payloadType' in envelope:
+        import base64
+        import json
+
+        return json.loads(base64.b64decode(envelope['payload']))
+    return record
+
+
+def iter_jsonl_results(
+    lines: Iterable[str],
+    on_error: Optional[Callable[[int, str], None]] = None,
+    validate: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield the ampel Results in JSONL attestations one line at a time.
+
+    Only the current line is held in memory. Lines that cannot be decoded,
+    and Results rejected by `validate`, are reported through
+    `on_error(line_number, message)` and skipped; statements that are not
+    ampel results yield nothing.
+    """
+    import json
+
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+            statement = unwrap_statement(record)
+            results = list(iter_ampel_results(statement))
+        except Exception as e:
+            if on_error:
+                on_error(line_no, str(e))
+            continue
+        for result in results:
+            if not isinstance(result, dict):
+                if on_error:
+                    on_error(line_no, f"expected a Result object, got {type(result).__name__}")
+                continue
+            if validate is not None:
+                try:
+                    validate(result)
+                except ValueError as e:
+                    if on_error:
+                        on_error(line_no, str(e))
+                    continue
+            yield result
+
+
+def iter_jsonl_evaluations(
+    lines: Iterable[str],
+    on_error: Optional[Callable[[int, str], None]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Convert JSONL attestations to Gemara evaluations one line at a time."""
+    for result in iter_jsonl_results(lines, on_error):
+        yield map_result_to_evaluation(result)
+
+
+class FollowCheckpoint:
+    """Where `follow_jsonl` stopped: the input's identity and offset, and the output's identity and size.
+
+    Saved atomically after each batch of converted lines. The output size
+    lets a restart drop evaluations written after the last checkpoint, so a
+    crash between writing the output and the checkpoint cannot duplicate them;
+    the output's path, device and inode make sure only the output the
+    checkpoint was written for is ever cut back.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.device = None
+        self.inode = None
+        self.offset = 0
+        self.output = None
+        self.output_device = None
+        self.output_inode = None
+        self.output_size = 0
+        self.lines = 0
+
+    def owns(self, output_file: str) -> bool:
+        """Whether this checkpoint was written for the file now at `output_file`."""
+        try:
+            status = os.stat(output_file)
+        except FileNotFoundError:
+            return False
+        return (self.output, self.output_device, self.output_inode) == (
+            os.path.abspath(output_file), status.st_dev, status.st_ino
+        )
+
+    def reset(self):
+        """Forget all progress, to convert the input from the start into a new output."""
+        self.device = self.inode = None
+        self.output = self.output_device = self.output_inode = None
+        self.offset = self.output_size = self.lines = 0
+
+    @classmethod
+    def load(cls, path: str) -> 'FollowCheckpoint':
+        import json
+
+        checkpoint = cls(path)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return checkpoint
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"unsupported checkpoint version in {path}: {data.get('version')!r}")
+        checkpoint.device = data.get('device')
+        checkpoint.inode = data.get('inode')
+        checkpoint.offset = data.get('offset', 0)
+        checkpoint.output = data.get('output')
+        checkpoint.output_device = data.get('output_device')
+        checkpoint.output_inode = data.get('output_inode')
+        checkpoint.output_size = data.get('output_size', 0)
+        checkpoint.lines = data.get('lines', 0)
+        return checkpoint
+
+    def save(self):
+        import json
+
+        temporary = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        with open(temporary, 'w') as f:
+            json.dump({
+                'version': self.VERSION,
+                'device': self.device,
+                'inode': self.inode,
+                'offset': self.offset,
+                'output': self.output,
+                'output_device': self.output_device,
+                'output_inode': self.output_inode,
+                'output_size': self.output_size,
+                'lines': self.lines
+            }, f)
+        os.replace(temporary, self.path)
+
+
+def follow_jsonl(
+    input_file: str,
+    output_file: str,
+    checkpoint: FollowCheckpoint,
+    poll_interval: float = 1.0,
+    max_idle: Optional[float] = None,
+    batch_lines: int = 1000,
+    on_error: Optional[Callable[[int, str], None]] = None,
+    validate: Optional[Callable[[Dict[str, Any]], None]] = None,
+    overwrite: bool = False
+) -> int:
+    """Tail a growing JSONL file, appending the evaluations of new lines to a Layer 4 document.
+
+    Only complete lines are converted; the checkpoint (and the flushed
+    output) advance after every `batch_lines` lines and whenever the input
+    is drained, so a record waits at most `poll_interval` plus one batch.
+    Rotation is detected by the input's inode changing (the rest of the old
+    file is read first, then the new one from the start) and truncation by
+    its size dropping below the offset. Errors are reported through
+    `on_error(byte_offset, message)`. Returns after `max_idle` seconds
+    without new data (never when None), with the number of lines converted.
+
+    An existing output is only continued with its own checkpoint; any other
+    existing file is refused unless `overwrite`, which starts over. On
+    return the document is closed like any other Layer 4 output (an empty
+    run writes an empty `evaluations` list); the closing text lies past the
+    checkpointed size and is cut again when the next run resumes.
+    """
+    output = Path(output_file)
+    if overwrite:
+        checkpoint.reset()
+    elif output.exists() and not checkpoint.owns(output_file):
+        raise ValueError(f"{output_file} exists and has no checkpoint for it; pass --overwrite to replace it")
+    elif checkpoint.output_size and not output.exists():
+        raise ValueError(f"{output_file} is missing; pass --overwrite to convert the input again from the start")
+
+    if output.exists() and output.stat().st_size < checkpoint.output_size:
+        raise ValueError(f"{output_file} is shorter than its checkpoint records; pass --overwrite to start over")
+    out = open(output, 'a')
+    # Drop evaluations (or the closing text) written after the last checkpoint; they are written again
+    out.truncate(checkpoint.output_size)
+    out.seek(0, os.SEEK_END)
+    status = os.fstat(out.fileno())
+    checkpoint.output = os.path.abspath(output_file)
+    checkpoint.output_device, checkpoint.output_inode = status.st_dev, status.st_ino
+    writer = Layer4Writer(out, resume=checkpoint.output_size > 0)
+    committed = 0
+
+    def open_input():
+        f = open(input_file, 'rb')
+        status = os.fstat(f.fileno())
+        return f, status.st_dev, status.st_ino
+
+    f, device, inode = open_input()
+    if (device, inode) == (checkpoint.device, checkpoint.inode) and os.fstat(f.fileno()).st_size >= checkpoint.offset:
+        f.seek(checkpoint.offset)
+    else:
+        checkpoint.offset = 0
+    checkpoint.device, checkpoint.inode = device, inode
+    checkpoint.save()
+
+    def commit():
+        nonlocal committed
+        out.flush()
+        checkpoint.output_size = out.tell()
+        committed = writer.count
+        checkpoint.save()
+
+    converted = 0
+    idle_since = time.monotonic()
+    try:
+        while True:
+            pending = 0
+            while pending < batch_lines:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    # Nothing new, or a line still being written: retry it on the next poll
+                    f.seek(checkpoint.offset)
+                    break
+                offset = checkpoint.offset
+                checkpoint.offset += len(line)
+                checkpoint.lines += 1
+                pending += 1
+                results = iter_jsonl_results(
+                    [line.decode('utf-8', errors='replace')],
+                    on_error=(lambda _, message: on_error(offset, message)) if on_error else None,
+                    validate=validate
+                )
+                for result in results:
+                    writer.write(map_result_to_evaluation(result))
+            if pending:
+                converted += pending
+                commit()
+                idle_since = time.monotonic()
+                if pending == batch_lines:
+                    continue
+
+            try:
+                status = os.stat(input_file)
+            except FileNotFoundError:
+                status = None
+            if status is not None and (status.st_dev, status.st_ino) != (device, inode):
+                # Rotated: the old file is drained above, continue with the new one
+                f.close()
+                f, device, inode = open_input()
+                checkpoint.device, checkpoint.inode, checkpoint.offset = device, inode, 0
+                commit()
+                continue
+            if status is not None and status.st_size < checkpoint.offset:
+                # Truncated in place
+                f.seek(0)
+                checkpoint.offset = 0
+                commit()
+                continue
+
+            if max_idle is not None and time.monotonic() - idle_since >= max_idle:
+                break
+            time.sleep(poll_interval)
+    finally:
+        # Progress since the last commit (e.g. an interrupted batch) is dropped, not recorded
+        out.truncate(checkpoint.output_size)
+        out.seek(0, os.SEEK_END)
+        writer.count = committed
+        writer.close()
+        f.close()
+        out.close()
+    return converted
+
+
+def run_follow(args: argparse.Namespace) -> int:
+    """Run --follow from the CLI, returning the exit status."""
+    if args.input == '-' or not args.output:
+        print("Error: --follow needs an input file and an output file", file=sys.stderr)
+        return 1
+    if args.evidence_table:
+        print("Error: --follow cannot be combined with --evidence-table", file=sys.stderr)
+        return 1
+
+    def report(offset: int, message: str):
+        print(f"Error: {args.input}@{offset}: {message}", file=sys.stderr)
+
+    try:
+        checkpoint = FollowCheckpoint.load(args.checkpoint or f"{args.output}.checkpoint")
+        converted = follow_jsonl(
+            args.input, args.output, checkpoint, poll_interval=args.poll_interval, max_idle=args.max_idle,
+            on_error=report, validate=None if args.no_validate else load_schema_validation().validate_ampel_result,
+            overwrite=args.overwrite
+        )
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Converted {converted} new line(s) from {args.input}; checkpoint at byte {checkpoint.offset}",
+          file=sys.stderr)
+    return 0
+
+
+def _open_input(input_file: str) -> TextIO:
+    if input_file == '-':
+        return sys.stdin
+    return open(input_file, 'r')
+
+
+def find_batch_inputs(pattern: str) -> Tuple[Path, List[Path]]:
+    """Resolve a batch input directory or glob to a sorted list of result files.
+
+    Returns the base directory the files are relative to, which is used to
+    mirror the input layout under the output directory.
+    """
+    path = Path(pattern)
+    if path.is_dir():
+        files = [p for p in path.rglob('*') if p.suffix in ('.json', '.jsonl') and p.is_file()]
+        base = path
+    else:
+        import glob
+        files = [Path(p) for p in glob.glob(pattern, recursive=True) if Path(p).is_file()]
+        base = Path(os.path.commonpath([str(p.parent) for p in files])) if files else Path('.')
+    return base, sorted(files)
+
+
+def _convert_batch_file(
+    path: Path,
+    base: Path,
+    output_dir: Optional[Path],
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 0,
+    map_evaluations: bool = False,
+    validate: bool = True,
+    evidence_table: bool = False
+) -> Tuple[str, int, Any, Optional[str], Optional[List[Any]], float]:
+    """Convert one batch input inside a worker process.
+
+    With an output directory the evaluations are written there by the worker
+    and only the count travels back; otherwise the rendered evaluations are
+    returned for merging, so serialisation also happens in parallel. With an
+    evidence table the merged document's indices are only known in the
+    parent, so the mapped evaluations are returned instead. With
+    `map_evaluations` the mapped evaluations are also returned, for the parent
+    to insert into the SQLite store. Mapped evaluations are held and returned
+    as the compact `layer4_model.Evaluation`. The last element is the seconds
+    the worker spent on the file.
+    """
+    start = time.perf_counter()
+    line_errors = []
+    # Evaluations of one file share their subjects and evidence entries
+    compact = functools.partial(load_layer4_model().Evaluation.from_dict, shared={})
+    cache = ConversionCache(cache_dir, cache_max_bytes) if cache_dir else None
+    evaluations = [] if map_evaluations else None
+    fragments = []
+    try:
+        if path.suffix == '.jsonl':
+            f = open(path, 'r')
+            results = iter_jsonl_results(
+                f, on_error=lambda line_no, message: line_errors.append(f"line {line_no}: {message}"),
+                validate=load_schema_validation().validate_ampel_result if validate else None
+            )
+        else:
+            results = iter_file_results(str(path))
+            f = contextlib.closing(results)
+            if validate:
+                results = validate_results(results)
+        with f:
+            for result in results:
+                if evaluations is not None or evidence_table:
+                    evaluation = compact(map_result_to_evaluation(result))
+                if evaluations is not None:
+                    evaluations.append(evaluation)
+                fragments.append(evaluation if evidence_table else render_result(result, cache))
+    except (OSError, ValueError) as e:
+        return str(path), 0, None, str(e), None, time.perf_counter() - start
+    finally:
+        if cache is not None:
+            cache.close()
+
+    error = f"skipped {len(line_errors)} invalid line(s), first at {line_errors[0]}" if line_errors else None
+
+    if output_dir is None:
+        rendered = fragments if evidence_table else ''.join(fragments)
+        return str(path), len(fragments), rendered, error, evaluations, time.perf_counter() - start
+
+    if fragments:
+        target = (output_dir / path.relative_to(base)).with_suffix('.yaml')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, 'w') as out:
+            writer = Layer4Writer(out, evidence_table)
+            if evidence_table:
+                for evaluation in fragments:
+                    writer.write(evaluation.to_dict())
+            else:
+                writer.write_fragment(''.join(fragments), len(fragments))
+            writer.close()
+    return str(path), len(fragments), None, error, evaluations, time.perf_counter() - start
+
+
+def convert_batch(
+    files: List[Path],
+    base: Path,
+    output_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 0,
+    map_evaluations: bool = False,
+    validate: bool = True,
+    evidence_table: bool = False
+) -> Iterator[Tuple[str, int, Any, Optional[str], Optional[List[Any]], float]]:
+    """Convert result files on a process pool, yielding outcomes in input order."""
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(files) // (workers * 4))
+
+    convert = functools.partial(
+        _convert_batch_file, base=base, output_dir=output_dir,
+        cache_dir=cache_dir, cache_max_bytes=cache_max_bytes, map_evaluations=map_evaluations, validate=validate,
+        evidence_table=evidence_table
+    )
+    if workers == 1:
+        yield from map(convert, files)
+        return
+
+    # Only batch runs need a process pool, so the import is kept off the startup path
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(convert, files, chunksize=chunksize)
+
+
+def run_batch(args: argparse.Namespace, stats: Optional['Stats'] = None) -> int:
+    """Run a batch conversion from the CLI, returning the number of failed files.
+
+    With `stats`, the time each worker spent per file is recorded as the
+    `convert` stage and the parent's merging and SQLite inserts as `write`
+    and `sqlite`.
+    """
+    base, files = find_batch_inputs(args.input)
+    if not files:
+        print(f"Error: No result files found in: {args.input}")
+        return 1
+
+    output_dir = Path(args.output_dir) if args.output_dir else None
+    start = time.perf_counter()
+    results = 0
+    failed = 0
+    merged = None
+    store = None
+
+    try:
+        # Workers only map evaluations; the parent is the single writer of the store
+        store = open_evaluation_store(args.sqlite) if args.sqlite else None
+    except load_evaluation_store().Error as e:
+        print(f"Error: {args.sqlite}: {e}", file=sys.stderr)
+        return 1
+
+    if output_dir is None:
+        out = open(args.output, 'w') if args.output else sys.stdout
+        merged = Layer4Writer(out, args.evidence_table)
+
+    try:
+        for path, count, rendered, error, evaluations, seconds in convert_batch(
+            files, base, output_dir, workers=args.workers, chunksize=args.chunksize,
+            cache_dir=None if args.no_cache or args.evidence_table else args.cache_dir,
+            cache_max_bytes=args.cache_size * 1024 * 1024, map_evaluations=store is not None,
+            validate=not args.no_validate, evidence_table=args.evidence_table
+        ):
+            if error:
+                failed += 1
+                print(f"Error: {path}: {error}", file=sys.stderr)
+            results += count
+            if stats is not None:
+                stats.add_time('convert', seconds)
+                stats.count('files')
+                stats.count('results', count)
+                if error:
+                    stats.count('failed_files')
+            if evaluations and store is not None:
+                stage_start = time.perf_counter()
+                try:
+                    for evaluation in evaluations:
+                        store.add(evaluation.to_dict())
+                except load_evaluation_store().Error as e:
+                    print(f"Error: {args.sqlite}: {e}", file=sys.stderr)
+                    store.db.close()
+                    store = None
+                    failed += 1
+                if stats is not None:
+                    stats.add_time('sqlite', time.perf_counter() - stage_start, len(evaluations))
+            if count and merged is not None:
+                stage_start = time.perf_counter()
+                if args.evidence_table:
+                    for evaluation in rendered:
+                        merged.write(evaluation.to_dict())
+                else:
+                    merged.write_fragment(rendered, count)
+                if stats is not None:
+                    stats.add_time('write', time.perf_counter() - stage_start)
+    finally:
+        if merged is not None:
+            merged.close()
+            if args.output:
+                merged.stream.close()
+        if store is not None:
+            try:
+                store.close()
+            except load_evaluation_store().Error as e:
+                print(f"Error: {args.sqlite}: {e}", file=sys.stderr)
+                failed += 1
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Converted {len(files)} file(s), {results} result(s) in {elapsed:.2f}s "
+        f"({len(files) / elapsed:.1f} files/s, {results / elapsed:.1f} results/s)",
+        file=sys.stderr
+    )
+    if failed:
+        print(f"Warning: {failed} file(s) had errors", file=sys.stderr)
+    return failed
+
+
+class Stats:
+    """Stage timers and counters collected for --stats.
+
+    Only created when requested: `instrument()` swaps the hot-path functions
+    for timed wrappers, so a run without --stats executes the plain code.
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1):
+        timer = self.timers.setdefault(stage, [0.0, 0])
+        timer[0] += seconds
+        timer[1] += calls
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timed(self, stage: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add_time(stage, time.perf_counter() - start)
+        return wrapper
+
+    def timed_iter(self, stage: str, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start, 0)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'stages': {
+                stage: {'seconds': round(seconds, 6), 'calls': calls}
+                for stage, (seconds, calls) in self.timers.items()
+            },
+            'counters': dict(self.counters)
+        }
+
+    def report(self, stream: TextIO = sys.stderr):
+        print("Conversion statistics:", file=stream)
+        for stage, (seconds, calls) in self.timers.items():
+            print(f"  {stage:18} {seconds * 1000:10.1f} ms  {calls:8} call(s)", file=stream)
+        for name, value in self.counters.items():
+            print(f"  {name:18} {value:10}", file=stream)
+
+
+class _CountingStream:
+    """Text stream proxy that times writes and counts the bytes written."""
+
+    def __init__(self, stream: TextIO, stats: Stats):
+        self._stream = stream
+        self._stats = stats
+
+    def write(self, text: str) -> int:
+        start = time.perf_counter()
+        written = self._stream.write(text)
+        self._stats.add_time('write', time.perf_counter() - start)
+        self._stats.count('bytes_written', len(text.encode()))
+        return written
+
+    def flush(self):
+        self._stream.flush()
+
+
+@contextlib.contextmanager
+def instrument(stats: Stats) -> Iterator[Stats]:
+    """Route the conversion hot path through timed wrappers while the block runs.
+
+    Nested stages are inclusive: `map` contains `timestamps`. The original
+    functions are put back on exit, so instrumenting twice does not stack
+    wrappers.
+    """
+    module = globals()
+    originals = {}
+    for stage, name in (('map', 'map_result_to_evaluation'),
+                        ('timestamps', 'calculate_duration_ms'),
+                        ('render', 'render_evaluation')):
+        originals[name] = module[name]
+        module[name] = stats.timed(stage, originals[name])
+    try:
+        yield stats
+    finally:
+        module.update(originals)
+
+
+def _count_result(stats: Stats, result: Dict[str, Any]):
+    eval_results = result.get('eval_results') or []
+    stats.count('results')
+    stats.count('findings', len(eval_results))
+    stats.count('evidence', sum(len(e.get('statements') or []) for e in eval_results))
+
+
+@contextlib.contextmanager
+def profiling(args: argparse.Namespace, stats: Optional[Stats]):
+    """Apply the --profile and --tracemalloc hooks around a conversion."""
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to: {args.profile}", file=sys.stderr)
+        if args.tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if stats is not None:
+                stats.count('peak_traced_bytes', peak)
+            else:
+                print(f"Peak traced memory: {peak} bytes", file=sys.stderr)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert ampel verify results to Gemara Layer 4 evaluation format."
+    )
+    parser.add_argument('input', help="ampel result JSON file, or JSONL attestations ('-' for stdin)")
+    parser.add_argument('output', nargs='?', help="output YAML file (default: stdout)")
+    parser.add_argument('--jsonl', action='store_true',
+                        help="read one attestation per line (implied by a .jsonl input)")
+    batch = parser.add_argument_group('batch mode')
+    batch.add_argument('--batch', action='store_true',
+                       help="treat input as a directory or glob of result files and convert them in parallel")
+    batch.add_argument('--output-dir',
+                       help="write one YAML file per input, mirroring the input tree "
+                            "(default: merge into a single document)")
+    batch.add_argument('--workers', type=int, help="number of worker processes (default: CPU count)")
+    batch.add_argument('--chunksize', type=int, help="files handed to a worker at a time")
+    cache = parser.add_argument_group('conversion cache')
+    cache.add_argument('--no-cache', action='store_true', help="convert every result, bypassing the cache")
+    cache.add_argument('--cache-dir', default=default_cache_dir('ampel-to-gemara'),
+                       help="cache location (default: %(default)s)")
+    cache.add_argument('--cache-size', type=int, default=256,
+                       help="maximum cache size in MB before LRU eviction (default: %(default)s)")
+    follow = parser.add_argument_group('follow mode')
+    follow.add_argument('--follow', action='store_true',
+                        help="tail a growing JSONL input and append the evaluations of new lines to the output")
+    follow.add_argument('--checkpoint', help="checkpoint file (default: <output>.checkpoint)")
+    follow.add_argument('--overwrite', action='store_true',
+                        help="replace an existing output that has no checkpoint, converting the input from the start")
+    follow.add_argument('--poll-interval', type=float, default=1.0,
+                        help="seconds between checks for new data (default: %(default)s)")
+    follow.add_argument('--max-idle', type=float,
+                        help="stop after this many seconds without new data (default: run until interrupted)")
+    evidence = parser.add_argument_group('evidence table')
+    evidence.add_argument('--evidence-table', action='store_true',
+                          help="store each distinct evidence entry once in a top-level `evidence` list "
+                               "and reference it from findings by index (`evidence_refs`)")
+    evidence.add_argument('--expand-evidence', action='store_true',
+                          help="treat input as a Layer 4 document with an evidence table and write it "
+                               "back in the expanded form")
+    parser.add_argument('--no-validate', action='store_true',
+                        help="skip checking each ampel Result against the schema before converting it")
+    parser.add_argument('--sqlite', metavar='DB',
+                        help="also insert evaluations into a SQLite evaluation store; "
+                             "YAML is then only written when an output file is given")
+    instrumentation = parser.add_argument_group('instrumentation')
+    instrumentation.add_argument('--stats', action='store_true',
+                                 help="print per-stage timings and counters to stderr")
+    instrumentation.add_argument('--stats-json', metavar='FILE',
+                                 help="write the statistics as JSON (implies collecting them)")
+    instrumentation.add_argument('--profile', metavar='FILE', help="write cProfile data for the run")
+    instrumentation.add_argument('--tracemalloc', action='store_true', help="record peak traced memory")
+    args = parser.parse_args(argv)
+    mode = next((flag for flag, enabled in (('--follow', args.follow),
+                                            ('--expand-evidence', args.expand_evidence)) if enabled), None)
+    if mode and (args.stats or args.stats_json or args.profile or args.tracemalloc):
+        parser.error(f"--stats, --stats-json, --profile and --tracemalloc cannot be combined with {mode}")
+    # The work happens in worker processes, which the parent cannot profile
+    if args.batch and (args.profile or args.tracemalloc):
+        parser.error("--profile and --tracemalloc cannot be combined with --batch")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    if not (sys.argv[1:] if argv is None else argv):
+        print(__doc__)
+        sys.exit(1)
+
+    args = parse_args(argv)
+    if args.follow:
+        sys.exit(run_follow(args))
+    if args.expand_evidence:
+        expand_file(args.input, args.output)
+        return
+
+    stats = Stats() if args.stats or args.stats_json else None
+    failed = 0
+    if args.batch:
+        failed = run_batch(args, stats)
+    else:
+        with instrument(stats) if stats is not None else contextlib.nullcontext(), profiling(args, stats):
+            failed = convert_file(args, stats)
+
+    if stats is not None:
+        if args.stats:
+            stats.report()
+        if args.stats_json:
+            import json
+            with open(args.stats_json, 'w') as f:
+                json.dump(stats.as_dict(), f, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+def expand_file(input_file: str, output_file: Optional[str] = None):
+    """Write a Layer 4 document with its evidence table expanded (see `expand_evidence`)."""
+    import yaml
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    try:
+        with _open_input(input_file) as f:
+            document = expand_evidence(yaml.load(f, Loader=loader) or {})
+    except (OSError, yaml.YAMLError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    with (open(output_file, 'w') if output_file else contextlib.nullcontext(sys.stdout)) as out:
+        write_layer4(document.get('evaluations') or [], out)
+    if output_file:
+        print(f"Expanded Gemara Layer 4 evaluation written to: {output_file}")
+
+
+def convert_file(args: argparse.Namespace, stats: Optional[Stats] = None) -> int:
+    """Convert a single JSON document or JSONL stream as requested on the CLI.
+
+    Returns the number of invalid JSONL lines that were skipped; as in batch
+    mode, the valid ones are still converted but the run exits 1.
+    """
+    input_file = args.input
+    output_file = args.output
+    jsonl = args.jsonl or input_file.endswith('.jsonl')
+
+    errors = []
+
+    def report_line_error(line_no: int, message: str):
+        errors.append(line_no)
+        print(f"Error: {input_file}:{line_no}: {message}", file=sys.stderr)
+
+    def warn_skipped_lines():
+        if errors:
+            print(f"Warning: Skipped {len(errors)} invalid line(s) in {input_file}", file=sys.stderr)
+
+    validate = None
+    if not args.no_validate:
+        validate = load_schema_validation().validate_ampel_result
+        if stats is not None:
+            validate = stats.timed('validate', validate)
+
+    # Read ampel result
+    try:
+        with contextlib.ExitStack() as stack:
+            if jsonl:
+                f = stack.enter_context(_open_input(input_file))
+                results = iter_jsonl_results(f, on_error=report_line_error, validate=validate)
+            else:
+                results = stack.enter_context(contextlib.closing(iter_file_results(input_file)))
+
+            if stats is not None:
+                if input_file != '-':
+                    stats.count('bytes_read', os.path.getsize(input_file))
+                results = stats.timed_iter('parse', results)
+
+            # JSONL lines are validated as they are read; a document stops at its first invalid Result
+            if not jsonl and validate is not None:
+                results = validate_results(results, validate)
+
+            cache = None
+            if not args.no_cache and not args.evidence_table:
+                cache = ConversionCache(args.cache_dir, args.cache_size * 1024 * 1024)
+                stack.callback(cache.close)
+                if stats is not None:
+                    # Hashing the Result and the SELECT; rendering on a miss is timed as `render`
+                    cache.lookup = stats.timed('cache', cache.lookup)
+
+            # Only create the output once there is something to write
+            first = next(results, None)
+            if first is None:
+                warn_skipped_lines()
+                print("Warning: No evaluations found in input")
+                sys.exit(1)
+
+            store = None
+            if args.sqlite:
+                store = open_evaluation_store(args.sqlite)
+                stack.callback(store.close)
+                if stats is not None:
+                    store.add = stats.timed('sqlite', store.add)
+
+            # Convert to Gemara format and output YAML
+            out = None
+            if output_file:
+                out = stack.enter_context(open(output_file, 'w'))
+            elif store is None:
+                out = sys.stdout
+            writer = None
+            if out is not None:
+                writer = Layer4Writer(_CountingStream(out, stats) if stats is not None else out,
+                                      evidence_table=args.evidence_table)
+
+            for result in itertools.chain([first], results):
+                if stats is not None:
+                    _count_result(stats, result)
+                evaluation = None
+                if store is not None or args.evidence_table:
+                    evaluation = map_result_to_evaluation(result)
+                if store is not None:
+                    store.add(evaluation)
+                if writer is None:
+                    continue
+                if args.evidence_table:
+                    # Evidence indices depend on the document, so rendered fragments are not cached
+                    writer.write(evaluation)
+                else:
+                    writer.write_fragment(render_result(result, cache))
+            if writer is not None:
+                writer.close()
+            if stats is not None and cache is not None:
+                stats.count('cache_hits', cache.hits)
+                stats.count('cache_misses', cache.misses)
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename}")
+        sys.exit(1)
+    except ValueError as e:
+        kind = 'ampel result' if isinstance(e, load_schema_validation().SchemaError) else 'JSON'
+        print(f"Error: Invalid {kind} in {input_file}: {e}")
+        sys.exit(1)
+    except load_evaluation_store().Error as e:
+        print(f"Error: {args.sqlite}: {e}")
+        sys.exit(1)
+
+    warn_skipped_lines()
+
+    if output_file:
+        print(f"Gemara Layer 4 evaluation written to: {output_file}")
+    if args.sqlite:
+        print(f"Evaluations stored in: {args.sqlite}")
+    return len(errors)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+SQLite store for Gemara Layer 4 evaluations.
+
+Evaluations, their subject identifiers, controls and findings are kept in
+indexed tables so questions like "which subjects failed control QA-07 this
+month" are answered with an index lookup instead of re-parsing YAML. An
+evaluation is identified by its id, subject and policy, so loading the same
+evaluation again replaces it instead of adding a duplicate.
+
+Usage:
+    python evaluation_store.py <db> load <gemara-l4.yaml>...
+    python evaluation_store.py <db> query [--subject DIGEST] [--policy ID] [--control ID]
+                                          [--framework NAME] [--status STATUS]
+                                          [--since DATE] [--until DATE] [--findings] [--json]
+    python evaluation_store.py <db> stats
+"""
+
+import argparse
+import itertools
+import json
+import sqlite3
+import sys
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+import yaml
+
+# Raised for any database failure, so callers need not import sqlite3
+Error = sqlite3.Error
+
+# Bump when SCHEMA changes in a way existing databases cannot follow
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    evaluation_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    evaluator TEXT NOT NULL,
+    subject_name TEXT NOT NULL,
+    subject_type TEXT NOT NULL,
+    subject_key TEXT NOT NULL,
+    policy_id TEXT NOT NULL,
+    policy_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    UNIQUE (evaluation_id, subject_key, policy_id)
+);
+CREATE TABLE IF NOT EXISTS subject_identifiers (
+    evaluation INTEGER NOT NULL REFERENCES evaluations (id),
+    type TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS controls (
+    evaluation INTEGER NOT NULL REFERENCES evaluations (id),
+    control_id TEXT NOT NULL,
+    framework TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    evaluation INTEGER NOT NULL REFERENCES evaluations (id),
+    finding_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evaluations_policy ON evaluations (policy_id, status, timestamp);
+CREATE INDEX IF NOT EXISTS evaluations_status ON evaluations (status, timestamp);
+CREATE INDEX IF NOT EXISTS subject_identifiers_value ON subject_identifiers (value, evaluation);
+CREATE INDEX IF NOT EXISTS subject_identifiers_evaluation ON subject_identifiers (evaluation);
+CREATE INDEX IF NOT EXISTS controls_control ON controls (control_id, framework, status);
+CREATE INDEX IF NOT EXISTS controls_evaluation ON controls (evaluation);
+CREATE INDEX IF NOT EXISTS findings_evaluation ON findings (evaluation, status);
+CREATE INDEX IF NOT EXISTS findings_status ON findings (status, finding_id);
+"""
+
+
+def _subject_key(subject: Dict[str, Any]) -> str:
+    """Identify a subject by its name, type and identifiers."""
+    identifiers = [[i.get('type', ''), i.get('value', '')] for i in subject.get('identifiers', [])]
+    return json.dumps([subject.get('name', ''), subject.get('type', ''), identifiers], separators=(',', ':'))
+
+
+class EvaluationStore:
+    """Bulk writer and query interface for a SQLite evaluation database.
+
+    Inserts are buffered and committed every `batch_size` evaluations, so
+    loading large volumes costs one transaction per batch. Several processes
+    may write to the same database; SQLite serialises their transactions.
+    Adding an evaluation whose id, subject and policy are already stored
+    replaces the stored one along with its identifiers, controls and findings.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = 0
+        self.count = 0
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            tables = self.db.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'evaluations'").fetchone()[0]
+            if tables:
+                self.db.close()
+                raise Error(f"{path} was created by another version of evaluation_store.py; "
+                            f"load the evaluations into a new database")
+        self.db.executescript(SCHEMA)
+        self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def add(self, evaluation: Dict[str, Any]):
+        """Queue one Layer 4 evaluation (as produced by `map_result_to_evaluation`)."""
+        meta = evaluation.get('evaluation', {})
+        subject = evaluation.get('subject', {})
+        assessment = evaluation.get('assessment', {})
+        policy = evaluation.get('policy', {})
+
+        key = (meta.get('id', ''), _subject_key(subject), policy.get('id', ''))
+        self.db.execute(
+            'INSERT INTO evaluations (evaluation_id, timestamp, duration_ms, evaluator, subject_name, '
+            'subject_type, subject_key, policy_id, policy_version, status, summary) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (evaluation_id, subject_key, policy_id) DO UPDATE SET '
+            'timestamp = excluded.timestamp, duration_ms = excluded.duration_ms, evaluator = excluded.evaluator, '
+            'policy_version = excluded.policy_version, status = excluded.status, summary = excluded.summary',
+            (
+                key[0],
+                meta.get('timestamp', ''),
+                meta.get('duration_ms', 0),
+                meta.get('evaluator', ''),
+                subject.get('name', ''),
+                subject.get('type', ''),
+                key[1],
+                key[2],
+                policy.get('version', ''),
+                assessment.get('status', ''),
+                assessment.get('summary', '')
+            )
+        )
+        # lastrowid is not set when the upsert updates, so look the row up by its key
+        row = self.db.execute(
+            'SELECT id FROM evaluations WHERE evaluation_id = ? AND subject_key = ? AND policy_id = ?', key
+        ).fetchone()[0]
+        # A replaced evaluation drops its old identifiers, controls and findings
+        for table in ('subject_identifiers', 'controls', 'findings'):
+            self.db.execute(f'DELETE FROM {table} WHERE evaluation = ?', (row,))
+
+        self.db.executemany(
+            'INSERT INTO subject_identifiers (evaluation, type, value) VALUES (?, ?, ?)',
+            [(row, i.get('type', ''), i.get('value', '')) for i in subject.get('identifiers', [])]
+        )
+        self.db.executemany(
+            'INSERT INTO controls (evaluation, control_id, framework, status) VALUES (?, ?, ?, ?)',
+            [(row, c.get('id', ''), c.get('framework', ''), c.get('status', ''))
+             for c in evaluation.get('controls', [])]
+        )
+        self.db.executemany(
+            'INSERT INTO findings (evaluation, finding_id, status, timestamp, description) VALUES (?, ?, ?, ?, ?)',
+            [(row, f.get('id', ''), f.get('status', ''), f.get('timestamp', ''), f.get('description', ''))
+             for f in evaluation.get('findings', [])]
+        )
+
+        self.count += 1
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def add_all(self, evaluations: Iterable[Dict[str, Any]]) -> int:
+        for evaluation in evaluations:
+            self.add(evaluation)
+        self.flush()
+        return self.count
+
+    def flush(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def query(
+        self,
+        subject: Optional[str] = None,
+        policy: Optional[str] = None,
+        control: Optional[str] = None,
+        framework: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield evaluations matching every given filter, newest first.
+
+        `since`/`until` compare against the ISO timestamp, so a date such as
+        `2025-12-01` selects everything from that day on.
+        """
+        clauses = []
+        params = []
+        if subject:
+            clauses.append('e.id IN (SELECT evaluation FROM subject_identifiers WHERE value = ?)')
+            params.append(subject)
+        if control or framework:
+            sub = 'SELECT evaluation FROM controls WHERE 1'
+            if control:
+                sub += ' AND control_id = ?'
+                params.append(control)
+            if framework:
+                sub += ' AND framework = ?'
+                params.append(framework)
+            clauses.append(f'e.id IN ({sub})')
+        if policy:
+            clauses.append('e.policy_id = ?')
+            params.append(policy)
+        if status:
+            clauses.append('e.status = ?')
+            params.append(status)
+        if since:
+            clauses.append('e.timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('e.timestamp < ?')
+            params.append(until)
+
+        # Identifiers are joined in, one row each, so a query is a single statement
+        sql = (
+            'SELECT e.id, e.evaluation_id, e.timestamp, e.subject_name, e.policy_id, e.policy_version, '
+            'e.status, e.summary, s.type, s.value FROM evaluations e '
+            'LEFT JOIN subject_identifiers s ON s.evaluation = e.id'
+        )
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY e.timestamp DESC, e.id, s.rowid'
+
+        rows = self.db.execute(sql, params).fetchall()
+        for _, group in itertools.groupby(rows, key=lambda r: r[0]):
+            group = list(group)
+            row = group[0]
+            yield {
+                'row': row[0],
+                'id': row[1],
+                'timestamp': row[2],
+                'subject': {
+                    'name': row[3],
+                    'identifiers': [{'type': r[8], 'value': r[9]} for r in group if r[8] is not None]
+                },
+                'policy': {'id': row[4], 'version': row[5]},
+                'status': row[6],
+                'summary': row[7]
+            }
+
+    def findings(self, row: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = 'SELECT finding_id, status, timestamp, description FROM findings WHERE evaluation = ?'
+        params = [row]
+        if status:
+            sql += ' AND status = ?'
+            params.append(status)
+        return [
+            {'id': f[0], 'status': f[1], 'timestamp': f[2], 'description': f[3]}
+            for f in self.db.execute(sql, params)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Evaluation counts by policy and status."""
+        by_policy = {}
+        for policy_id, status, count in self.db.execute(
+            'SELECT policy_id, status, COUNT(*) FROM evaluations GROUP BY policy_id, status ORDER BY policy_id'
+        ):
+            by_policy.setdefault(policy_id, {})[status] = count
+        return {
+            'evaluations': self.db.execute('SELECT COUNT(*) FROM evaluations').fetchone()[0],
+            'findings': self.db.execute('SELECT COUNT(*) FROM findings').fetchone()[0],
+            'policies': by_policy
+        }
+
+
+def load_layer4_files(store: EvaluationStore, paths: List[str]) -> int:
+    """Load evaluations from Gemara Layer 4 YAML files into the store."""
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    for path in paths:
+        with open(path, 'r') as f:
+            document = yaml.load(f, Loader=loader) or {}
+        store.add_all(document.get('evaluations') or [])
+    return store.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a SQLite store of Gemara Layer 4 evaluations.")
+    parser.add_argument('db', help="SQLite database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('load', help="load Gemara Layer 4 YAML files")
+    load.add_argument('files', nargs='+')
+
+    query = commands.add_parser('query', help="list evaluations matching the filters")
+    query.add_argument('--subject', help="subject digest value")
+    query.add_argument('--policy', help="policy id")
+    query.add_argument('--control', help="control id")
+    query.add_argument('--framework', help="control framework")
+    query.add_argument('--status', help="evaluation status (PASS, FAIL, ...)")
+    query.add_argument('--since', help="earliest timestamp or date (inclusive)")
+    query.add_argument('--until', help="latest timestamp or date (exclusive)")
+    query.add_argument('--findings', action='store_true', help="include findings with the same status")
+    query.add_argument('--json', action='store_true', help="print JSON lines")
+
+    commands.add_parser('stats', help="evaluation counts by policy and status")
+
+    args = parser.parse_args()
+    try:
+        store = EvaluationStore(args.db)
+    except Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if args.command == 'load':
+            count = load_layer4_files(store, args.files)
+            print(f"Loaded {count} evaluation(s) into {args.db}")
+
+        elif args.command == 'query':
+            for evaluation in store.query(
+                subject=args.subject, policy=args.policy, control=args.control,
+                framework=args.framework, status=args.status, since=args.since, until=args.until
+            ):
+                if args.findings:
+                    evaluation['findings'] = store.findings(evaluation['row'], args.status)
+                if args.json:
+                    print(json.dumps(evaluation))
+                    continue
+                digests = ','.join(f"{i['type']}:{i['value']}" for i in evaluation['subject']['identifiers'])
+                print(f"{evaluation['timestamp']}\t{evaluation['status']}\t{evaluation['policy']['id']}\t"
+                      f"{digests or evaluation['subject']['name']}")
+                for finding in evaluation.get('findings', []):
+                    print(f"\t{finding['status']}\t{finding['id']}\t{finding['description']}")
+
+        elif args.command == 'stats':
+            print(json.dumps(store.stats(), indent=2))
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Diff two sets of Gemara Layer 4 evaluations finding by finding.
+
+Every finding is keyed by (subject digest, policy id, finding id). The
+smaller side is loaded into a dict of key -> status; the larger side is
+streamed one evaluation at a time and looked up in it, so the run is linear
+in the number of findings and memory holds one side's keys only. Changes are
+written as they are found:
+
+    REGRESSION  PASS on the base side, not PASS on the head side
+    FIXED       not PASS on the base side, PASS on the head side
+    CHANGED     any other status change (e.g. FAIL -> ERROR)
+    ADDED       only on the head side
+    REMOVED     only on the base side
+
+If a key occurs more than once on a side, its first occurrence is compared
+and the repeats are counted as duplicates, whichever side is indexed.
+Evaluations without findings are compared by their assessment status.
+
+Either side can be Layer 4 YAML, ampel result JSON, JSONL attestations or a
+directory of them (see rollup.py).
+
+Usage:
+    python layer4_diff.py <base> <head> [--jsonl] [--summary-only] [--allow-added-failures]
+
+Exits 1 on regressions and on added findings that do not pass (unless
+--allow-added-failures), and 2 when an input cannot be read.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Any, Callable, Iterator, Tuple
+
+import yaml
+
+if __package__:
+    from .rollup import find_inputs, iter_input_evaluations, load_ampel_to_gemara
+else:
+    from rollup import find_inputs, iter_input_evaluations, load_ampel_to_gemara
+
+Key = Tuple[str, str, str]
+
+CHANGE_KINDS = ('REGRESSION', 'FIXED', 'CHANGED', 'ADDED', 'REMOVED')
+
+
+def subject_digest(subject: Dict[str, Any]) -> str:
+    """Identify a mapped subject by its sha256 identifier, else its first identifier or name."""
+    identifiers = subject.get('identifiers') or []
+    for identifier in identifiers:
+        if identifier.get('type') == 'sha256':
+            return f"sha256:{identifier.get('value', '')}"
+    if identifiers:
+        return f"{identifiers[0].get('type', '')}:{identifiers[0].get('value', '')}"
+    return subject.get('name', '')
+
+
+def iter_finding_statuses(evaluations) -> Iterator[Tuple[Key, str]]:
+    """Yield ((subject digest, policy id, finding id), status) for each finding."""
+    intern = sys.intern
+    for evaluation in evaluations:
+        digest = intern(subject_digest(evaluation.get('subject') or {}))
+        policy_id = intern(str((evaluation.get('policy') or {}).get('id', '')))
+        findings = evaluation.get('findings') or []
+        if not findings:
+            status = (evaluation.get('assessment') or {}).get('status', 'UNKNOWN')
+            yield (digest, policy_id, ''), intern(status)
+        for finding in findings:
+            yield (digest, policy_id, intern(str(finding.get('id', '')))), intern(finding.get('status', 'UNKNOWN'))
+
+
+def classify(base_status: str, head_status: str) -> str:
+    if base_status == head_status:
+        return ''
+    if base_status == 'PASS':
+        return 'REGRESSION'
+    if head_status == 'PASS':
+        return 'FIXED'
+    return 'CHANGED'
+
+
+def diff_findings(
+    base: Iterator[Tuple[Key, str]],
+    head: Iterator[Tuple[Key, str]],
+    report: Callable[[str, Key, str, str], None],
+    index_head: bool = False
+) -> Dict[str, int]:
+    """Compare two streams of (key, status), calling `report(kind, key, base, head)` per change.
+
+    One side is indexed in full and the other streamed against it: base is
+    indexed unless `index_head`. The indexed side's keys are held, plus the
+    keys found only on the streamed side. Only the first occurrence of a key
+    on each side is compared, so the result does not depend on which side is
+    indexed. Returns the count of each kind of change plus the number of
+    findings and of duplicate keys on each side.
+    """
+    indexed, streamed = (head, base) if index_head else (base, head)
+    index = {}
+    indexed_count = 0
+    for key, status in indexed:
+        indexed_count += 1
+        index.setdefault(key, status)
+    indexed_duplicates = indexed_count - len(index)
+
+    counts = dict.fromkeys(CHANGE_KINDS, 0)
+    streamed_count = 0
+    streamed_duplicates = 0
+    unmatched = set()
+    for key, status in streamed:
+        streamed_count += 1
+        if key not in index:
+            if key in unmatched:
+                streamed_duplicates += 1
+                continue
+            unmatched.add(key)
+            kind = 'REMOVED' if index_head else 'ADDED'
+            base_status, head_status = (status, '') if index_head else ('', status)
+        else:
+            other = index[key]
+            if other is None:
+                streamed_duplicates += 1
+                continue
+            # None marks indexed keys already matched; later repeats are duplicates
+            index[key] = None
+            base_status, head_status = (status, other) if index_head else (other, status)
+            kind = classify(base_status, head_status)
+        if kind:
+            counts[kind] += 1
+            report(kind, key, base_status, head_status)
+
+    for key, status in index.items():
+        if status is None:
+            continue
+        kind = 'ADDED' if index_head else 'REMOVED'
+        counts[kind] += 1
+        report(kind, key, '' if index_head else status, status if index_head else '')
+
+    counts['base_findings'], counts['head_findings'] = (
+        (streamed_count, indexed_count) if index_head else (indexed_count, streamed_count)
+    )
+    counts['base_duplicates'], counts['head_duplicates'] = (
+        (streamed_duplicates, indexed_duplicates) if index_head else (indexed_duplicates, streamed_duplicates)
+    )
+    return counts
+
+
+def iter_side(paths: List[str], ampel_to_gemara, on_error: Callable[[str], None]) -> Iterator[Tuple[Key, str]]:
+    for path in find_inputs(paths):
+        yield from iter_finding_statuses(iter_input_evaluations(path, ampel_to_gemara, on_error))
+
+
+def input_size(paths: List[str]) -> int:
+    return sum(os.path.getsize(path) for path in find_inputs(paths) if path != '-')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two sets of Gemara Layer 4 evaluations finding by finding.")
+    parser.add_argument('base', help="Layer 4 YAML, ampel results or a directory before the change")
+    parser.add_argument('head', help="Layer 4 YAML, ampel results or a directory after the change")
+    parser.add_argument('--jsonl', action='store_true', help="write changes as JSON lines")
+    parser.add_argument('--summary-only', action='store_true', help="only print the counts")
+    parser.add_argument('--allow-added-failures', action='store_true',
+                        help="do not fail on added findings that do not pass")
+    args = parser.parse_args()
+
+    ampel_to_gemara = load_ampel_to_gemara()
+    errors = []
+    added_failures = 0
+
+    def on_error(message: str):
+        errors.append(message)
+        print(f"Error: {message}", file=sys.stderr)
+
+    def report(kind: str, key: Key, base_status: str, head_status: str):
+        nonlocal added_failures
+        if kind == 'ADDED' and head_status != 'PASS':
+            added_failures += 1
+        if args.summary_only:
+            return
+        subject, policy_id, finding_id = key
+        if args.jsonl:
+            print(json.dumps({'change': kind, 'subject': subject, 'policy': policy_id, 'finding': finding_id,
+                              'base': base_status or None, 'head': head_status or None}))
+        else:
+            print(f"{kind:<10}  {subject}  {policy_id}#{finding_id}  {base_status or '-'} -> {head_status or '-'}")
+
+    try:
+        # Index whichever side is smaller on disk and stream the other
+        index_head = input_size([args.head]) < input_size([args.base])
+        counts = diff_findings(iter_side([args.base], ampel_to_gemara, on_error),
+                               iter_side([args.head], ampel_to_gemara, on_error),
+                               report, index_head)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    print(f"Compared {counts['base_findings']} base and {counts['head_findings']} head finding(s): "
+          + ', '.join(f"{counts[kind]} {kind.lower()}" for kind in CHANGE_KINDS), file=sys.stderr)
+    if counts['base_duplicates'] or counts['head_duplicates']:
+        print(f"Ignored {counts['base_duplicates']} base and {counts['head_duplicates']} head duplicate "
+              f"finding key(s)", file=sys.stderr)
+    if errors:
+        sys.exit(2)
+    if counts['REGRESSION'] or (added_failures and not args.allow_added_failures):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
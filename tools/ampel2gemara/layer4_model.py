@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory model for Gemara Layer 4 evaluations.
+
+The converter produces nested plain dicts, which is what gets serialised but
+is expensive to hold in memory in bulk. The classes here use __slots__,
+intern the small vocabulary of statuses and types, and share identical
+subjects and evidence entries between the evaluations of one load. They are
+only expanded back to the Layer 4 shape when `to_dict()` is called, just
+before an evaluation is written, and the expansion is exact.
+
+Batch workers return their mapped evaluations to the main process in this
+form, and `Rollup.add()` reads it directly.
+
+Usage:
+    python layer4_model.py <results.json|attestations.jsonl|gemara-l4.yaml|directory>...
+
+Prints the memory used per finding by plain dicts and by the compact model.
+"""
+
+import argparse
+import sys
+import tracemalloc
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Record:
+    """Base of the model classes: pickled as constructor arguments, so workers send them compactly."""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+
+class Identifier(_Record):
+    __slots__ = ('type', 'value')
+
+    def __init__(self, type: str, value: str):
+        self.type = _intern(type)
+        self.value = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'type': self.type, 'value': self.value}
+
+
+class Subject(_Record):
+    __slots__ = ('name', 'type', 'identifiers')
+
+    def __init__(self, name: str, type: str, identifiers: Tuple[Identifier, ...]):
+        self.name = name
+        self.type = _intern(type)
+        self.identifiers = identifiers
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], shared: Optional[Dict[Any, Any]] = None) -> 'Subject':
+        """Build a subject, reusing an identical one from `shared` (see `compact_evaluations`)."""
+        name = data.get('name', 'unknown')
+        subject_type = data.get('type', 'artifact')
+        identifiers = tuple((i.get('type', ''), i.get('value', '')) for i in data.get('identifiers', []))
+        if shared is None:
+            return cls(name, subject_type, tuple(Identifier(*i) for i in identifiers))
+        key = ('subject', name, subject_type, identifiers)
+        subject = shared.get(key)
+        if subject is None:
+            subject = shared[key] = cls(name, subject_type, tuple(Identifier(*i) for i in identifiers))
+        return subject
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'type': self.type,
+            'identifiers': [i.to_dict() for i in self.identifiers]
+        }
+
+
+class Control(_Record):
+    __slots__ = ('id', 'framework', 'status')
+
+    def __init__(self, id: str, framework: str, status: str):
+        self.id = _intern(id)
+        self.framework = _intern(framework)
+        self.status = _intern(status)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'framework': self.framework, 'status': self.status}
+
+
+class Evidence(_Record):
+    """A statement reference; identical entries of one load share an instance."""
+
+    __slots__ = ('type', 'digest')
+
+    def __init__(self, type: str, digest: Any):
+        self.type = _intern(type)
+        self.digest = digest
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], shared: Optional[Dict[Any, Any]] = None) -> 'Evidence':
+        evidence_type = data.get('type', 'attestation')
+        digest = data.get('digest', '')
+        if shared is None:
+            return cls(evidence_type, digest)
+        key = ('evidence', evidence_type, digest if isinstance(digest, str) else repr(digest))
+        evidence = shared.get(key)
+        if evidence is None:
+            evidence = shared[key] = cls(evidence_type, digest)
+        return evidence
+
+    def to_dict(self) -> Dict[str, Any]:
+        # A shared digest mapping is copied, or YAML would write it as an alias
+        digest = dict(self.digest) if isinstance(self.digest, dict) else self.digest
+        return {'type': self.type, 'digest': digest}
+
+
+class Finding(_Record):
+    """A finding; optional Layer 4 fields are None when absent."""
+
+    __slots__ = ('id', 'status', 'timestamp', 'description', 'error', 'outputs', 'evidence')
+
+    def __init__(
+        self,
+        id: str,
+        status: str,
+        timestamp: str,
+        description: Optional[str] = None,
+        error: Optional[Tuple[str, str]] = None,
+        outputs: Optional[Dict[str, Any]] = None,
+        evidence: Optional[Tuple[Evidence, ...]] = None
+    ):
+        self.id = _intern(id)
+        self.status = _intern(status)
+        self.timestamp = timestamp
+        self.description = description
+        self.error = error
+        self.outputs = outputs
+        self.evidence = evidence
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], shared: Optional[Dict[Any, Any]] = None) -> 'Finding':
+        error = data.get('error')
+        evidence = data.get('evidence')
+        return cls(
+            data.get('id', ''),
+            data.get('status', 'UNKNOWN'),
+            data.get('timestamp', ''),
+            data.get('description'),
+            (error.get('message', ''), error.get('remediation', '')) if error is not None else None,
+            data.get('outputs'),
+            tuple(Evidence.from_dict(e, shared) for e in evidence) if evidence is not None else None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        finding = {
+            'id': self.id,
+            'status': self.status,
+            'timestamp': self.timestamp
+        }
+        if self.description is not None:
+            finding['description'] = self.description
+        if self.error is not None:
+            finding['error'] = {'message': self.error[0], 'remediation': self.error[1]}
+        if self.outputs is not None:
+            finding['outputs'] = self.outputs
+        if self.evidence is not None:
+            finding['evidence'] = [e.to_dict() for e in self.evidence]
+        return finding
+
+
+class Evaluation(_Record):
+    """One Layer 4 evaluation; optional sections are None when absent."""
+
+    __slots__ = (
+        'id', 'timestamp', 'duration_ms', 'evaluator', 'evaluator_version',
+        'subject', 'status', 'summary',
+        'policy_id', 'policy_version', 'policy_description',
+        'controls', 'findings', 'context'
+    )
+
+    def __init__(
+        self,
+        id: str,
+        timestamp: str,
+        duration_ms: int,
+        evaluator: str,
+        evaluator_version: str,
+        subject: Subject,
+        status: str,
+        summary: str,
+        policy_id: str,
+        policy_version: str,
+        policy_description: str,
+        controls: Optional[Tuple[Control, ...]] = None,
+        findings: Optional[Tuple[Finding, ...]] = None,
+        context: Optional[Dict[str, Any]] = None
+    ):
+        self.id = id
+        self.timestamp = timestamp
+        self.duration_ms = duration_ms
+        self.evaluator = _intern(evaluator)
+        self.evaluator_version = _intern(evaluator_version)
+        self.subject = subject
+        self.status = _intern(status)
+        self.summary = summary
+        self.policy_id = _intern(policy_id)
+        self.policy_version = _intern(policy_version)
+        self.policy_description = policy_description
+        self.controls = controls
+        self.findings = findings
+        self.context = context
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], shared: Optional[Dict[Any, Any]] = None) -> 'Evaluation':
+        """Compact an evaluation as produced by `map_result_to_evaluation`.
+
+        Evaluations compacted with the same `shared` dict share identical
+        subjects and evidence entries.
+        """
+        meta = data.get('evaluation', {})
+        assessment = data.get('assessment', {})
+        policy = data.get('policy', {})
+        controls = data.get('controls')
+        findings = data.get('findings')
+        return cls(
+            meta.get('id', ''),
+            meta.get('timestamp', ''),
+            meta.get('duration_ms', 0),
+            meta.get('evaluator', 'ampel'),
+            meta.get('evaluator_version', '1.0'),
+            Subject.from_dict(data.get('subject', {}), shared),
+            assessment.get('status', 'UNKNOWN'),
+            assessment.get('summary', ''),
+            policy.get('id', ''),
+            policy.get('version', ''),
+            policy.get('description', ''),
+            tuple(Control(c.get('id', ''), c.get('framework', 'custom'), c.get('status', ''))
+                  for c in controls) if controls is not None else None,
+            tuple(Finding.from_dict(f, shared) for f in findings) if findings is not None else None,
+            data.get('context')
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Expand back to the Layer 4 evaluation dict, key order included."""
+        evaluation = {
+            'evaluation': {
+                'id': self.id,
+                'timestamp': self.timestamp,
+                'duration_ms': self.duration_ms,
+                'evaluator': self.evaluator,
+                'evaluator_version': self.evaluator_version
+            },
+            'subject': self.subject.to_dict(),
+            'assessment': {
+                'status': self.status,
+                'summary': self.summary
+            },
+            'policy': {
+                'id': self.policy_id,
+                'version': self.policy_version,
+                'description': self.policy_description
+            }
+        }
+        if self.controls is not None:
+            evaluation['controls'] = [c.to_dict() for c in self.controls]
+        if self.findings is not None:
+            evaluation['findings'] = [f.to_dict() for f in self.findings]
+        if self.context is not None:
+            evaluation['context'] = self.context
+        return evaluation
+
+
+def compact_evaluations(evaluations: Iterable[Dict[str, Any]]) -> List[Evaluation]:
+    """Compact evaluations that are held together, sharing their subjects and evidence."""
+    shared = {}
+    return [Evaluation.from_dict(e, shared) for e in evaluations]
+
+
+def retained_size(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """Call `build` and return its value with the traced memory still allocated afterwards."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        value = build()
+        return value, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bytes_per_finding(make_evaluations: Callable[[], Iterable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Measure the memory of holding freshly mapped evaluations as plain dicts and as the compact model.
+
+    `make_evaluations` is called once per representation, so neither side
+    shares objects with the other. Raises ValueError if the compact model
+    does not expand back to the plain dicts.
+    """
+    plain, plain_size = retained_size(lambda: list(make_evaluations()))
+    compact, compact_size = retained_size(lambda: compact_evaluations(make_evaluations()))
+    findings = sum(len(e.get('findings') or []) for e in plain)
+    if not findings:
+        raise ValueError("no findings to measure")
+    for index, (expected, evaluation) in enumerate(zip(plain, compact)):
+        if evaluation.to_dict() != expected:
+            raise ValueError(f"evaluation {index} does not round-trip through the compact model")
+    return {
+        'evaluations': len(plain),
+        'findings': findings,
+        'plain_bytes_per_finding': plain_size / findings,
+        'compact_bytes_per_finding': compact_size / findings,
+        'saving': 1 - compact_size / plain_size
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory use of plain dict and compact Layer 4 evaluations.")
+    parser.add_argument('inputs', nargs='+', help="ampel result JSON, JSONL attestations, Layer 4 YAML or directories")
+    args = parser.parse_args()
+
+    import yaml
+
+    if __package__:
+        from .rollup import find_inputs, iter_input_evaluations, load_ampel_to_gemara
+    else:
+        from rollup import find_inputs, iter_input_evaluations, load_ampel_to_gemara
+
+    ampel_to_gemara = load_ampel_to_gemara()
+    files = find_inputs(args.inputs)
+
+    def on_error(message: str):
+        raise ValueError(message)
+
+    def load() -> Iterable[Dict[str, Any]]:
+        for path in files:
+            yield from iter_input_evaluations(path, ampel_to_gemara, on_error)
+
+    try:
+        result = bytes_per_finding(load)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Evaluations: {result['evaluations']}  Findings: {result['findings']}")
+    print(f"  plain dicts:   {result['plain_bytes_per_finding']:8.0f} bytes/finding")
+    print(f"  compact model: {result['compact_bytes_per_finding']:8.0f} bytes/finding")
+    print(f"  saving:        {100 * result['saving']:7.1f}%")
+
+
+if __name__ == '__main__':
+    main()
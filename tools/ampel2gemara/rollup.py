@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Compliance rollup across any number of ampel results and Layer 4 files.
+
+Streams evaluations one at a time (ampel results are mapped with
+`map_result_to_evaluation`, Layer 4 YAML is read item by item) and keeps
+running aggregates only: counts by status per control, framework and policy,
+the most frequent failures, and duration histograms built from
+`duration_ms`. Memory grows with the number of distinct controls, policies
+and finding ids, not with the number of evaluations or findings.
+
+Usage:
+    python rollup.py <results.json|attestations.jsonl|gemara-l4.yaml|directory>...
+                     [--output summary.yaml] [--top N] [--json]
+
+Examples:
+    python rollup.py results/ --top 20 --output compliance-summary.yaml
+    python ../policy_eval.py policy.json attestations.jsonl | python rollup.py - --json
+"""
+
+import argparse
+import bisect
+import collections
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, TextIO, Tuple
+
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import MappingEndEvent, MappingStartEvent, SequenceEndEvent, SequenceStartEvent, StreamEndEvent
+from yaml.resolver import Resolver
+
+if __package__:
+    from ..tool_modules import load_ampel_to_gemara
+else:
+    # Run as a script from a checkout: tool_modules.py is in the parent directory
+    import runpy
+    load_ampel_to_gemara = runpy.run_path(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tool_modules.py')
+    )['load_ampel_to_gemara']
+
+try:
+    from yaml.cyaml import CParser
+
+    class _StreamLoader(CParser, Composer, SafeConstructor, Resolver):
+        """libyaml's event parser with PyYAML's composer, to build one node at a time."""
+
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+except ImportError:
+    _StreamLoader = yaml.SafeLoader
+
+# Upper bounds (ms) of the duration histogram buckets; the last bucket is open
+DURATION_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+INPUT_SUFFIXES = ('.json', '.jsonl', '.yaml', '.yml')
+
+
+def iter_layer4_evaluations(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a Layer 4 document's `evaluations` one at a time.
+
+    Only the current evaluation is built; the rest of the document is read
+    as parser events. Other top-level fields are parsed and discarded.
+    """
+    loader = _StreamLoader(stream)
+    try:
+        loader.get_event()
+        if loader.check_event(StreamEndEvent):
+            return
+        loader.get_event()
+        if not loader.check_event(MappingStartEvent):
+            raise ValueError("expected a Layer 4 mapping at the top level")
+        loader.get_event()
+        while not loader.check_event(MappingEndEvent):
+            key = loader.construct_document(loader.compose_node(None, None))
+            if key == 'evaluations' and loader.check_event(SequenceStartEvent):
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    yield loader.construct_document(loader.compose_node(None, None))
+                loader.get_event()
+            else:
+                loader.compose_node(None, None)
+    finally:
+        loader.dispose()
+
+
+class DurationHistogram:
+    """Count, sum, extremes and fixed-bucket counts of durations in ms."""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+
+    def add(self, duration_ms: int):
+        self.count += 1
+        self.total += duration_ms
+        self.minimum = duration_ms if self.minimum is None else min(self.minimum, duration_ms)
+        self.maximum = duration_ms if self.maximum is None else max(self.maximum, duration_ms)
+        self.buckets[bisect.bisect_left(DURATION_BUCKETS, duration_ms)] += 1
+
+    def percentile(self, fraction: float) -> Optional[int]:
+        """Upper bound of the bucket holding the given fraction of durations."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return DURATION_BUCKETS[index] if index < len(DURATION_BUCKETS) else self.maximum
+        return self.maximum
+
+    def as_dict(self) -> Dict[str, Any]:
+        if not self.count:
+            return {'count': 0}
+        histogram = [
+            {'le': DURATION_BUCKETS[i] if i < len(DURATION_BUCKETS) else None, 'count': count}
+            for i, count in enumerate(self.buckets) if count
+        ]
+        return {
+            'count': self.count,
+            'min': self.minimum,
+            'max': self.maximum,
+            'mean': round(self.total / self.count, 1),
+            'p50': self.percentile(0.50),
+            'p90': self.percentile(0.90),
+            'p99': self.percentile(0.99),
+            'histogram': histogram
+        }
+
+
+def _rates(statuses: collections.Counter) -> Dict[str, Any]:
+    total = sum(statuses.values())
+    return {
+        'total': total,
+        'statuses': dict(sorted(statuses.items())),
+        'pass_rate': round(statuses['PASS'] / total, 4) if total else None
+    }
+
+
+class Rollup:
+    """Running aggregates over Layer 4 evaluations.
+
+    `add()` folds one evaluation into counters keyed by control, framework,
+    policy and finding id, so the state is bounded by the number of distinct
+    keys however many evaluations are added.
+    """
+
+    def __init__(self):
+        self.evaluations = 0
+        self.statuses = collections.Counter()
+        self.finding_statuses = collections.Counter()
+        self.controls = collections.defaultdict(collections.Counter)
+        self.frameworks = collections.defaultdict(collections.Counter)
+        self.policies = collections.defaultdict(collections.Counter)
+        self.policy_findings = collections.defaultdict(collections.Counter)
+        self.policy_durations = collections.defaultdict(DurationHistogram)
+        self.finding_failures = collections.Counter()
+        self.durations = DurationHistogram()
+        self.first = None
+        self.last = None
+
+    def add(self, evaluation: Any):
+        """Fold one Layer 4 evaluation, a dict or a `layer4_model.Evaluation`, into the aggregates."""
+        if not isinstance(evaluation, dict):
+            # The compact model is read directly instead of being expanded
+            self._add(
+                evaluation.status, evaluation.policy_id, evaluation.duration_ms, evaluation.timestamp,
+                ((c.framework, c.id, c.status) for c in evaluation.controls or ()),
+                ((f.id, f.status) for f in evaluation.findings or ())
+            )
+            return
+        details = evaluation.get('evaluation') or {}
+        status = (evaluation.get('assessment') or {}).get('status', 'UNKNOWN')
+        self._add(
+            status, (evaluation.get('policy') or {}).get('id', ''), details.get('duration_ms'), details.get('timestamp'),
+            ((c.get('framework', ''), c.get('id', ''), c.get('status', status)) for c in evaluation.get('controls') or []),
+            ((f.get('id', ''), f.get('status', 'UNKNOWN')) for f in evaluation.get('findings') or [])
+        )
+
+    def _add(
+        self,
+        status: str,
+        policy_id: str,
+        duration: Any,
+        timestamp: Any,
+        controls: Iterable[Tuple[str, str, str]],
+        findings: Iterable[Tuple[str, str]]
+    ):
+        self.evaluations += 1
+        self.statuses[status] += 1
+        self.policies[policy_id][status] += 1
+
+        if isinstance(duration, int):
+            self.durations.add(duration)
+            self.policy_durations[policy_id].add(duration)
+        if timestamp:
+            timestamp = str(timestamp)
+            self.first = timestamp if self.first is None else min(self.first, timestamp)
+            self.last = timestamp if self.last is None else max(self.last, timestamp)
+
+        for framework, control_id, control_status in controls:
+            self.controls[(framework, control_id)][control_status] += 1
+            self.frameworks[framework][control_status] += 1
+
+        for finding_id, finding_status in findings:
+            self.finding_statuses[finding_status] += 1
+            self.policy_findings[policy_id][finding_status] += 1
+            if finding_status != 'PASS':
+                self.finding_failures[(policy_id, finding_id)] += 1
+
+    def add_all(self, evaluations) -> int:
+        count = 0
+        for evaluation in evaluations:
+            self.add(evaluation)
+            count += 1
+        return count
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """Return the rollup document, with the `top` most frequent failures of each kind."""
+
+        def failures(statuses: collections.Counter) -> int:
+            return sum(count for status, count in statuses.items() if status != 'PASS')
+
+        def ranked(items: Dict[Any, collections.Counter], entry: Callable[[Any], Dict[str, Any]]) -> List[Dict[str, Any]]:
+            worst = sorted(
+                ((failures(statuses), key) for key, statuses in items.items() if failures(statuses)),
+                key=lambda item: (-item[0], item[1])
+            )[:top]
+            return [dict(entry(key), failures=count) for count, key in worst]
+
+        return {
+            'rollup': {
+                'generated': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+                'first_evaluation': self.first,
+                'last_evaluation': self.last,
+                'evaluations': _rates(self.statuses),
+                'findings': _rates(self.finding_statuses),
+                'duration_ms': self.durations.as_dict()
+            },
+            'frameworks': [
+                dict(framework=framework, **_rates(statuses))
+                for framework, statuses in sorted(self.frameworks.items())
+            ],
+            'controls': [
+                dict(framework=framework, id=control_id, **_rates(statuses))
+                for (framework, control_id), statuses in sorted(self.controls.items())
+            ],
+            'policies': [
+                dict(
+                    id=policy_id,
+                    **_rates(statuses),
+                    findings=dict(sorted(self.policy_findings[policy_id].items())),
+                    duration_ms=self.policy_durations[policy_id].as_dict()
+                )
+                for policy_id, statuses in sorted(self.policies.items())
+            ],
+            'top_failures': {
+                'controls': ranked(self.controls, lambda key: {'framework': key[0], 'id': key[1]}),
+                'policies': ranked(self.policies, lambda key: {'id': key}),
+                'findings': [
+                    {'policy': policy_id, 'finding': finding_id, 'failures': count}
+                    for (policy_id, finding_id), count in sorted(
+                        self.finding_failures.items(), key=lambda item: (-item[1], item[0])
+                    )[:top]
+                ]
+            }
+        }
+
+
+def find_inputs(paths: List[str]) -> List[str]:
+    """Expand directories to the result and Layer 4 files under them, in sorted order."""
+    files = []
+    for path in paths:
+        if path != '-' and Path(path).is_dir():
+            files.extend(str(p) for p in sorted(Path(path).rglob('*'))
+                         if p.suffix in INPUT_SUFFIXES and p.is_file())
+        else:
+            files.append(path)
+    return files
+
+
+def iter_input_evaluations(
+    path: str,
+    ampel_to_gemara,
+    on_error: Callable[[str], None]
+) -> Iterator[Dict[str, Any]]:
+    """Yield the evaluations of one input: Layer 4 YAML, JSONL attestations or an ampel document."""
+    suffix = Path(path).suffix
+    if suffix in ('.yaml', '.yml'):
+        with open(path, 'r') as f:
+            yield from iter_layer4_evaluations(f)
+        return
+
+    if path == '-' or suffix == '.jsonl':
+        validate = ampel_to_gemara.load_schema_validation().validate_ampel_result
+        with (sys.stdin if path == '-' else open(path, 'r')) as f:
+            results = ampel_to_gemara.iter_jsonl_results(
+                f, on_error=lambda line_no, message: on_error(f"{path}:{line_no}: {message}"), validate=validate
+            )
+            for result in results:
+                yield ampel_to_gemara.map_result_to_evaluation(result)
+        return
+
+    for result in ampel_to_gemara.validate_results(ampel_to_gemara.iter_file_results(path)):
+        yield ampel_to_gemara.map_result_to_evaluation(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll up ampel results and Gemara Layer 4 evaluations.")
+    parser.add_argument('inputs', nargs='+',
+                        help="ampel result JSON, JSONL attestations ('-' for stdin), Layer 4 YAML or directories")
+    parser.add_argument('--output', '-o', help="write the summary to this file (default: stdout)")
+    parser.add_argument('--top', type=int, default=10, help="failures listed per ranking (default: %(default)s)")
+    parser.add_argument('--json', action='store_true', help="write JSON instead of YAML")
+    args = parser.parse_args()
+
+    ampel_to_gemara = load_ampel_to_gemara()
+    rollup = Rollup()
+    errors = []
+
+    def report(message: str):
+        errors.append(message)
+        print(f"Error: {message}", file=sys.stderr)
+
+    files = find_inputs(args.inputs)
+    for path in files:
+        try:
+            rollup.add_all(iter_input_evaluations(path, ampel_to_gemara, report))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            report(f"{path}: {e}")
+
+    summary = rollup.summary(args.top)
+    summary['rollup'] = dict(inputs=len(files), errors=len(errors), **summary['rollup'])
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.json:
+            json.dump(summary, out, indent=2)
+            out.write('\n')
+        else:
+            yaml.dump(summary, out, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper),
+                      sort_keys=False, default_flow_style=False)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Rolled up {rollup.evaluations} evaluation(s) from {len(files)} input(s)", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
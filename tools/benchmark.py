@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Synthetic-load benchmarks for ampel-to-gemara and gemara_to_ampel.
+
+Generates seeded ampel ResultSets (N results x M eval_results x K statements,
+with a configurable failure ratio) and Gemara Layer 3 policies (many
+guidance/control references and modifications), then measures throughput,
+latency percentiles and peak memory of `convert_ampel_to_gemara`, Layer 4
+YAML rendering, `GemaraToAmpelConverter.convert` and the schema validation
+each converter runs on its input, plus the start-up time of the scripts and
+of the `gemara-ampel` command. The `compact_evaluations` cases also report
+the bytes per finding of mapped evaluations held as plain dicts and as the
+compact `layer4_model`.
+
+Usage:
+    python benchmark.py [--quick] [--repeat N] [--seed N] [--output results.json]
+    python benchmark.py --compare baseline.json [--output current.json]
+
+Results are written as JSON so runs on different commits can be compared.
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Callable, Optional
+
+if __package__:
+    from .schema_validation import validate_ampel_result, validate_layer3_policy
+    from .tool_modules import TOOLS_DIR, import_module, load_ampel_to_gemara, load_gemara_to_ampel
+else:
+    from schema_validation import validate_ampel_result, validate_layer3_policy
+    from tool_modules import TOOLS_DIR, import_module, load_ampel_to_gemara, load_gemara_to_ampel
+
+
+# (results, eval_results per result, statements per eval_result, failure ratio)
+AMPEL_CASES = [
+    (10, 5, 1, 0.0),
+    (1000, 5, 1, 0.0),
+    (1000, 5, 1, 0.5),
+    (1000, 20, 4, 0.5),
+    (10000, 5, 1, 0.2),
+]
+
+# (references, modifications of each kind per reference)
+GEMARA_CASES = [
+    (1, 1),
+    (50, 10),
+    (200, 25),
+]
+
+QUICK_AMPEL_CASES = [(10, 5, 1, 0.0), (500, 5, 1, 0.5)]
+QUICK_GEMARA_CASES = [(1, 1), (20, 5)]
+
+MODIFICATION_TYPES = ['clarify', 'increase-strictness', 'reduce-strictness', 'exclude']
+
+
+def _digest(rng: random.Random, bits: int = 256) -> str:
+    return f'{rng.getrandbits(bits):0{bits // 4}x}'
+
+
+def generate_result_set(
+    results: int,
+    eval_results: int,
+    statements: int,
+    fail_ratio: float,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Build an in-toto wrapped ampel ResultSet with deterministic content."""
+    rng = random.Random(seed)
+    start = datetime(2025, 12, 26, 5, 20, tzinfo=timezone.utc)
+
+    def timestamp(offset_ms: int) -> str:
+        return (start + timedelta(milliseconds=offset_ms)).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+    attestations = [
+        {
+            'attestation': {
+                'digest': {'sha256': _digest(rng), 'sha512': _digest(rng, 512)},
+                'name': f'jsonl:attestations.jsonl#{i}',
+                'uri': f'jsonl:attestations.jsonl#{i}'
+            },
+            'type': 'http://github.com/carabiner-dev/snappy/specs/branch-rules.yaml'
+        }
+        for i in range(max(statements, 1) * 4)
+    ]
+
+    result_list = []
+    for r in range(results):
+        failed = rng.random() < fail_ratio
+        checks = []
+        for e in range(eval_results):
+            check = {
+                'date': timestamp(r * 10 + e),
+                'id': f'{e + 1:02d}',
+                'output': {'rules_checked': rng.randint(1, 20)} if e % 2 else {},
+                'statements': rng.sample(attestations, statements),
+                'status': 'FAIL' if failed and e == eval_results - 1 else 'PASS'
+            }
+            if check['status'] == 'PASS':
+                check['assessment'] = {'message': f'Check {e + 1} of policy {r} passed'}
+            else:
+                check['error'] = {
+                    'message': f'Check {e + 1} of policy {r} failed',
+                    'guidance': 'Create a branch ruleset protecting your default branch'
+                }
+            checks.append(check)
+
+        result_list.append({
+            'context': {'branch': 'main'} if r % 3 == 0 else {},
+            'date_end': timestamp(r * 10 + eval_results),
+            'date_start': timestamp(r * 10),
+            'eval_results': checks,
+            'meta': {
+                'assert_mode': 'AND',
+                'controls': [{'class': 'QA', 'framework': 'OSPS', 'id': f'{r % 50:02d}'}],
+                'description': f'Synthetic policy {r}',
+                'enforce': 'ON',
+                'runtime': 'cel@v14.0'
+            },
+            'policy': {'id': f'OSPS-QA-{r:05d}', 'version': 'v1.0.0'},
+            'status': 'FAIL' if failed else 'PASS',
+            'subject': {'digest': {'sha256': _digest(rng)}}
+        })
+
+    return {
+        '_type': 'https://in-toto.io/Statement/v1',
+        'predicateType': 'https://carabiner.dev/ampel/resultset/v0.0.1',
+        'predicate': {
+            'policy_set': {'id': 'synthetic'},
+            'results': result_list
+        }
+    }
+
+
+def generate_layer3_policy(references: int, modifications: int, seed: int = 0) -> Dict[str, Any]:
+    """Build a Gemara Layer 3 policy with many references and modifications."""
+    rng = random.Random(seed)
+
+    def mapping(kind: str, index: int) -> Dict[str, Any]:
+        reference_id = f'{kind}-{index:04d}'
+        return {
+            'reference-id': reference_id,
+            'in-scope': {'technologies': ['git', 'github'], 'boundaries': [f'unit-{index % 7}']},
+            'control-modifications': [
+                {
+                    'target-id': f'{reference_id}.C{m:03d}',
+                    'modification-type': rng.choice(MODIFICATION_TYPES),
+                    'modification-rationale': f'Rationale {m}',
+                    'title': f'Control {m}',
+                    'objective': f'Objective for control {m}'
+                }
+                for m in range(modifications)
+            ],
+            'assessment-requirement-modifications': [
+                {
+                    'target-id': f'{reference_id}.A{m:03d}',
+                    'modification-type': rng.choice(MODIFICATION_TYPES),
+                    'text': f'Assessment requirement {m}',
+                    'applicability': ['Maturity Level 1', 'Maturity Level 2'][:rng.randint(1, 2)],
+                    'recommendation': f'Recommendation {m}'
+                }
+                for m in range(modifications)
+            ],
+            'guideline-modifications': [
+                {
+                    'target-id': f'{reference_id}.G{m:03d}',
+                    'modification-type': rng.choice(MODIFICATION_TYPES),
+                    'title': f'Guideline {m}',
+                    'recommendations': [f'Recommendation {m}.{i}' for i in range(rng.randint(1, 3))]
+                }
+                for m in range(modifications)
+            ]
+        }
+
+    return {
+        'title': 'Synthetic policy',
+        'metadata': {'id': 'SYNTHETIC', 'version': '1.0.0'},
+        'organization-id': 'benchmark',
+        'purpose': 'Benchmark input',
+        'scope': {'boundaries': ['all'], 'technologies': ['git'], 'providers': ['github']},
+        'contacts': {'responsible': [{'name': 'Benchmark'}]},
+        'guidance-references': [mapping('guidance', i) for i in range(references // 2 + references % 2)],
+        'control-references': [mapping('control', i) for i in range(references // 2)],
+        'implementation-plan': {'evaluation': {'start': '2025-01-01'}, 'enforcement-methods': ['gate']}
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int, items: int) -> Dict[str, Any]:
+    """Time `repeat` calls of `func` and measure its peak memory once."""
+    func()  # warm up
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))] * 1000
+
+    mean = statistics.mean(latencies)
+    return {
+        'items': items,
+        'repeat': repeat,
+        'mean_ms': mean * 1000,
+        'p50_ms': percentile(0.50),
+        'p90_ms': percentile(0.90),
+        'p99_ms': percentile(0.99),
+        'items_per_s': items / mean if mean else 0.0,
+        'peak_memory_bytes': peak
+    }
+
+
+def measure_startup(repeat: int) -> List[Dict[str, Any]]:
+    """Time a cold `--help` of each command-line tool, and a small conversion through `gemara-ampel`.
+
+    Raises RuntimeError if a command fails, so a broken tool is not timed as a fast one.
+    """
+    cli = [sys.executable, '-m', 'gemara_ampel']
+    small_result = str(TOOLS_DIR / 'ampel2gemara' / 'test-data' / 'example-result.json')
+    commands = {
+        'startup:python': [sys.executable, '-c', 'pass'],
+        'startup:ampel-to-gemara': [sys.executable, str(TOOLS_DIR / 'ampel2gemara' / 'ampel-to-gemara.py'), '--help'],
+        'startup:gemara_to_ampel': [sys.executable, str(TOOLS_DIR / 'gemara2ampel' / 'gemara_to_ampel.py'), '--help'],
+        'startup:gemara-ampel': cli + ['--help'],
+        'startup:gemara-ampel to-gemara': cli + ['to-gemara', '--help'],
+        'startup:gemara-ampel to-ampel': cli + ['to-ampel', '--help'],
+        'startup:gemara-ampel to-gemara small': cli + ['to-gemara', small_result, '--no-cache'],
+    }
+    cases = []
+    for name, command in commands.items():
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            process = subprocess.run(command, cwd=TOOLS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            latencies.append(time.perf_counter() - start)
+            if process.returncode != 0:
+                raise RuntimeError(f"{name} exited with status {process.returncode}: "
+                                   f"{process.stderr.decode(errors='replace').strip()}")
+        latencies.sort()
+        cases.append({
+            'name': name,
+            'items': 1,
+            'repeat': repeat,
+            'mean_ms': statistics.mean(latencies) * 1000,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p90_ms': latencies[int(0.9 * (len(latencies) - 1))] * 1000,
+            'p99_ms': latencies[-1] * 1000,
+        })
+    return cases
+
+
+def run_benchmarks(quick: bool, repeat: int, seed: int) -> List[Dict[str, Any]]:
+    ampel_to_gemara = load_ampel_to_gemara()
+    gemara_to_ampel = load_gemara_to_ampel()
+    layer4_model = import_module('ampel2gemara.layer4_model')
+    cases = []
+
+    for results, evals, statements, fail_ratio in (QUICK_AMPEL_CASES if quick else AMPEL_CASES):
+        result_set = generate_result_set(results, evals, statements, fail_ratio, seed)
+        params = {'results': results, 'eval_results': evals, 'statements': statements, 'fail_ratio': fail_ratio}
+        # Large inputs are slow to render, so keep the total work per case bounded
+        case_repeat = max(3, min(repeat, 20000 // max(results, 1)))
+
+        stats = measure(lambda: ampel_to_gemara.convert_ampel_to_gemara(result_set), case_repeat, results)
+        cases.append(dict(name='convert_ampel_to_gemara', params=params, **stats))
+        convert_ms = stats['p50_ms']
+
+        evaluations = ampel_to_gemara.convert_ampel_to_gemara(result_set)
+        stats = measure(lambda: ampel_to_gemara.write_layer4(evaluations, io.StringIO()),
+                        max(3, case_repeat // 10), results)
+        cases.append(dict(name='write_layer4', params=params, **stats))
+        convert_ms += stats['p50_ms']
+
+        # Memory of holding the mapped evaluations, before and after compaction
+        memory = layer4_model.bytes_per_finding(lambda: ampel_to_gemara.convert_ampel_to_gemara(result_set))
+        stats = measure(lambda: layer4_model.compact_evaluations(evaluations), case_repeat, results)
+        cases.append(dict(name='compact_evaluations', params=params,
+                          plain_bytes_per_finding=memory['plain_bytes_per_finding'],
+                          compact_bytes_per_finding=memory['compact_bytes_per_finding'], **stats))
+
+        # Overhead is relative to mapping plus rendering, the work a conversion always does
+        result_list = list(ampel_to_gemara.iter_ampel_results(result_set))
+        stats = measure(lambda: [validate_ampel_result(r) for r in result_list], case_repeat, results)
+        cases.append(dict(name='validate_ampel_result', params=params,
+                          overhead=stats['p50_ms'] / convert_ms, **stats))
+
+    converter = gemara_to_ampel.GemaraToAmpelConverter()
+    for references, modifications in (QUICK_GEMARA_CASES if quick else GEMARA_CASES):
+        policy = generate_layer3_policy(references, modifications, seed)
+        params = {'references': references, 'modifications': modifications}
+        policies = references * modifications * 3
+        case_repeat = max(3, min(repeat, 20000 // max(policies, 1)))
+        stats = measure(lambda: converter.convert(policy), case_repeat, policies)
+        cases.append(dict(name='GemaraToAmpelConverter.convert', params=params, **stats))
+        convert_ms = stats['p50_ms']
+
+        stats = measure(lambda: validate_layer3_policy(policy), case_repeat, policies)
+        cases.append(dict(name='validate_layer3_policy', params=params,
+                          overhead=stats['p50_ms'] / convert_ms, **stats))
+
+    cases.extend(measure_startup(max(3, min(repeat, 10))))
+    return cases
+
+
+def _case_key(case: Dict[str, Any]) -> str:
+    return case['name'] + json.dumps(case.get('params', {}), sort_keys=True)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    """Print per-case changes against a baseline, returning the number of regressions."""
+    previous = {_case_key(c): c for c in baseline.get('cases', [])}
+    regressions = 0
+    print(f"{'case':80} {'p50 ms':>10} {'change':>8} {'memory':>8}")
+    for case in current['cases']:
+        label = case['name'] + ' ' + ' '.join(f'{k}={v}' for k, v in case.get('params', {}).items())
+        old = previous.get(_case_key(case))
+        if old is None:
+            print(f"{label:80} {case['p50_ms']:10.2f} {'new':>8}")
+            continue
+        change = case['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0
+        memory = ''
+        if case.get('peak_memory_bytes') and old.get('peak_memory_bytes'):
+            memory = f"{case['peak_memory_bytes'] / old['peak_memory_bytes'] - 1:+.0%}"
+        flag = ''
+        if change > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{label:80} {case['p50_ms']:10.2f} {change:+8.0%} {memory:>8}{flag}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ampel <-> Gemara converters on synthetic load.")
+    parser.add_argument('--quick', action='store_true', help="run a reduced set of cases")
+    parser.add_argument('--repeat', type=int, default=50, help="timed calls per case (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed (default: %(default)s)")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="p50 slowdown reported as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        cases = run_benchmarks(args.quick, args.repeat, args.seed)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'cases': cases
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results written to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.threshold):
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
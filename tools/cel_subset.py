@@ -0,0 +1,613 @@
+"""
+Parser and evaluator for the subset of CEL used by the ampel policies.
+
+Supported: literals (int, double, string, bool, null, lists, maps), variable
+and field access, indexing, `!`/`-`, arithmetic, comparisons, `in`, `&&`,
+`||`, `? :`, `//` comments, the `has()` macro, the `all`, `exists`,
+`exists_one`, `map` and `filter` macros, and the `size`, `int`, `double`,
+`string`, `matches`, `contains`, `startsWith` and `endsWith` functions.
+`&&` and `||` absorb errors the way CEL does, so `false && <error>` is false.
+
+Expressions are parsed into a small tuple AST (see `parse`) and compiled to
+nested Python closures; `compile_expression` caches programs by code string.
+"""
+
+import functools
+import re
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+
+class CelError(Exception):
+    """An expression that cannot be evaluated against the given input."""
+
+
+class CelSyntaxError(CelError):
+    """An expression outside the supported CEL subset."""
+
+    def __init__(self, message: str, code: str, position: int):
+        # All values go to args so the error survives pickling from a worker
+        super().__init__(message, code, position)
+        self.message = message
+        self.code = code
+        self.position = position
+
+    def __str__(self) -> str:
+        return f"{self.message} at column {self.position + 1}: {self.code}"
+
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+|//[^\n]*)
+  | (?P<double>\d+\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+)
+  | (?P<int>0[xX][0-9a-fA-F]+|\d+)u?
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>==|!=|<=|>=|&&|\|\||[<>!+\-*/%?:.,()\[\]{}])
+''', re.VERBOSE)
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '"': '"', "'": "'", '0': '\0'}
+
+_KEYWORDS = {'true': True, 'false': False, 'null': None}
+
+# Comprehension macros, called as <list>.<macro>(<variable>, <expression>)
+MACROS = ('all', 'exists', 'exists_one', 'map', 'filter')
+
+FUNCTIONS = ('size', 'int', 'double', 'string', 'matches', 'contains', 'startsWith', 'endsWith')
+
+
+def _unescape(literal: str) -> str:
+    return re.sub(r'\\(.)', lambda m: _ESCAPES.get(m.group(1), m.group(1)), literal[1:-1])
+
+
+def tokenize(code: str) -> List[Tuple[str, Any, int]]:
+    """Split an expression into (kind, value, position) tokens, dropping comments."""
+    tokens = []
+    position = 0
+    while position < len(code):
+        match = _TOKEN.match(code, position)
+        if match is None:
+            raise CelSyntaxError(f"unexpected character {code[position]!r}", code, position)
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'double':
+            tokens.append(('lit', float(text), position))
+        elif kind == 'int':
+            # Decimal unless prefixed with 0x, so leading zeros (07) are accepted as in CEL
+            try:
+                value = int(text[2:], 16) if text[:2] in ('0x', '0X') else int(text, 10)
+            except ValueError as e:
+                raise CelSyntaxError(f"invalid integer literal: {e}", code, position) from None
+            tokens.append(('lit', value, position))
+        elif kind == 'string':
+            tokens.append(('lit', _unescape(text), position))
+        elif kind == 'ident':
+            if text in _KEYWORDS:
+                tokens.append(('lit', _KEYWORDS[text], position))
+            else:
+                tokens.append(('ident', text, position))
+        elif kind == 'op':
+            tokens.append(('op', text, position))
+        position = match.end()
+    tokens.append(('end', None, len(code)))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing the tuple AST documented on `parse`."""
+
+    RELATIONS = ('==', '!=', '<', '<=', '>', '>=', 'in')
+
+    def __init__(self, code: str):
+        self.code = code
+        self.tokens = tokenize(code)
+        self.index = 0
+
+    def peek(self) -> Tuple[str, Any, int]:
+        return self.tokens[self.index]
+
+    def next(self) -> Tuple[str, Any, int]:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, op: str) -> bool:
+        kind, value, _ = self.peek()
+        if kind == 'op' and value == op:
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, op: str):
+        if not self.accept(op):
+            self.fail(f"expected {op!r}")
+
+    def fail(self, message: str):
+        kind, value, position = self.peek()
+        found = 'end of expression' if kind == 'end' else repr(value)
+        raise CelSyntaxError(f"{message}, found {found}", self.code, position)
+
+    def parse(self) -> tuple:
+        node = self.expression()
+        if self.peek()[0] != 'end':
+            self.fail("expected end of expression")
+        return node
+
+    def expression(self) -> tuple:
+        condition = self.binary_or()
+        if self.accept('?'):
+            then = self.binary_or()
+            self.expect(':')
+            otherwise = self.expression()
+            return ('cond', condition, then, otherwise)
+        return condition
+
+    def binary_or(self) -> tuple:
+        node = self.binary_and()
+        while self.accept('||'):
+            node = ('or', node, self.binary_and())
+        return node
+
+    def binary_and(self) -> tuple:
+        node = self.relation()
+        while self.accept('&&'):
+            node = ('and', node, self.relation())
+        return node
+
+    def relation(self) -> tuple:
+        node = self.addition()
+        while True:
+            kind, value, _ = self.peek()
+            if value in self.RELATIONS and kind in ('op', 'ident'):
+                self.next()
+                node = ('binop', value, node, self.addition())
+            else:
+                return node
+
+    def addition(self) -> tuple:
+        node = self.multiplication()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('+', '-'):
+            node = ('binop', self.next()[1], node, self.multiplication())
+        return node
+
+    def multiplication(self) -> tuple:
+        node = self.unary()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('*', '/', '%'):
+            node = ('binop', self.next()[1], node, self.unary())
+        return node
+
+    def unary(self) -> tuple:
+        if self.accept('!'):
+            return ('not', self.unary())
+        if self.accept('-'):
+            return ('neg', self.unary())
+        return self.member()
+
+    def member(self) -> tuple:
+        node = self.primary()
+        while True:
+            if self.accept('.'):
+                kind, name, _ = self.next()
+                if kind != 'ident':
+                    self.index -= 1
+                    self.fail("expected a field name")
+                if self.accept('('):
+                    node = self.call(name, node)
+                else:
+                    node = ('select', node, name)
+            elif self.accept('['):
+                node = ('index', node, self.expression())
+                self.expect(']')
+            else:
+                return node
+
+    def arguments(self, closing: str) -> List[tuple]:
+        args = []
+        if not self.accept(closing):
+            args.append(self.expression())
+            while self.accept(','):
+                args.append(self.expression())
+            self.expect(closing)
+        return args
+
+    def call(self, name: str, target: Optional[tuple]) -> tuple:
+        start = self.index
+        args = self.arguments(')')
+        if target is None and name == 'has':
+            if len(args) != 1 or args[0][0] != 'select':
+                self.index = start
+                self.fail("has() takes a single field selection")
+            return ('has', args[0][1], args[0][2])
+        if target is not None and name in MACROS:
+            if len(args) != 2 or args[0][0] != 'ident':
+                self.index = start
+                self.fail(f"{name}() takes a variable name and an expression")
+            return ('macro', name, target, args[0][1], args[1])
+        if name not in FUNCTIONS:
+            self.index = start
+            self.fail(f"unsupported function {name}()")
+        return ('call', name, target, args)
+
+    def primary(self) -> tuple:
+        kind, value, _ = self.next()
+        if kind == 'lit':
+            return ('lit', value)
+        if kind == 'ident':
+            if self.accept('('):
+                return self.call(value, None)
+            return ('ident', value)
+        if kind == 'op' and value == '(':
+            node = self.expression()
+            self.expect(')')
+            return node
+        if kind == 'op' and value == '[':
+            return ('list', self.arguments(']'))
+        if kind == 'op' and value == '{':
+            entries = []
+            if not self.accept('}'):
+                while True:
+                    key = self.expression()
+                    self.expect(':')
+                    entries.append((key, self.expression()))
+                    if self.accept('}'):
+                        break
+                    self.expect(',')
+            return ('map', entries)
+        self.index -= 1
+        self.fail("expected an expression")
+
+
+def parse(code: str) -> tuple:
+    """Parse a CEL expression into a tuple AST.
+
+    Nodes: ('lit', value), ('ident', name), ('select', operand, field),
+    ('has', operand, field), ('index', operand, index),
+    ('call', name, target or None, [args]),
+    ('macro', name, target, variable, body), ('not', x), ('neg', x),
+    ('and', a, b), ('or', a, b), ('cond', condition, then, otherwise),
+    ('binop', op, a, b), ('list', [items]), ('map', [(key, value)]).
+    """
+    return _Parser(code).parse()
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return 'null'
+    return {bool: 'bool', int: 'int', float: 'double', str: 'string', list: 'list', dict: 'map'}.get(
+        type(value), type(value).__name__
+    )
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _equals(a: Any, b: Any) -> bool:
+    if _is_number(a) and _is_number(b):
+        return a == b
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_equals(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_equals(a[k], b[k]) for k in a)
+    return a == b
+
+
+def _require_bool(value: Any, where: str) -> bool:
+    if not isinstance(value, bool):
+        raise CelError(f"{where} expects bool, got {_type_name(value)}")
+    return value
+
+
+def _compare(op: str, a: Any, b: Any) -> bool:
+    if not ((_is_number(a) and _is_number(b)) or (type(a) is type(b) and isinstance(a, (str, bool)))):
+        raise CelError(f"no such overload: {_type_name(a)} {op} {_type_name(b)}")
+    if op == '<':
+        return a < b
+    if op == '<=':
+        return a <= b
+    if op == '>':
+        return a > b
+    return a >= b
+
+
+def _arithmetic(op: str, a: Any, b: Any) -> Any:
+    if op == '+' and type(a) is type(b) and isinstance(a, (str, list)):
+        return a + b
+    if not (_is_number(a) and _is_number(b)):
+        raise CelError(f"no such overload: {_type_name(a)} {op} {_type_name(b)}")
+    if op == '+':
+        return a + b
+    if op == '-':
+        return a - b
+    if op == '*':
+        return a * b
+    integers = isinstance(a, int) and isinstance(b, int)
+    if op == '%' and not integers:
+        raise CelError("no such overload: double % double")
+    if b == 0:
+        # Python raises ZeroDivisionError for doubles too; surface it as an evaluation error
+        raise CelError("division by zero" if op == '/' else "modulus by zero")
+    if integers:
+        # CEL integer division and modulus truncate toward zero
+        quotient = abs(a) // abs(b) * (1 if (a < 0) == (b < 0) else -1)
+        return quotient if op == '/' else a - quotient * b
+    return a / b
+
+
+def _has_key(mapping: Dict[Any, Any], key: Any) -> bool:
+    try:
+        return key in mapping
+    except TypeError:
+        # Lists and maps cannot be map keys
+        raise CelError(f"unsupported map key type: {_type_name(key)}") from None
+
+
+def _binop(op: str, a: Any, b: Any) -> Any:
+    if op == '==':
+        return _equals(a, b)
+    if op == '!=':
+        return not _equals(a, b)
+    if op == 'in':
+        if isinstance(b, list):
+            return any(_equals(a, item) for item in b)
+        if isinstance(b, dict):
+            return _has_key(b, a)
+        raise CelError(f"no such overload: {_type_name(a)} in {_type_name(b)}")
+    if op in ('<', '<=', '>', '>='):
+        return _compare(op, a, b)
+    return _arithmetic(op, a, b)
+
+
+def _select(value: Any, field: str) -> Any:
+    if not isinstance(value, dict):
+        raise CelError(f"cannot select field '{field}' from {_type_name(value)}")
+    try:
+        return value[field]
+    except KeyError:
+        raise CelError(f"no such key: {field}") from None
+
+
+def _index(value: Any, key: Any) -> Any:
+    if isinstance(value, list):
+        if not _is_number(key) or key != int(key):
+            raise CelError(f"invalid list index {key!r}")
+        if not 0 <= int(key) < len(value):
+            raise CelError(f"index out of range: {key}")
+        return value[int(key)]
+    if isinstance(value, dict):
+        if not _has_key(value, key):
+            raise CelError(f"no such key: {key}")
+        return value[key]
+    raise CelError(f"cannot index {_type_name(value)}")
+
+
+def _size(value: Any) -> int:
+    if not isinstance(value, (str, list, dict, bytes)):
+        raise CelError(f"no such overload: size({_type_name(value)})")
+    return len(value)
+
+
+def _convert(to: type, name: str) -> Callable[[Any], Any]:
+    def convert(value: Any) -> Any:
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            try:
+                return to(value)
+            except ValueError:
+                pass
+        raise CelError(f"cannot convert {value!r} to {name}")
+    return convert
+
+
+def _to_string(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    raise CelError(f"no such overload: string({_type_name(value)})")
+
+
+def _string_function(name: str) -> Callable[[Any, Any], bool]:
+    def apply(text: Any, arg: Any) -> bool:
+        if not isinstance(text, str) or not isinstance(arg, str):
+            raise CelError(f"no such overload: {_type_name(text)}.{name}({_type_name(arg)})")
+        if name == 'matches':
+            try:
+                return re.search(arg, text) is not None
+            except re.error as e:
+                raise CelError(f"invalid regular expression {arg!r}: {e}") from None
+        if name == 'contains':
+            return arg in text
+        if name == 'startsWith':
+            return text.startswith(arg)
+        return text.endswith(arg)
+    return apply
+
+
+_UNARY_FUNCTIONS = {'size': _size, 'int': _convert(int, 'int'), 'double': _convert(float, 'double'),
+                    'string': _to_string}
+
+Activation = Dict[str, Any]
+Evaluator = Callable[[Activation], Any]
+
+
+def _compile(node: tuple) -> Evaluator:
+    kind = node[0]
+
+    if kind == 'lit':
+        value = node[1]
+        return lambda env: value
+
+    if kind == 'ident':
+        name = node[1]
+
+        def ident(env: Activation) -> Any:
+            try:
+                return env[name]
+            except KeyError:
+                raise CelError(f"undeclared reference to '{name}'") from None
+        return ident
+
+    if kind == 'select':
+        operand, field = _compile(node[1]), node[2]
+        return lambda env: _select(operand(env), field)
+
+    if kind == 'has':
+        operand, field = _compile(node[1]), node[2]
+
+        def has(env: Activation) -> bool:
+            value = operand(env)
+            if not isinstance(value, dict):
+                raise CelError(f"has() cannot test field '{field}' of {_type_name(value)}")
+            return field in value
+        return has
+
+    if kind == 'index':
+        operand, key = _compile(node[1]), _compile(node[2])
+        return lambda env: _index(operand(env), key(env))
+
+    if kind == 'not':
+        operand = _compile(node[1])
+        return lambda env: not _require_bool(operand(env), '!')
+
+    if kind == 'neg':
+        operand = _compile(node[1])
+
+        def negate(env: Activation) -> Any:
+            value = operand(env)
+            if not _is_number(value):
+                raise CelError(f"no such overload: -{_type_name(value)}")
+            return -value
+        return negate
+
+    if kind in ('and', 'or'):
+        left, right = _compile(node[1]), _compile(node[2])
+        # The value that decides the result regardless of the other operand
+        absorbing = kind == 'or'
+
+        def logical(env: Activation) -> bool:
+            error = None
+            try:
+                if _require_bool(left(env), kind) is absorbing:
+                    return absorbing
+            except CelError as e:
+                error = e
+            if _require_bool(right(env), kind) is absorbing:
+                return absorbing
+            if error is not None:
+                raise error
+            return not absorbing
+        return logical
+
+    if kind == 'cond':
+        condition, then, otherwise = _compile(node[1]), _compile(node[2]), _compile(node[3])
+        return lambda env: then(env) if _require_bool(condition(env), '?:') else otherwise(env)
+
+    if kind == 'binop':
+        op, left, right = node[1], _compile(node[2]), _compile(node[3])
+        return lambda env: _binop(op, left(env), right(env))
+
+    if kind == 'list':
+        items = [_compile(item) for item in node[1]]
+        return lambda env: [item(env) for item in items]
+
+    if kind == 'map':
+        entries = [(_compile(k), _compile(v)) for k, v in node[1]]
+        return lambda env: {k(env): v(env) for k, v in entries}
+
+    if kind == 'call':
+        return _compile_call(node[1], node[2], node[3])
+
+    if kind == 'macro':
+        return _compile_macro(node[1], _compile(node[2]), node[3], _compile(node[4]))
+
+    raise CelError(f"unknown node {kind}")
+
+
+def _compile_call(name: str, target: Optional[tuple], args: List[tuple]) -> Evaluator:
+    operands = ([_compile(target)] if target is not None else []) + [_compile(a) for a in args]
+    if name in _UNARY_FUNCTIONS:
+        if len(operands) != 1:
+            raise CelError(f"{name}() takes one argument")
+        function, operand = _UNARY_FUNCTIONS[name], operands[0]
+        return lambda env: function(operand(env))
+    if len(operands) != 2:
+        raise CelError(f"{name}() takes a receiver and one argument")
+    function = _string_function(name)
+    text, arg = operands
+    return lambda env: function(text(env), arg(env))
+
+
+def _compile_macro(name: str, target: Evaluator, variable: str, body: Evaluator) -> Evaluator:
+    def items(env: Activation) -> List[Any]:
+        value = target(env)
+        if isinstance(value, dict):
+            return list(value)
+        if not isinstance(value, list):
+            raise CelError(f"{name}() expects a list or map, got {_type_name(value)}")
+        return value
+
+    def macro(env: Activation) -> Any:
+        values = items(env)
+        missing = object()
+        saved = env.get(variable, missing)
+        try:
+            if name == 'map':
+                result = []
+                for item in values:
+                    env[variable] = item
+                    result.append(body(env))
+                return result
+            if name == 'filter':
+                result = []
+                for item in values:
+                    env[variable] = item
+                    if _require_bool(body(env), 'filter()'):
+                        result.append(item)
+                return result
+            if name == 'exists_one':
+                matches = 0
+                for item in values:
+                    env[variable] = item
+                    matches += _require_bool(body(env), 'exists_one()')
+                return matches == 1
+
+            # all() and exists() short-circuit and absorb errors like && and ||
+            absorbing = name == 'exists'
+            error = None
+            for item in values:
+                env[variable] = item
+                try:
+                    if _require_bool(body(env), f'{name}()') is absorbing:
+                        return absorbing
+                except CelError as e:
+                    error = error or e
+            if error is not None:
+                raise error
+            return not absorbing
+        finally:
+            if saved is missing:
+                env.pop(variable, None)
+            else:
+                env[variable] = saved
+    return macro
+
+
+class Program:
+    """A compiled expression; evaluate it with `program(activation)`."""
+
+    __slots__ = ('code', 'ast', '_evaluate')
+
+    def __init__(self, code: str):
+        self.code = code
+        self.ast = parse(code)
+        self._evaluate = _compile(self.ast)
+
+    def __call__(self, activation: Activation) -> Any:
+        # Macros bind their variables in the activation, so work on a copy
+        return self._evaluate(dict(activation))
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_expression(code: str) -> Program:
+    """Compile `code`, reusing the program for code strings seen before."""
+    return Program(code)
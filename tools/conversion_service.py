@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Resident conversion service for ampel-to-gemara and gemara_to_ampel.
+
+Keeps the interpreter, PyYAML and both converters loaded and serves
+conversions over HTTP on a local TCP port or a Unix socket, so each request
+only pays for the conversion itself. Requests are accepted concurrently by
+an asyncio server and the CPU-bound parsing, conversion and serialisation
+runs on a process pool.
+
+Usage:
+    python conversion_service.py [--host 127.0.0.1] [--port 8080] [--workers N]
+    python conversion_service.py --unix /run/gemara.sock
+
+Endpoints:
+    POST /to-gemara   ampel result JSON            -> Gemara Layer 4 YAML
+    POST /to-ampel    Gemara Layer 3 policy YAML   -> Ampel PolicySet JSON
+    GET  /health
+
+Examples:
+    curl --data-binary @results.json http://127.0.0.1:8080/to-gemara
+    curl --unix-socket /run/gemara.sock --data-binary @policy.yaml http://localhost/to-ampel
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
+if __package__:
+    from .schema_validation import SchemaError, validate_ampel_result, validate_each, validate_layer3_policy
+    from .tool_modules import load_ampel_to_gemara, load_gemara_to_ampel
+else:
+    from schema_validation import SchemaError, validate_ampel_result, validate_each, validate_layer3_policy
+    from tool_modules import load_ampel_to_gemara, load_gemara_to_ampel
+
+MAX_BODY = 256 * 1024 * 1024
+# Longest request or header line accepted (the StreamReader buffer limit)
+MAX_LINE = 64 * 1024
+
+
+class ConversionError(Exception):
+    """A request that cannot be converted; reported to the client as 4xx."""
+
+    def __init__(self, status: int, message: str):
+        # Both values go to args so the error survives pickling from a worker
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def to_gemara(body: bytes) -> Tuple[str, bytes]:
+    """Convert an ampel result document to a Layer 4 YAML document."""
+    ampel_to_gemara = load_ampel_to_gemara()
+    try:
+        ampel_data = json.loads(body)
+    except ValueError as e:
+        raise ConversionError(400, f"Invalid JSON: {e}")
+    if not isinstance(ampel_data, dict):
+        raise ConversionError(400, "Invalid JSON: expected an object")
+
+    try:
+        evaluations = [
+            ampel_to_gemara.map_result_to_evaluation(result)
+            for result in validate_each(ampel_to_gemara.iter_ampel_results(ampel_data), validate_ampel_result)
+        ]
+    except SchemaError as e:
+        raise ConversionError(422, f"Invalid ampel result: {e}")
+    if not evaluations:
+        raise ConversionError(422, "No evaluations found in input")
+
+    out = io.StringIO()
+    ampel_to_gemara.write_layer4(evaluations, out)
+    return 'application/yaml', out.getvalue().encode()
+
+
+def to_ampel(body: bytes) -> Tuple[str, bytes]:
+    """Convert a Gemara Layer 3 policy document to an Ampel PolicySet."""
+    gemara_to_ampel = load_gemara_to_ampel()
+    try:
+        gemara_policy = gemara_to_ampel.yaml.load(body, Loader=gemara_to_ampel.YamlLoader)
+    except gemara_to_ampel.yaml.YAMLError as e:
+        raise ConversionError(400, f"Invalid YAML: {e}")
+    try:
+        validate_layer3_policy(gemara_policy)
+    except SchemaError as e:
+        raise ConversionError(422, f"Invalid Layer 3 policy: {e}")
+
+    policy_set = gemara_to_ampel.GemaraToAmpelConverter().convert(gemara_policy)
+    return 'application/json', json.dumps(policy_set, indent=2).encode()
+
+
+ROUTES = {
+    '/to-gemara': to_gemara,
+    '/to-ampel': to_ampel,
+}
+
+
+def _warm_up():
+    """Import both converters in a worker before the first request arrives."""
+    load_ampel_to_gemara()
+    load_gemara_to_ampel()
+
+
+class ConversionService:
+    """Minimal HTTP/1.1 server dispatching conversions to an executor."""
+
+    def __init__(self, executor: concurrent.futures.Executor):
+        self.executor = executor
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ConversionError as e:
+                    # The rest of the request cannot be trusted, so answer and close
+                    await self._respond(writer, *_error(e.status, str(e)), keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+                status, content_type, payload = await self._dispatch(method, path, body)
+                keep_alive = _keep_alive(version, headers)
+                await self._respond(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, writer: asyncio.StreamWriter, status: int, content_type: str, payload: bytes, keep_alive: bool
+    ):
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _read_line(reader: asyncio.StreamReader, status: int, what: str) -> bytes:
+        try:
+            return await reader.readline()
+        except ValueError:
+            # readline raises ValueError when a line exceeds the StreamReader limit
+            raise ConversionError(status, f"{what} exceeds {MAX_LINE} bytes") from None
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        line = await self._read_line(reader, 414, "Request line")
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ConversionError(400, "Malformed request line")
+        method, path, version = parts
+
+        headers = {}
+        while True:
+            line = await self._read_line(reader, 431, "Header line")
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = headers.get('content-length', '0')
+        if not length.isdigit():
+            raise ConversionError(400, f"Invalid Content-Length: {length!r}")
+        length = int(length)
+        if length > MAX_BODY:
+            raise ConversionError(413, f"Request body exceeds {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?', 1)[0], version, headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, str, bytes]:
+        if path == '/health':
+            return 200, 'application/json', b'{"status": "ok"}'
+
+        convert = ROUTES.get(path)
+        if convert is None:
+            return _error(404, f"Unknown endpoint: {path}")
+        if method != 'POST':
+            return _error(405, f"{path} only accepts POST")
+
+        loop = asyncio.get_running_loop()
+        try:
+            content_type, payload = await loop.run_in_executor(self.executor, convert, body)
+        except ConversionError as e:
+            return _error(e.status, str(e))
+        except Exception as e:
+            return _error(500, f"Error during conversion: {e}")
+        return 200, content_type, payload
+
+
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Content Too Large',
+    414: 'URI Too Long',
+    422: 'Unprocessable Entity',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+
+def _error(status: int, message: str) -> Tuple[int, str, bytes]:
+    return status, 'application/json', json.dumps({'error': message}).encode()
+
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    """HTTP/1.1 connections persist unless closed; HTTP/1.0 ones only when asked to."""
+    connection = {token.strip() for token in headers.get('connection', '').lower().split(',')}
+    if version == 'HTTP/1.0':
+        return 'keep-alive' in connection
+    return 'close' not in connection
+
+
+async def serve(args: argparse.Namespace):
+    # Loaded before the pool starts so forked workers inherit the imports
+    _warm_up()
+
+    if args.workers == 0:
+        # Convert in threads of this process; fine for small inputs
+        executor = concurrent.futures.ThreadPoolExecutor()
+    else:
+        workers = args.workers or os.cpu_count() or 1
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        # Start every worker now so the first requests do not pay for it
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(executor, _warm_up) for _ in range(workers)])
+
+    service = ConversionService(executor)
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle, path=args.unix, limit=MAX_LINE)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(service.handle, host=args.host, port=args.port, limit=MAX_LINE)
+        where = f"http://{args.host}:{args.port}"
+
+    print(f"Conversion service listening on {where}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if sys.version_info >= (3, 9):
+            executor.shutdown(cancel_futures=True)
+        else:
+            executor.shutdown()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ampel <-> Gemara conversions from a resident process.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on (default: %(default)s)")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int,
+                        help="worker processes (default: CPU count; 0 converts in threads)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
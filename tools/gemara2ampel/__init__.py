@@ -0,0 +1,4 @@
+"""
+Gemara Layer 3 -> ampel PolicySets: the `gemara_to_ampel.py` converter and its
+catalog index.
+"""
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Id index over Gemara Layer 1 guidance and Layer 2 control catalogs.
+
+Layer 3 modifications only name their target by `reference-id` and
+`target-id`. The index maps those ids to the catalog's controls, assessment
+requirements and guidelines so the converter can fill in titles, objectives
+and requirement text with one dict lookup per modification.
+
+Building an index means parsing the catalog YAML, so each index is cached on
+disk as JSON under the sha256 of the catalog file; a warm run reads the cache
+and never parses the catalog again. Editing a catalog changes its hash and
+rebuilds its index.
+
+Usage:
+    python catalog_index.py <catalog.yaml|directory>... [--lookup REFERENCE-ID TARGET-ID]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import yaml
+
+if __package__:
+    from ..tool_modules import default_cache_dir
+else:
+    # Run as a script from a checkout: tool_modules.py is in the parent directory
+    import runpy
+    default_cache_dir = runpy.run_path(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tool_modules.py')
+    )['default_cache_dir']
+
+
+def _pick(data: Dict[str, Any], *fields: str) -> Dict[str, Any]:
+    return {field: data[field] for field in fields if data.get(field)}
+
+
+def iter_catalog_entries(catalog: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (id, entry) for every control, assessment requirement and guideline.
+
+    Entries use the field names of Layer 3 modifications (`title`,
+    `objective`, `text`, `applicability`, `recommendation(s)`), so a resolved
+    entry can be merged directly under a modification.
+    """
+    controls = list(catalog.get('controls') or [])
+    for family in catalog.get('control-families') or []:
+        controls.extend(family.get('controls') or [])
+    for control in controls:
+        if not control.get('id'):
+            continue
+        yield control['id'], dict(_pick(control, 'title', 'objective'), kind='control')
+        for requirement in control.get('assessment-requirements') or []:
+            if requirement.get('id'):
+                yield requirement['id'], dict(
+                    _pick(requirement, 'text', 'applicability', 'recommendation'),
+                    kind='assessment-requirement',
+                    control=control['id']
+                )
+
+    guidelines = list(catalog.get('guidelines') or [])
+    for category in catalog.get('categories') or []:
+        guidelines.extend(category.get('guidelines') or [])
+    for guideline in guidelines:
+        if guideline.get('id'):
+            yield guideline['id'], dict(
+                _pick(guideline, 'title', 'objective', 'recommendations'),
+                kind='guideline'
+            )
+
+
+class CatalogIndex:
+    """Entries of one or more catalogs, indexed by catalog id and entry id."""
+
+    # Bump when the cached index layout changes
+    VERSION = 1
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.catalogs = {}
+        self.digests = []
+        self.parsed = 0
+        self.cached = 0
+        self.error = None
+        self._by_id = {}
+
+    def add(self, path: str) -> str:
+        """Index a catalog file (or every YAML file under a directory); returns its id."""
+        if Path(path).is_dir():
+            ids = [self.add(str(p)) for p in sorted(Path(path).rglob('*')) if p.suffix in ('.yaml', '.yml')]
+            return ','.join(ids)
+
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        index = self._load_cached(digest)
+        if index is None:
+            index = self._build(content, path)
+            self._store_cached(digest, index)
+
+        self.digests.append(digest)
+        self.catalogs[index['id']] = index['entries']
+        for entry_id, entry in index['entries'].items():
+            self._by_id.setdefault(entry_id, entry)
+        return index['id']
+
+    def _build(self, content: bytes, path: str) -> Dict[str, Any]:
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        catalog = yaml.load(content, Loader=loader)
+        if not isinstance(catalog, dict):
+            raise ValueError(f"{path}: expected a YAML mapping at the top level")
+        self.parsed += 1
+        return {
+            'version': self.VERSION,
+            'id': (catalog.get('metadata') or {}).get('id') or Path(path).stem,
+            'entries': dict(iter_catalog_entries(catalog))
+        }
+
+    def _load_cached(self, digest: str) -> Optional[Dict[str, Any]]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f'{digest}.json', 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(index, dict) or index.get('version') != self.VERSION:
+            return None
+        self.cached += 1
+        return index
+
+    def _store_cached(self, digest: str, index: Dict[str, Any]):
+        if self.cache_dir is None:
+            return
+        # Written under a temporary name so concurrent workers never read a partial file
+        temporary = self.cache_dir / f'{digest}.{os.getpid()}.tmp'
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(temporary, 'w') as f:
+                json.dump(index, f, separators=(',', ':'))
+            os.replace(temporary, self.cache_dir / f'{digest}.json')
+        except OSError as e:
+            # The cache is an optimisation only: carry on uncached for the rest of the run
+            self.error = e
+            self.cache_dir = None
+            print(f"Warning: catalog index cache disabled: {e}", file=sys.stderr)
+            with contextlib.suppress(OSError):
+                temporary.unlink()
+
+    def digest(self) -> str:
+        """Hash of every indexed catalog, for invalidating derived output."""
+        return hashlib.sha256(','.join(sorted(self.digests)).encode()).hexdigest()
+
+    def resolve(self, reference_id: str, target_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a modification target in its catalog.
+
+        Only when `reference_id` names no indexed catalog is the target looked
+        up in any catalog defining the id.
+        """
+        entries = self.catalogs.get(reference_id)
+        if entries is not None:
+            return entries.get(target_id)
+        return self._by_id.get(target_id)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the Gemara catalog index cache.")
+    parser.add_argument('catalogs', nargs='+', help="Layer 1/2 catalog YAML files or directories")
+    parser.add_argument('--cache-dir', default=os.path.join(default_cache_dir('gemara-to-ampel'), 'catalogs'),
+                        help="index cache directory (default: %(default)s)")
+    parser.add_argument('--lookup', nargs=2, metavar=('REFERENCE_ID', 'TARGET_ID'),
+                        help="print the entry a modification target resolves to")
+    args = parser.parse_args()
+
+    index = CatalogIndex(args.cache_dir)
+    for path in args.catalogs:
+        index.add(path)
+
+    if args.lookup:
+        entry = index.resolve(*args.lookup)
+        if entry is None:
+            print(f"Error: {args.lookup[1]} not found in {args.lookup[0]}")
+            sys.exit(1)
+        print(json.dumps(entry, indent=2))
+        return
+
+    print(f"Indexed {len(index)} entries from {len(index.catalogs)} catalog(s) "
+          f"({index.parsed} parsed, {index.cached} from cache)")
+    for catalog_id, entries in index.catalogs.items():
+        print(f"  {catalog_id}: {len(entries)}")
+
+
+if __name__ == '__main__':
+    main()
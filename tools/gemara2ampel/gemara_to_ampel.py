@@ -7,43 +7,255 @@ Ampel PolicySet in JSON format. The conversion creates policy templates that
 need to be completed with actual CEL evaluation code.
 
 Usage:
-    python gemara_to_ampel.py <input_yaml> [output_json]
+    python gemara_to_ampel.py <input_yaml> [output_json] [--stats] [--stats-json FILE]
+    python gemara_to_ampel.py --batch <input_dir> [output_dir] [--workers N]
 
 Examples:
     python gemara_to_ampel.py policy.yaml
     python gemara_to_ampel.py policy.yaml ampel-policy.json
 """
 
+import argparse
+import collections
+import contextlib
+import functools
+import hashlib
+import marshal
+import os
 import sys
 import json
+import time
 import yaml
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional, TextIO, Tuple
 from datetime import datetime, timezone
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+if __package__:
+    from ..tool_modules import default_cache_dir, import_module
+else:
+    # Run as a script from a checkout: tool_modules.py is in the parent directory
+    import runpy
+    _tool_modules = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tool_modules.py'))
+    default_cache_dir, import_module = _tool_modules['default_cache_dir'], _tool_modules['import_module']
+
+
+def load_schema_validation():
+    """Import tools/schema_validation.py, which is shared with ampel_to_gemara.py."""
+    return import_module('schema_validation')
+
+
+def validate_gemara_policy(gemara_policy: Any):
+    """Raise SchemaError (a ValueError) naming the first field that does not fit Layer 3."""
+    load_schema_validation().validate_layer3_policy(gemara_policy)
+
+
+class PolicyCache:
+    """Parsed Layer 3 policies kept on disk in marshal format, one file per policy path.
+
+    An entry is used without reading the policy while the file's mtime and
+    size are unchanged. When they changed but the content hash did not (after
+    a checkout or `touch`), the entry is refreshed without parsing. marshal
+    only stores plain data and never runs code on load; a policy containing
+    values it cannot store (YAML timestamps) is simply not cached.
+
+    The cache is an optimisation only: an unreadable entry is a miss, and an
+    error creating or writing the cache directory disables the cache for the
+    rest of the run while policies are still parsed.
+    """
+
+    # Bump when the stored layout or the parsed representation changes
+    VERSION = 2
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self.error = None
+
+    def _disable(self, error: Exception):
+        """Stop using the cache after an error; the conversion itself carries on."""
+        if self.error is None:
+            self.error = error
+            print(f"Warning: policy cache disabled: {error}", file=sys.stderr)
+
+    def _entry_path(self, filepath: str) -> Path:
+        key = f'{self.VERSION}:{YamlLoader.__name__}:{os.path.abspath(filepath)}'
+        return self.directory / (hashlib.sha256(key.encode()).hexdigest() + '.marshal')
+
+    def load(self, filepath: str) -> Any:
+        """Return the parsed policy at `filepath`, parsing it only on a miss."""
+        if self.error is not None:
+            self.misses += 1
+            with open(filepath, 'rb') as f:
+                return yaml.load(f, Loader=YamlLoader)
+
+        info = os.stat(filepath)
+        entry_path = self._entry_path(filepath)
+        try:
+            with open(entry_path, 'rb') as f:
+                mtime, size, digest, data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            mtime = size = digest = data = None
+
+        if (mtime, size) == (info.st_mtime_ns, info.st_size):
+            self.hits += 1
+            return data
+
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        content_digest = hashlib.sha256(content).hexdigest()
+        if content_digest == digest:
+            self.hits += 1
+        else:
+            self.misses += 1
+            data = yaml.load(content, Loader=YamlLoader)
+        self._store(entry_path, (info.st_mtime_ns, info.st_size, content_digest, data))
+        return data
+
+    def _store(self, entry_path: Path, entry: Tuple[int, int, str, Any]):
+        try:
+            content = marshal.dumps(entry)
+        except ValueError:
+            # Holds a value marshal cannot store, such as a datetime
+            return
+        # Written under a temporary name so concurrent workers never read a partial file
+        temporary = entry_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(temporary, 'wb') as f:
+                f.write(content)
+            os.replace(temporary, entry_path)
+        except OSError as e:
+            self._disable(e)
+            with contextlib.suppress(OSError):
+                temporary.unlink()
+
 
 class GemaraToAmpelConverter:
     """Converts Gemara Layer 3 policies to Ampel policy format."""
 
-    def __init__(self):
+    # Bump when the generated policies change shape, invalidating manifests
+    MANIFEST_VERSION = 1
+
+    def __init__(
+        self,
+        deterministic: bool = False,
+        catalogs=None,
+        compact: bool = False,
+        policy_cache: Optional[PolicyCache] = None
+    ):
         self.runtime_version = "cel@v14.0"
+        self.deterministic = deterministic
+        self.compact = compact
+        # (bytes before, bytes after, shared values) of the last compacted save
+        self.compaction = None
+        # Optional CatalogIndex used to fill in modification targets
+        self.catalogs = catalogs
+        self.policy_cache = policy_cache
 
     def load_gemara_policy(self, filepath: str) -> Dict[str, Any]:
-        """Load a Gemara Layer 3 policy from YAML file."""
-        with open(filepath, 'r') as f:
-            return yaml.safe_load(f)
+        """Load a Gemara Layer 3 policy from YAML file (via the policy cache, if any)."""
+        if self.policy_cache is not None:
+            return self.policy_cache.load(filepath)
+        with open(filepath, 'rb') as f:
+            return yaml.load(f, Loader=YamlLoader)
+
+    @staticmethod
+    def source_digest(data: Any) -> str:
+        """Hash parsed YAML content independently of formatting and key order."""
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+        return 'sha256:' + hashlib.sha256(canonical.encode()).hexdigest()
 
     def convert(self, gemara_policy: Dict[str, Any]) -> Dict[str, Any]:
         """Convert Gemara Layer 3 policy to Ampel PolicySet format."""
 
+        metadata = gemara_policy.get('metadata', {})
+        scope = gemara_policy.get('scope', {})
+
+        # Convert policies from guidance and control references
+        policies = []
+        for _, ref, mapping_type in self._iter_mappings(gemara_policy):
+            policies.extend(self._convert_policy_mapping(
+                ref,
+                mapping_type,
+                metadata,
+                scope
+            ))
+
+        return self._build_policy_set(gemara_policy, policies)
+
+    def convert_incremental(
+        self,
+        gemara_policy: Dict[str, Any],
+        previous_output: Optional[Dict[str, Any]] = None,
+        previous_entry: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+        """Convert, reusing the policies of mappings that did not change.
+
+        `previous_entry` is the manifest entry written alongside
+        `previous_output` by the last run: the digest of each reference
+        mapping and the slice of `policies` it generated. Mappings whose
+        digest still matches are copied from the previous output instead of
+        being regenerated. Returns the PolicySet, the new manifest entry and
+        the keys of the mappings that were regenerated.
+        """
+        metadata = gemara_policy.get('metadata', {})
+        scope = gemara_policy.get('scope', {})
+
+        previous_policies = (previous_output or {}).get('policies', [])
+        previous_mappings = {}
+        if previous_entry and previous_entry.get('version') == self.MANIFEST_VERSION:
+            previous_mappings = previous_entry.get('mappings', {})
+
+        catalogs_digest = self.catalogs_digest()
+        policies = []
+        mappings = {}
+        regenerated = []
+        for key, ref, mapping_type in self._iter_mappings(gemara_policy):
+            # Everything _convert_policy_mapping reads goes into the digest
+            digest = self.source_digest([ref, mapping_type, metadata, scope, self.runtime_version, catalogs_digest])
+            previous = previous_mappings.get(key)
+            if previous and previous['digest'] == digest and previous['end'] <= len(previous_policies):
+                generated = previous_policies[previous['start']:previous['end']]
+            else:
+                generated = self._convert_policy_mapping(ref, mapping_type, metadata, scope)
+                regenerated.append(key)
+            mappings[key] = {'digest': digest, 'start': len(policies), 'end': len(policies) + len(generated)}
+            policies.extend(generated)
+
+        entry = {
+            'version': self.MANIFEST_VERSION,
+            'source-digest': self.source_digest(gemara_policy),
+            'catalogs-digest': catalogs_digest,
+            'compact': self.compact,
+            'mappings': mappings
+        }
+        return self._build_policy_set(gemara_policy, policies), entry, regenerated
+
+    def catalogs_digest(self) -> Optional[str]:
+        """Digest of the catalogs used to resolve modifications, or None without catalogs."""
+        return self.catalogs.digest() if self.catalogs is not None else None
+
+    def _iter_mappings(self, gemara_policy: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+        """Yield (manifest key, mapping, mapping type) for every reference mapping."""
+        for mapping_type, field in (("guidance", 'guidance-references'), ("control", 'control-references')):
+            for index, ref in enumerate(gemara_policy.get(field, [])):
+                yield f"{mapping_type}/{index}/{ref.get('reference-id', 'unknown')}", ref, mapping_type
+
+    def _build_policy_set(self, gemara_policy: Dict[str, Any], policies: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Wrap converted policies in the PolicySet envelope."""
+
         metadata = gemara_policy.get('metadata', {})
         org_id = gemara_policy.get('organization-id', '')
         title = gemara_policy.get('title', '')
         purpose = gemara_policy.get('purpose', '')
         scope = gemara_policy.get('scope', {})
         contacts = gemara_policy.get('contacts', {})
-        guidance_refs = gemara_policy.get('guidance-references', [])
-        control_refs = gemara_policy.get('control-references', [])
         impl_plan = gemara_policy.get('implementation-plan', {})
 
         # Create the PolicySet
@@ -53,38 +265,22 @@ class GemaraToAmpelConverter:
             "meta": {
                 "description": purpose or title,
                 "source": "Converted from Gemara Layer 3 Policy",
-                "organization-id": org_id,
-                "converted-at": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+                "organization-id": org_id
             }
         }
 
+        # Reproducible output identifies the source instead of the run time
+        if self.deterministic:
+            policy_set["meta"]["source-digest"] = self.source_digest(gemara_policy)
+        else:
+            policy_set["meta"]["converted-at"] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
         # Add common context from scope
         if scope:
             policy_set["common"] = {
                 "context": self._create_context_from_scope(scope)
             }
 
-        # Convert policies from guidance and control references
-        policies = []
-
-        # Process guidance references
-        for ref in guidance_refs:
-            policies.extend(self._convert_policy_mapping(
-                ref,
-                "guidance",
-                metadata,
-                scope
-            ))
-
-        # Process control references
-        for ref in control_refs:
-            policies.extend(self._convert_policy_mapping(
-                ref,
-                "control",
-                metadata,
-                scope
-            ))
-
         # If no references with modifications, create a basic policy template
         if not policies:
             policies.append(self._create_basic_policy(
@@ -204,6 +400,15 @@ class GemaraToAmpelConverter:
         """Create an Ampel policy from a Gemara modification."""
 
         target_id = modification.get('target-id', 'unknown')
+
+        # Fields the modification leaves out come from the referenced catalog
+        if self.catalogs is not None:
+            entry = self.catalogs.resolve(reference_id, target_id)
+            if entry is not None:
+                resolved = {k: v for k, v in entry.items() if k not in ('kind', 'control')}
+                resolved.update((k, v) for k, v in modification.items() if v or k not in resolved)
+                modification = resolved
+
         mod_type = modification.get('modification-type', 'clarify')
         rationale = modification.get('modification-rationale', '')
 
@@ -447,19 +652,686 @@ class GemaraToAmpelConverter:
 
         return metadata
 
-    def save_ampel_policy(self, policy_set: Dict[str, Any], filepath: str):
-        """Save Ampel PolicySet to JSON file."""
+    def save_ampel_policy(self, policy_set: Dict[str, Any], filepath: str, quiet: bool = False) -> bool:
+        """Save Ampel PolicySet to JSON file.
+
+        Deterministic output is written with sorted keys and an identical
+        existing file is left untouched, so its mtime only changes with its
+        content. With `compact`, repeated tenets and predicate specs are
+        hoisted first (see `compact_policy_set`). Returns whether the file
+        was written.
+        """
+
+        if self.compact:
+            compacted, shared = compact_policy_set(policy_set)
+            text = json.dumps(compacted, indent=2, sort_keys=self.deterministic)
+            self.compaction = (len(json.dumps(policy_set, indent=2).encode()), len(text.encode()), shared)
+        else:
+            text = json.dumps(policy_set, indent=2, sort_keys=self.deterministic)
+        if self.deterministic and _read_text(filepath) == text:
+            if not quiet:
+                print(f"✓ Ampel PolicySet up to date: {filepath}")
+            return False
 
         with open(filepath, 'w') as f:
-            json.dump(policy_set, f, indent=2)
+            f.write(text)
 
-        print(f"✓ Ampel PolicySet saved to: {filepath}")
+        if not quiet:
+            print(f"✓ Ampel PolicySet saved to: {filepath}")
+        return True
 
+    def save_sharded(
+        self,
+        policy_set: Dict[str, Any],
+        directory: str,
+        by: str = 'size',
+        size: Optional[int] = None,
+        quiet: bool = False
+    ) -> Dict[str, Any]:
+        """Save a PolicySet as shards plus a manifest listing them; returns the manifest.
+
+        Each shard is a complete PolicySet (see `shard_policy_set`) written
+        with `save_ampel_policy`, so `compact` and `deterministic` apply per
+        shard. Shards listed by the previous manifest that are not part of
+        this run are removed.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = directory / SHARD_MANIFEST_NAME
+        previous = load_shard_manifest(str(manifest_path))
+
+        shards = shard_policy_set(policy_set, by, size)
+        width = len(str(len(shards)))
+        entries = []
+        before = after = shared = 0
+        for index, (key, shard) in enumerate(shards, start=1):
+            number = str(index).zfill(width)
+            name = f"shard-{number}.ampel.json" if by == 'size' else f"{number}-{_slug(key)}.ampel.json"
+            self.save_ampel_policy(shard, str(directory / name), quiet=True)
+            if self.compact:
+                before += self.compaction[0]
+                after += self.compaction[1]
+                shared += self.compaction[2]
+            with open(directory / name, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            entries.append({
+                'file': name,
+                'key': key,
+                'policies': [policy.get('id', '') for policy in shard['policies']],
+                'sha256': digest
+            })
+        if self.compact:
+            self.compaction = (before, after, shared)
+
+        current = {entry['file'] for entry in entries}
+        for entry in previous.get('shards', []):
+            if entry.get('file') not in current:
+                with contextlib.suppress(OSError):
+                    (directory / Path(entry['file']).name).unlink()
+
+        manifest = {
+            'version': SHARD_MANIFEST_VERSION,
+            'policy-set': policy_set.get('id', ''),
+            'shard-by': by,
+            'shard-size': size,
+            'policies': sum(len(entry['policies']) for entry in entries),
+            'shards': entries
+        }
+        text = json.dumps(manifest, indent=2)
+        if not (self.deterministic and _read_text(str(manifest_path)) == text):
+            with open(manifest_path, 'w') as f:
+                f.write(text)
+
+        if not quiet:
+            print(f"✓ {len(entries)} Ampel PolicySet shard(s) saved to: {directory}")
+        return manifest
+
+
+# Marks a value stored once in `common.shared` by compact_policy_set
+SHARED_REF = '$shared'
+
+# Tenet blocks that are shared on their own when the whole tenet is not
+TENET_BLOCKS = ('outputs', 'assessment', 'error')
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def compact_policy_set(policy_set: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Hoist structurally identical tenets and predicate specs into `common`.
+
+    Every tenet, tenet block (`outputs`, `assessment`, `error`) or
+    `predicates` spec that occurs more than once is stored once in
+    `common.shared` and replaced by `{"$shared": <index>}`. Values too small
+    to gain from a reference are left inline. `expand_policy_set` restores
+    the original PolicySet. Returns the compacted PolicySet and the number of
+    shared values.
+    """
+    policies = policy_set.get('policies', [])
+    tenet_keys = [[_canonical(t) for t in p.get('tenets', [])] for p in policies]
+    tenet_counts = collections.Counter(k for keys in tenet_keys for k in keys)
+    predicate_counts = collections.Counter(_canonical(p['predicates']) for p in policies if 'predicates' in p)
+    block_counts = collections.Counter(
+        _canonical(t[block])
+        for p, keys in zip(policies, tenet_keys)
+        for t, key in zip(p.get('tenets', []), keys) if tenet_counts[key] < 2
+        for block in TENET_BLOCKS if block in t
+    )
+
+    shared = []
+    index = {}
+    min_size = len(_canonical({SHARED_REF: 0})) + 8
+
+    def share(value: Any, key: str, counts: collections.Counter) -> Any:
+        if counts[key] < 2 or len(key) < min_size:
+            return value
+        if key not in index:
+            index[key] = len(shared)
+            shared.append(value)
+        return {SHARED_REF: index[key]}
+
+    compacted_policies = []
+    for policy, keys in zip(policies, tenet_keys):
+        policy = dict(policy)
+        if 'predicates' in policy:
+            policy['predicates'] = share(policy['predicates'], _canonical(policy['predicates']), predicate_counts)
+        tenets = []
+        for tenet, key in zip(policy.get('tenets', []), keys):
+            if tenet_counts[key] >= 2:
+                tenets.append(share(tenet, key, tenet_counts))
+                continue
+            # Blocks are numbered in canonical field order, so a tenet reused from a
+            # previous --incremental run (read back with sorted keys) gets the same indexes
+            blocks = {
+                field: share(tenet[field], _canonical(tenet[field]), block_counts)
+                for field in sorted(tenet) if field in TENET_BLOCKS
+            }
+            tenets.append({field: blocks.get(field, value) for field, value in tenet.items()})
+        if 'tenets' in policy:
+            policy['tenets'] = tenets
+        compacted_policies.append(policy)
+
+    if not shared:
+        return policy_set, 0
+
+    compacted = dict(policy_set)
+    compacted['common'] = dict(policy_set.get('common', {}), shared=shared)
+    compacted['policies'] = compacted_policies
+    return compacted, len(shared)
+
+
+def expand_policy_set(policy_set: Dict[str, Any]) -> Dict[str, Any]:
+    """Inline the shared values of a PolicySet written by `compact_policy_set`."""
+    shared = policy_set.get('common', {}).get('shared')
+    if shared is None:
+        return policy_set
+
+    def resolve(value: Any) -> Any:
+        if isinstance(value, dict) and len(value) == 1 and SHARED_REF in value:
+            return shared[value[SHARED_REF]]
+        return value
+
+    policies = []
+    for policy in policy_set.get('policies', []):
+        policy = dict(policy)
+        if 'predicates' in policy:
+            policy['predicates'] = resolve(policy['predicates'])
+        if 'tenets' in policy:
+            policy['tenets'] = [
+                {field: resolve(value) for field, value in resolve(tenet).items()}
+                for tenet in policy['tenets']
+            ]
+        policies.append(policy)
+
+    expanded = dict(policy_set)
+    common = {key: value for key, value in policy_set['common'].items() if key != 'shared'}
+    if common:
+        expanded['common'] = common
+    else:
+        del expanded['common']
+    expanded['policies'] = policies
+    return expanded
+
+
+SHARD_MANIFEST_NAME = 'manifest.json'
+SHARD_MANIFEST_VERSION = 1
+SHARD_KEYS = ('framework', 'reference-id', 'size')
+
+
+def _shard_key(policy: Dict[str, Any], by: str) -> str:
+    meta = policy.get('meta') or {}
+    if by == 'framework':
+        for control in meta.get('controls') or []:
+            if isinstance(control, dict) and control.get('framework'):
+                return str(control['framework'])
+    # Generated policies name their framework or catalog only by reference-id
+    return str(meta.get('reference-id') or 'unassigned')
+
+
+def _slug(key: str) -> str:
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in key).strip('.') or 'shard'
+
+
+def shard_policy_set(
+    policy_set: Dict[str, Any],
+    by: str = 'size',
+    size: Optional[int] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Split a PolicySet into (key, PolicySet) shards that verify independently.
+
+    `by` is `framework` (the framework of a policy's first control, falling
+    back to its reference-id), `reference-id`, or `size` (consecutive runs
+    of `size` policies, default 50). With a key and a `size`, groups larger
+    than `size` are split further. Every shard keeps the set's id, `meta`
+    and `common` context, and records its place in `meta.shard`.
+    """
+    if by not in SHARD_KEYS:
+        raise ValueError(f"shard key must be one of {', '.join(SHARD_KEYS)}, got {by!r}")
+    policies = policy_set.get('policies', [])
+    if by == 'size':
+        size = size or 50
+        groups = {'': policies}
+    else:
+        groups = {}
+        for policy in policies:
+            groups.setdefault(_shard_key(policy, by), []).append(policy)
+
+    chunks = []
+    for key, group in groups.items():
+        step = size or len(group) or 1
+        parts = [group[start:start + step] for start in range(0, len(group), step)] or [[]]
+        for number, part in enumerate(parts, start=1):
+            if by == 'size':
+                label = str(number)
+            else:
+                label = key if len(parts) == 1 else f"{key}-{number}"
+            chunks.append((label, part))
+
+    shards = []
+    for index, (label, part) in enumerate(chunks, start=1):
+        shard = dict(policy_set)
+        shard['meta'] = dict(policy_set.get('meta') or {}, shard={
+            'by': by, 'key': label, 'index': index, 'count': len(chunks)
+        })
+        shard['policies'] = part
+        shards.append((label, shard))
+    return shards
+
+
+def load_shard_manifest(filepath: str) -> Dict[str, Any]:
+    """Load a shard manifest written by `save_sharded`; a missing or unreadable one is empty."""
+    try:
+        with open(filepath, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != SHARD_MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def _read_text(filepath: str) -> Optional[str]:
+    try:
+        with open(filepath, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def load_manifest(filepath: str) -> Dict[str, Any]:
+    """Load an incremental-build manifest; a missing or unreadable one is empty."""
+    try:
+        with open(filepath, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if not isinstance(manifest, dict) or manifest.get('version') != GemaraToAmpelConverter.MANIFEST_VERSION:
+        return {'version': GemaraToAmpelConverter.MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+
+def save_manifest(filepath: str, manifest: Dict[str, Any]):
+    with open(filepath, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def compile_incremental(
+    converter: GemaraToAmpelConverter,
+    gemara_policy: Dict[str, Any],
+    output_file: str,
+    previous_entry: Optional[Dict[str, Any]] = None,
+    quiet: bool = False
+) -> Tuple[Dict[str, Any], Dict[str, Any], Optional[List[str]]]:
+    """Regenerate output_file from gemara_policy, reusing unchanged mappings.
+
+    When the whole source digest and the catalogs digest match
+    `previous_entry` and the output still exists, nothing is converted and the regenerated keys are None.
+    """
+    previous_output = None
+    text = _read_text(output_file)
+    if text is not None:
+        try:
+            previous_output = json.loads(text)
+        except ValueError:
+            previous_output = None
+
+    if (isinstance(previous_output, dict) and previous_entry
+            and previous_entry.get('version') == converter.MANIFEST_VERSION
+            and previous_entry.get('compact', False) == converter.compact
+            and previous_entry.get('source-digest') == converter.source_digest(gemara_policy)
+            and previous_entry.get('catalogs-digest') == converter.catalogs_digest()):
+        if not quiet:
+            print(f"✓ Ampel PolicySet up to date: {output_file}")
+        return previous_output, previous_entry, None
+
+    policy_set, entry, regenerated = converter.convert_incremental(
+        gemara_policy,
+        expand_policy_set(previous_output) if isinstance(previous_output, dict) else None,
+        previous_entry
+    )
+    converter.save_ampel_policy(policy_set, output_file, quiet=quiet)
+    return policy_set, entry, regenerated
+
+
+# Incremental-build manifest kept in a batch output directory
+MANIFEST_NAME = '.ampel-manifest.json'
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalogs(paths: Tuple[str, ...], cache_dir: Optional[str] = None):
+    """Build the CatalogIndex for the given catalogs once per process (see catalog_index.py)."""
+    index = import_module('gemara2ampel.catalog_index').CatalogIndex(cache_dir)
+    for path in paths:
+        index.add(path)
+    return index
+
+
+def find_policy_files(directory: str) -> List[Path]:
+    """Return the Gemara Layer 3 YAML files under a directory tree, sorted."""
+    return sorted(
+        p for p in Path(directory).rglob('*')
+        if p.suffix in ('.yaml', '.yml') and p.is_file()
+    )
+
+
+def compile_policy_file(
+    path: Path,
+    base: Path,
+    output_dir: Path,
+    deterministic: bool = False,
+    manifest: Optional[Dict[str, Any]] = None,
+    catalogs: Tuple[str, ...] = (),
+    catalog_cache: Optional[str] = None,
+    compact: bool = False,
+    policy_cache: Optional[str] = None,
+    validate: bool = True,
+    shard_by: Optional[str] = None,
+    shard_size: Optional[int] = None
+) -> Tuple[str, int, Optional[str], Optional[Dict[str, Any]], bool, int]:
+    """Convert one policy file in a worker, mirroring its path under output_dir.
+
+    Errors are returned rather than raised so one bad file does not stop the
+    batch. With a `manifest` (incremental mode) the file's previous entry is
+    used to skip or partially regenerate it. With `shard_by` the output is a
+    `.ampel-shards` directory (see `save_sharded`). Returns the input path, the
+    number of generated policies, the error message if any, the new manifest
+    entry, whether anything was regenerated and the bytes saved by `compact`.
+    """
+    entry = None
+    changed = True
+    try:
+        converter = GemaraToAmpelConverter(
+            deterministic=deterministic or manifest is not None,
+            catalogs=load_catalogs(catalogs, catalog_cache) if catalogs else None,
+            compact=compact,
+            policy_cache=PolicyCache(policy_cache) if policy_cache else None
+        )
+        gemara_policy = converter.load_gemara_policy(str(path))
+        if validate:
+            try:
+                validate_gemara_policy(gemara_policy)
+            except ValueError as e:
+                return str(path), 0, f"Invalid Layer 3 policy: {e}", None, True, 0
+        elif not isinstance(gemara_policy, dict):
+            raise ValueError("expected a YAML mapping at the top level")
+
+        relative = path.relative_to(base)
+        target = output_dir / relative.with_suffix('.ampel.json')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if manifest is not None:
+            policy_set, entry, regenerated = compile_incremental(
+                converter, gemara_policy, str(target), manifest.get(relative.as_posix()), quiet=True
+            )
+            changed = regenerated is not None
+        elif shard_by:
+            policy_set = converter.convert(gemara_policy)
+            converter.save_sharded(policy_set, str(target.with_name(relative.stem + '.ampel-shards')),
+                                   shard_by, shard_size, quiet=True)
+        else:
+            policy_set = converter.convert(gemara_policy)
+            converter.save_ampel_policy(policy_set, str(target), quiet=True)
+    except yaml.YAMLError as e:
+        return str(path), 0, f"Error parsing YAML file: {e}", None, True, 0
+    except Exception as e:
+        return str(path), 0, f"Error during conversion: {e}", None, True, 0
+    saved = converter.compaction[0] - converter.compaction[1] if converter.compaction else 0
+    return str(path), len(policy_set.get('policies', [])), None, entry, changed, saved
+
+
+def compile_directory(
+    input_dir: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    deterministic: bool = False,
+    incremental: bool = False,
+    catalogs: Tuple[str, ...] = (),
+    catalog_cache: Optional[str] = None,
+    compact: bool = False,
+    policy_cache: Optional[str] = None,
+    validate: bool = True,
+    shard_by: Optional[str] = None,
+    shard_size: Optional[int] = None
+) -> Tuple[int, int, List[Tuple[str, str]], float, int, int]:
+    """Convert every policy under input_dir on a process pool.
+
+    In incremental mode the manifest in `output_dir/MANIFEST_NAME` records
+    what each output was generated from and unchanged files are skipped.
+    Returns the number of files and generated policies, the per-file errors,
+    the elapsed time in seconds, the number of files (re)generated and the
+    bytes saved by `compact`.
+    """
+    start = time.perf_counter()
+    base = Path(input_dir)
+    files = find_policy_files(input_dir)
+    workers = workers or os.cpu_count() or 1
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    manifest = load_manifest(str(manifest_path)) if incremental else None
+    compile_file = functools.partial(
+        compile_policy_file,
+        base=base,
+        output_dir=Path(output_dir),
+        deterministic=deterministic,
+        manifest=manifest['files'] if manifest else None,
+        catalogs=catalogs,
+        catalog_cache=catalog_cache,
+        compact=compact,
+        policy_cache=policy_cache,
+        validate=validate,
+        shard_by=shard_by,
+        shard_size=shard_size
+    )
+
+    if workers == 1 or len(files) <= 1:
+        outcomes = list(map(compile_file, files))
+    else:
+        # Only batch runs need a process pool, so the import is kept off the startup path
+        import concurrent.futures
+        chunksize = max(1, len(files) // (workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(compile_file, files, chunksize=chunksize))
+
+    if manifest is not None:
+        # Rebuilt from this run's outcomes so removed or failed files drop out
+        manifest['files'] = {
+            Path(path).relative_to(base).as_posix(): entry
+            for path, _, _, entry, _, _ in outcomes if entry is not None
+        }
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        save_manifest(str(manifest_path), manifest)
+
+    policies = sum(outcome[1] for outcome in outcomes)
+    errors = [(path, error) for path, _, error, _, _, _ in outcomes if error]
+    changed = sum(1 for outcome in outcomes if outcome[4])
+    saved = sum(outcome[5] for outcome in outcomes)
+    return len(files), policies, errors, time.perf_counter() - start, changed, saved
+
+
+def run_batch(args: argparse.Namespace):
+    """Compile a policy directory from the CLI and print a summary."""
+    if not Path(args.input_yaml).is_dir():
+        print(f"Error: Input directory not found: {args.input_yaml}")
+        sys.exit(1)
+
+    output_dir = args.output_json or args.input_yaml.rstrip('/') + '-ampel'
+    print(f"Converting Gemara Layer 3 policies to Ampel format...")
+    print(f"  Input:  {args.input_yaml}")
+    print(f"  Output: {output_dir}")
+    print()
+
+    files, policies, errors, elapsed, changed, saved = compile_directory(
+        args.input_yaml, output_dir, args.workers, args.deterministic, args.incremental,
+        tuple(args.catalog), catalog_cache(args), args.compact, policy_cache_dir(args),
+        not args.no_validate, args.shard_by, args.shard_size
+    )
+
+    for path, error in errors:
+        print(f"✗ {path}: {error}")
+    if errors:
+        print()
+
+    print("Batch Summary:")
+    print(f"  Files:        {files}")
+    print(f"  Converted:    {files - len(errors)}")
+    print(f"  Failed:       {len(errors)}")
+    if args.incremental:
+        print(f"  Regenerated:  {changed - len(errors)}")
+        print(f"  Up to date:   {files - changed}")
+    print(f"  Policies:     {policies}")
+    if args.compact:
+        print(f"  Bytes saved:  {saved}")
+    print(f"  Time:         {elapsed:.2f}s ({files / elapsed if elapsed else 0:.1f} files/s)")
+
+    if errors:
+        sys.exit(1)
 
-def main():
+
+def run_expand(args: argparse.Namespace):
+    """Write a --compact PolicySet back out with every shared value inlined."""
+    output_file = args.output_json or Path(args.input_yaml).stem + '.expanded.json'
+    try:
+        with open(args.input_yaml, 'r') as f:
+            policy_set = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading PolicySet: {e}")
+        sys.exit(1)
+    GemaraToAmpelConverter(deterministic=args.deterministic).save_ampel_policy(
+        expand_policy_set(policy_set), output_file
+    )
+
+
+class ConversionStats:
+    """Stage timers and counters collected for --stats."""
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_policy(self, gemara_policy: Dict[str, Any], policy_set: Dict[str, Any]):
+        """Count the references, modifications, policies and tenets of one conversion."""
+        references = (gemara_policy.get('guidance-references') or []) + \
+            (gemara_policy.get('control-references') or [])
+        self.count('references', len(references))
+        self.count('modifications', sum(
+            len(ref.get(key) or [])
+            for ref in references
+            for key in ('control-modifications', 'assessment-requirement-modifications',
+                        'guideline-modifications')
+        ))
+        policies = policy_set.get('policies', [])
+        self.count('policies', len(policies))
+        self.count('tenets', sum(len(p.get('tenets', [])) for p in policies))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'stages': {name: {'seconds': round(seconds, 6)} for name, seconds in self.timers.items()},
+            'counters': dict(self.counters)
+        }
+
+    def report(self, stream: TextIO = sys.stdout):
+        print("Conversion Statistics:", file=stream)
+        for name, seconds in self.timers.items():
+            print(f"  {name:18} {seconds * 1000:10.1f} ms", file=stream)
+        for name, value in self.counters.items():
+            print(f"  {name:18} {value:10}", file=stream)
+
+
+def catalog_cache(args: argparse.Namespace) -> Optional[str]:
+    if args.no_catalog_cache:
+        return None
+    return args.catalog_cache or os.path.join(default_cache_dir('gemara-to-ampel'), 'catalogs')
+
+
+def policy_cache_dir(args: argparse.Namespace) -> Optional[str]:
+    if args.no_policy_cache:
+        return None
+    return args.policy_cache or os.path.join(default_cache_dir('gemara-to-ampel'), 'policies')
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert Gemara Layer 3 policy files to Ampel PolicySet format."
+    )
+    parser.add_argument('input_yaml', help="Gemara Layer 3 policy YAML file (a directory with --batch)")
+    parser.add_argument('output_json', nargs='?',
+                        help="output Ampel PolicySet JSON file (default: <input>.ampel.json); "
+                             "with --batch, the output directory (default: <input>-ampel)")
+    batch = parser.add_argument_group('batch mode')
+    batch.add_argument('--batch', action='store_true',
+                       help="convert every .yaml/.yml file under the input directory in parallel, "
+                            "mirroring the tree in the output directory")
+    batch.add_argument('--workers', type=int, help="number of worker processes (default: CPU count)")
+    parser.add_argument('--no-validate', action='store_true',
+                        help="skip checking the Layer 3 policy against the schema before converting it")
+    catalogs = parser.add_argument_group('catalog resolution')
+    catalogs.add_argument('--catalog', action='append', default=[], metavar='PATH',
+                          help="Gemara Layer 1/2 catalog file or directory to resolve modification "
+                               "targets against (repeatable)")
+    catalogs.add_argument('--catalog-cache', metavar='DIR',
+                          help="catalog index cache directory (default: $XDG_CACHE_HOME/gemara-to-ampel/catalogs)")
+    catalogs.add_argument('--no-catalog-cache', action='store_true',
+                          help="always parse catalogs instead of using the index cache")
+    caching = parser.add_argument_group('policy cache')
+    caching.add_argument('--policy-cache', metavar='DIR',
+                         help="parsed-policy cache directory (default: $XDG_CACHE_HOME/gemara-to-ampel/policies)")
+    caching.add_argument('--no-policy-cache', action='store_true',
+                         help="always parse the input YAML instead of using the parsed-policy cache")
+    output = parser.add_argument_group('reproducible output')
+    output.add_argument('--deterministic', action='store_true',
+                        help="sort keys and record the source digest instead of the conversion time, "
+                             "so identical input produces byte-identical output")
+    output.add_argument('--compact', action='store_true',
+                        help="store repeated tenets and predicate specs once in common.shared "
+                             "(restore with --expand before use with ampel)")
+    output.add_argument('--expand', action='store_true',
+                        help="read a PolicySet written with --compact and write it with shared "
+                             "values inlined (default output: <input>.expanded.json)")
+    output.add_argument('--incremental', action='store_true',
+                        help="keep a manifest next to the output and only regenerate the reference "
+                             "mappings that changed since the last run (implies --deterministic)")
+    sharding = parser.add_argument_group('sharded output')
+    sharding.add_argument('--shard-by', choices=SHARD_KEYS,
+                          help="write the PolicySet as shards in a directory (default: <input>.ampel-shards), "
+                               "grouped by framework, reference-id or size, plus a manifest.json listing them")
+    sharding.add_argument('--shard-size', type=int, metavar='N',
+                          help="policies per shard (default with --shard-by size: 50); with a key, "
+                               "larger groups are split (implies --shard-by size when given alone)")
+    instrumentation = parser.add_argument_group('instrumentation')
+    instrumentation.add_argument('--stats', action='store_true',
+                                 help="print per-stage timings and counters")
+    instrumentation.add_argument('--stats-json', metavar='FILE',
+                                 help="write the statistics as JSON (implies collecting them)")
+    instrumentation.add_argument('--profile', metavar='FILE', help="write cProfile data for the run")
+    instrumentation.add_argument('--tracemalloc', action='store_true', help="record peak traced memory")
+    args = parser.parse_args(argv)
+    args.deterministic = args.deterministic or args.incremental
+    if args.shard_size is not None:
+        if args.shard_size < 1:
+            parser.error("--shard-size must be at least 1")
+        args.shard_by = args.shard_by or 'size'
+    if args.shard_by and (args.incremental or args.expand):
+        parser.error("--shard-by cannot be combined with --incremental or --expand")
+    mode = next((flag for flag, enabled in (('--batch', args.batch), ('--expand', args.expand)) if enabled), None)
+    if mode and (args.stats or args.stats_json or args.profile or args.tracemalloc):
+        parser.error(f"--stats, --stats-json, --profile and --tracemalloc cannot be combined with {mode}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
     """Main entry point for the converter."""
 
-    if len(sys.argv) < 2:
+    if not (sys.argv[1:] if argv is None else argv):
         print("Error: Input file required")
         print(f"\nUsage: {sys.argv[0]} <input_yaml> [output_json]")
         print("\nExamples:")
@@ -467,15 +1339,23 @@ def main():
         print(f"  {sys.argv[0]} policy.yaml ampel-policy.json")
         sys.exit(1)
 
-    input_file = sys.argv[1]
+    args = parse_args(argv)
+    if args.batch:
+        run_batch(args)
+        return
+    if args.expand:
+        run_expand(args)
+        return
+
+    input_file = args.input_yaml
 
     # Determine output file
-    if len(sys.argv) >= 3:
-        output_file = sys.argv[2]
+    if args.output_json:
+        output_file = args.output_json
     else:
-        # Default output: replace extension with .ampel.json
+        # Default output: replace extension with .ampel.json (a .ampel-shards directory when sharding)
         input_path = Path(input_file)
-        output_file = input_path.stem + '.ampel.json'
+        output_file = input_path.stem + ('.ampel-shards' if args.shard_by else '.ampel.json')
 
     # Validate input file exists
     if not Path(input_file).exists():
@@ -487,18 +1367,82 @@ def main():
     print(f"  Output: {output_file}")
     print()
 
+    stats = ConversionStats() if args.stats or args.stats_json else None
+    stage = stats.stage if stats is not None else lambda name: contextlib.nullcontext()
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+
     try:
         # Convert
-        converter = GemaraToAmpelConverter()
-        gemara_policy = converter.load_gemara_policy(input_file)
-        ampel_policy = converter.convert(gemara_policy)
-        converter.save_ampel_policy(ampel_policy, output_file)
+        policy_cache = policy_cache_dir(args)
+        converter = GemaraToAmpelConverter(
+            deterministic=args.deterministic,
+            compact=args.compact,
+            policy_cache=PolicyCache(policy_cache) if policy_cache else None
+        )
+        if args.catalog:
+            with stage('catalogs'):
+                converter.catalogs = load_catalogs(tuple(args.catalog), catalog_cache(args))
+        with stage('load'):
+            gemara_policy = converter.load_gemara_policy(input_file)
+        if not args.no_validate:
+            with stage('validate'):
+                try:
+                    validate_gemara_policy(gemara_policy)
+                except ValueError as e:
+                    print(f"Error: Invalid Layer 3 policy in {input_file}: {e}")
+                    sys.exit(1)
+        if args.incremental:
+            manifest_file = str(Path(output_file).with_suffix('.manifest.json'))
+            manifest = load_manifest(manifest_file)
+            with stage('convert'):
+                ampel_policy, entry, regenerated = compile_incremental(
+                    converter, gemara_policy, output_file, manifest['files'].get(Path(output_file).name)
+                )
+            manifest['files'][Path(output_file).name] = entry
+            save_manifest(manifest_file, manifest)
+        else:
+            with stage('convert'):
+                ampel_policy = converter.convert(gemara_policy)
+            with stage('save'):
+                if args.shard_by:
+                    shard_manifest = converter.save_sharded(ampel_policy, output_file, args.shard_by, args.shard_size)
+                else:
+                    converter.save_ampel_policy(ampel_policy, output_file)
+
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if stats is not None:
+                stats.count('peak_traced_bytes', peak)
+            else:
+                print(f"Peak traced memory: {peak} bytes")
 
         # Print summary
         print()
         print("Conversion Summary:")
         print(f"  PolicySet ID: {ampel_policy['id']}")
         print(f"  Policies:     {len(ampel_policy.get('policies', []))}")
+        if args.shard_by:
+            print(f"  Shards:       {len(shard_manifest['shards'])} by {args.shard_by} "
+                  f"(manifest: {Path(output_file) / SHARD_MANIFEST_NAME})")
+        if args.incremental:
+            mappings = len(entry['mappings'])
+            print(f"  Regenerated:  {len(regenerated) if regenerated is not None else 0} of {mappings} mapping(s)")
+        if converter.compaction:
+            before, after, shared = converter.compaction
+            print(f"  Compacted:    {before} -> {after} bytes "
+                  f"({100 * (before - after) / before:.1f}% saved, {shared} shared value(s))")
         print()
         print("⚠️  Important Notes:")
         print("  - This conversion creates TEMPLATE policies that require implementation")
@@ -513,6 +1457,25 @@ def main():
         print("  3. Customize predicate types based on your attestation format")
         print("  4. Add signer identities for attestation verification")
         print("  5. Test with: ampel verify --policy <output_file> <attestation>")
+        if args.shard_by:
+            print("     (once per shard listed in the manifest, e.g. as parallel CI jobs)")
+
+        if stats is not None:
+            stats.count('bytes_read', Path(input_file).stat().st_size)
+            if args.shard_by:
+                stats.count('bytes_written', sum(p.stat().st_size for p in Path(output_file).iterdir()))
+            else:
+                stats.count('bytes_written', Path(output_file).stat().st_size)
+            stats.count_policy(gemara_policy, ampel_policy)
+            if converter.policy_cache is not None:
+                stats.count('policy_cache_hits', converter.policy_cache.hits)
+                stats.count('policy_cache_misses', converter.policy_cache.misses)
+            if args.stats:
+                print()
+                stats.report()
+            if args.stats_json:
+                with open(args.stats_json, 'w') as f:
+                    json.dump(stats.as_dict(), f, indent=2)
 
     except yaml.YAMLError as e:
         print(f"Error parsing YAML file: {e}")
@@ -0,0 +1,6 @@
+"""
+Gemara <-> ampel conversion tools behind a single `gemara-ampel` command.
+
+See `gemara_ampel.cli` for the subcommands. The converters themselves are
+loaded through `tool_modules` only when a subcommand runs.
+"""
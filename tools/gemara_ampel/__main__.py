@@ -0,0 +1,3 @@
+from gemara_ampel.cli import main
+
+main()
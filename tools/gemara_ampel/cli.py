@@ -0,0 +1,57 @@
+"""
+Single entry point for the Gemara <-> ampel converters.
+
+Usage:
+    gemara-ampel to-ampel <policy.yaml> [output.json] [options]
+    gemara-ampel to-gemara <ampel-result.json> [output.yaml] [options]
+    gemara-ampel <command> --help
+
+Each subcommand hands its arguments to the converter's own `main()`. The
+converter (and yaml, json, ...) is imported only once a subcommand has been
+chosen, so `gemara-ampel --help` starts with nothing but the standard
+interpreter. New commands are added to COMMANDS.
+"""
+
+import sys
+from typing import List, Optional
+
+# command -> (tool_modules loader, summary)
+COMMANDS = {
+    'to-ampel': ('load_gemara_to_ampel', "convert Gemara Layer 3 policies to ampel PolicySets"),
+    'to-gemara': ('load_ampel_to_gemara', "convert ampel results to Gemara Layer 4 evaluations"),
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: gemara-ampel <command> [arguments]", "", "commands:"]
+    lines.extend(f"  {name:<{width}}  {summary}" for name, (_, summary) in COMMANDS.items())
+    lines.append("")
+    lines.append("Run `gemara-ampel <command> --help` for the options of a command.")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        sys.exit(0 if argv else 1)
+    command, arguments = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"gemara-ampel: unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        from gemara_ampel.tools import tool_modules
+    except ModuleNotFoundError:
+        # `python -m gemara_ampel` from a checkout's tools/ directory
+        import tool_modules
+
+    module = getattr(tool_modules, COMMANDS[command][0])()
+    # The converters' usage and error messages name the program from argv[0]
+    sys.argv = [f"gemara-ampel {command}"] + arguments
+    module.main(arguments)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+In-memory compliance pipeline: Gemara Layer 3 -> Ampel -> evaluation -> Layer 4.
+
+Chains `GemaraToAmpelConverter.convert`, an evaluation stage and
+`map_result_to_evaluation` on Python objects, instead of writing and
+re-parsing a PolicySet file and a results file between the tools. Only the
+Layer 3 input, the attestations and the Layer 4 output touch the disk.
+
+The evaluation stage is pluggable:
+    local           evaluate tenets with policy_eval.py's CEL subset (default)
+    stub[:STATUS]   give every tenet STATUS (default PASS) without running CEL
+    module:function call function(policy_set, attestations_path), which must
+                    yield ampel ResultSets or Results (e.g. a wrapper around
+                    `ampel verify`)
+
+Usage:
+    python pipeline.py <policy.yaml> [attestations.jsonl] [output.yaml]
+                       [--evaluator local|stub[:STATUS]|module:function] [--stats] [--stats-json FILE]
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import sys
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, TextIO
+
+if __package__:
+    from .policy_eval import PolicyEvaluator, group_by_subject, iter_attestations
+    from .tool_modules import load_ampel_to_gemara, load_gemara_to_ampel
+else:
+    from policy_eval import PolicyEvaluator, group_by_subject, iter_attestations
+    from tool_modules import load_ampel_to_gemara, load_gemara_to_ampel
+
+Evaluate = Callable[[Dict[str, Any], Optional[str]], Iterable[Dict[str, Any]]]
+
+
+def _subjects(attestations: Optional[str]) -> Iterable:
+    if attestations is None:
+        # Without attestations the policies are evaluated for a placeholder subject
+        return [({'sha256': hashlib.sha256(b'pipeline').hexdigest()}, [])]
+    return group_by_subject(iter_attestations(attestations)).values()
+
+
+def local_evaluator(policy_set: Dict[str, Any], attestations: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Evaluate with the local CEL subset, one ResultSet per attestation subject."""
+    evaluator = PolicyEvaluator(policy_set)
+    for digest, statements in _subjects(attestations):
+        yield evaluator.evaluate_subject(digest, statements)
+
+
+class StubEvaluator(PolicyEvaluator):
+    """Reports every tenet with a fixed status instead of evaluating it."""
+
+    def __init__(self, policy_set: Dict[str, Any], status: str = 'PASS'):
+        super().__init__(policy_set)
+        self.status = status
+
+    def evaluate_tenet(self, tenet, default_id, default_types, context, attestations):
+        result = {
+            'date': None,
+            'id': tenet.get('id', default_id),
+            'output': {},
+            'statements': [],
+            'status': self.status
+        }
+        if self.status == 'PASS':
+            result['assessment'] = {'message': (tenet.get('assessment') or {}).get('message', '')}
+        else:
+            result['error'] = tenet.get('error') or {'message': 'Stubbed evaluation', 'guidance': ''}
+        return result
+
+
+def stub_evaluator(status: str = 'PASS') -> Evaluate:
+    def evaluate(policy_set: Dict[str, Any], attestations: Optional[str]) -> Iterator[Dict[str, Any]]:
+        evaluator = StubEvaluator(policy_set, status)
+        for digest, statements in _subjects(attestations):
+            yield evaluator.evaluate_subject(digest, statements)
+    return evaluate
+
+
+def load_evaluator(spec: str) -> Evaluate:
+    """Resolve an --evaluator value to an evaluation function."""
+    if spec == 'local':
+        return local_evaluator
+    if spec == 'stub' or spec.startswith('stub:'):
+        return stub_evaluator(spec.partition(':')[2].upper() or 'PASS')
+    module_name, _, function_name = spec.partition(':')
+    if not function_name:
+        raise ValueError(f"evaluator must be local, stub[:STATUS] or module:function, got {spec!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_pipeline(
+    gemara_policy: Dict[str, Any],
+    attestations: Optional[str],
+    evaluate: Evaluate,
+    stream: TextIO,
+    stats=None
+) -> int:
+    """Convert, evaluate and write Layer 4 to `stream`; returns the evaluation count.
+
+    Stages run interleaved, one ampel ResultSet at a time, and the time spent
+    in each is accumulated in `stats` (a gemara_to_ampel ConversionStats).
+    """
+    gemara_to_ampel = load_gemara_to_ampel()
+    ampel_to_gemara = load_ampel_to_gemara()
+    stats = stats or gemara_to_ampel.ConversionStats()
+
+    with stats.stage('convert'):
+        policy_set = gemara_to_ampel.GemaraToAmpelConverter().convert(gemara_policy)
+    stats.count('policies', len(policy_set.get('policies', [])))
+
+    writer = ampel_to_gemara.Layer4Writer(stream)
+    results = iter(evaluate(policy_set, attestations))
+    while True:
+        with stats.stage('evaluate'):
+            result_set = next(results, None)
+        if result_set is None:
+            break
+        stats.count('result_sets')
+        for result in ampel_to_gemara.iter_ampel_results(result_set):
+            with stats.stage('map'):
+                evaluation = ampel_to_gemara.map_result_to_evaluation(result)
+            with stats.stage('write'):
+                writer.write(evaluation)
+    with stats.stage('write'):
+        writer.close()
+    stats.count('evaluations', writer.count)
+    return writer.count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a Gemara Layer 3 policy, evaluate it and write Layer 4, all in memory."
+    )
+    parser.add_argument('policy', help="Gemara Layer 3 policy YAML file")
+    parser.add_argument('attestations', nargs='?', help="JSONL attestations to evaluate against")
+    parser.add_argument('output', nargs='?', help="output Layer 4 YAML file (default: stdout)")
+    parser.add_argument('--evaluator', default='local',
+                        help="local, stub[:STATUS] or module:function (default: %(default)s)")
+    parser.add_argument('--stats', action='store_true', help="print per-stage timings and counters")
+    parser.add_argument('--stats-json', metavar='FILE', help="write the statistics as JSON")
+    args = parser.parse_args()
+
+    gemara_to_ampel = load_gemara_to_ampel()
+    stats = gemara_to_ampel.ConversionStats()
+    try:
+        evaluate = load_evaluator(args.evaluator)
+    except (ImportError, AttributeError, ValueError) as e:
+        print(f"Error: Cannot load evaluator: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        with stats.stage('load'):
+            gemara_policy = gemara_to_ampel.GemaraToAmpelConverter().load_gemara_policy(args.policy)
+        with stats.stage('validate'):
+            gemara_to_ampel.validate_gemara_policy(gemara_policy)
+
+        out = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            count = run_pipeline(gemara_policy, args.attestations, evaluate, out, stats)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    except (OSError, ValueError, gemara_to_ampel.yaml.YAMLError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote {count} evaluation(s)" + (f" to {args.output}" if args.output else ''), file=sys.stderr)
+    if args.stats:
+        stats.report(sys.stderr)
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            json.dump(stats.as_dict(), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
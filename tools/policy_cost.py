@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Static cost analysis of the CEL code in ampel policies.
+
+Every tenet's `code` (and output expressions) is parsed with `cel_subset.py`
+and given an estimated evaluation cost: one unit per operation, with each
+comprehension (`exists`, `all`, `map`, ...) multiplying the cost of its body
+by an assumed list size, so nested scans grow geometrically. Scans of the
+same predicate path by several tenets of one policy are reported as
+candidates for a single shared pass, and policies are ranked by total cost.
+
+Usage:
+    python policy_cost.py [policy.json|directory]... [--list-size N] [--json FILE]
+                          [--max-cost N] [--max-depth N]
+
+Exits non-zero when a policy exceeds --max-cost, a comprehension nests deeper
+than --max-depth, or a tenet cannot be parsed, so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+if __package__:
+    from .cel_subset import CelSyntaxError, parse
+else:
+    from cel_subset import CelSyntaxError, parse
+
+DEFAULT_POLICIES = Path(__file__).resolve().parent.parent / 'ampel_policies'
+
+# Relative cost of calls beyond the unit cost of an ordinary operation
+CALL_COSTS = {'matches': 10, 'contains': 2, 'startsWith': 2, 'endsWith': 2}
+
+
+def render(node: tuple) -> str:
+    """Render an access path (`predicates[0].data.values`) back to CEL text."""
+    kind = node[0]
+    if kind == 'ident':
+        return node[1]
+    if kind == 'select':
+        return f"{render(node[1])}.{node[2]}"
+    if kind == 'index':
+        return f"{render(node[1])}[{render(node[2])}]"
+    if kind == 'lit':
+        return json.dumps(node[1])
+    return '<expr>'
+
+
+class CostEstimate:
+    """Walks an AST once, collecting its cost, scans and comprehension depth."""
+
+    def __init__(self, list_size: int):
+        self.list_size = list_size
+        self.scans = []
+        self.max_depth = 0
+
+    def cost(self, node: tuple, depth: int = 0) -> int:
+        kind = node[0]
+        if kind in ('lit', 'ident'):
+            return 0
+        if kind in ('select', 'has', 'not', 'neg'):
+            return 1 + self.cost(node[1], depth)
+        if kind == 'index':
+            return 1 + self.cost(node[1], depth) + self.cost(node[2], depth)
+        if kind in ('and', 'or'):
+            # Worst case: both operands are evaluated
+            return 1 + self.cost(node[1], depth) + self.cost(node[2], depth)
+        if kind == 'cond':
+            return 1 + self.cost(node[1], depth) + max(self.cost(node[2], depth), self.cost(node[3], depth))
+        if kind == 'binop':
+            return 1 + self.cost(node[2], depth) + self.cost(node[3], depth)
+        if kind == 'list':
+            return 1 + sum(self.cost(item, depth) for item in node[1])
+        if kind == 'map':
+            return 1 + sum(self.cost(k, depth) + self.cost(v, depth) for k, v in node[1])
+        if kind == 'call':
+            name, target, args = node[1], node[2], node[3]
+            operands = ([target] if target is not None else []) + args
+            return CALL_COSTS.get(name, 1) + sum(self.cost(a, depth) for a in operands)
+        if kind == 'macro':
+            name, target, variable, body = node[1], node[2], node[3], node[4]
+            self.max_depth = max(self.max_depth, depth + 1)
+            body_cost = self.cost(body, depth + 1)
+            self.scans.append({'path': render(target), 'macro': name, 'depth': depth + 1})
+            return 1 + self.cost(target, depth) + self.list_size * (1 + body_cost)
+        return 1
+
+
+def iter_policies(paths: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (file, policy) for every policy in the given files and directories."""
+    files = []
+    for path in paths:
+        if Path(path).is_dir():
+            files.extend(sorted(Path(path).rglob('*.json')))
+        else:
+            files.append(Path(path))
+    for path in files:
+        with open(path, 'r') as f:
+            document = json.load(f)
+        for policy in document.get('policies', [document]):
+            yield str(path), policy
+
+
+def analyze_policy(policy: Dict[str, Any], list_size: int) -> Dict[str, Any]:
+    """Estimate the cost of one policy and find scans its tenets could share."""
+    tenets = []
+    scans_by_path = {}
+    for index, tenet in enumerate(policy.get('tenets', [])):
+        tenet_id = tenet.get('id', str(index + 1).zfill(2))
+        expressions = [tenet.get('code', '')] + [
+            output.get('code', '') for output in (tenet.get('outputs') or {}).values()
+        ]
+        estimate = CostEstimate(list_size)
+        report = {'id': tenet_id}
+        try:
+            report['cost'] = sum(estimate.cost(parse(code)) for code in expressions if code)
+        except CelSyntaxError as e:
+            report.update(cost=None, error=str(e))
+            tenets.append(report)
+            continue
+        report['max_depth'] = estimate.max_depth
+        report['scans'] = estimate.scans
+        tenets.append(report)
+        for scan in estimate.scans:
+            # Only scans at the top level can be hoisted into a shared pass
+            if scan['depth'] == 1:
+                scans_by_path.setdefault(scan['path'], []).append(tenet_id)
+
+    shared = [
+        {
+            'path': path,
+            'tenets': sorted(set(tenet_ids)),
+            'scans': len(tenet_ids),
+            # Element visits avoided by scanning the list once
+            'estimated_savings': (len(tenet_ids) - 1) * list_size
+        }
+        for path, tenet_ids in scans_by_path.items() if len(tenet_ids) > 1
+    ]
+    costs = [t['cost'] for t in tenets if t.get('cost') is not None]
+    return {
+        'id': policy.get('id', ''),
+        'cost': sum(costs),
+        'max_depth': max((t.get('max_depth', 0) for t in tenets), default=0),
+        'tenets': tenets,
+        'shared_scans': shared,
+        'errors': sum(1 for t in tenets if 'error' in t)
+    }
+
+
+def analyze(paths: List[str], list_size: int = 10) -> Dict[str, Any]:
+    """Analyze every policy under `paths`, most expensive first."""
+    policies = []
+    for path, policy in iter_policies(paths):
+        report = analyze_policy(policy, list_size)
+        report['file'] = path
+        policies.append(report)
+    policies.sort(key=lambda p: (-p['cost'], p['file'], p['id']))
+    return {'list_size': list_size, 'policies': policies}
+
+
+def check_limits(report: Dict[str, Any], max_cost: Optional[int], max_depth: Optional[int]) -> List[str]:
+    """Return a message for every policy breaking the limits or failing to parse."""
+    violations = []
+    for policy in report['policies']:
+        name = f"{policy['file']}: {policy['id']}"
+        if policy['errors']:
+            violations.append(f"{name}: {policy['errors']} tenet(s) could not be parsed")
+        if max_cost is not None and policy['cost'] > max_cost:
+            violations.append(f"{name}: cost {policy['cost']} exceeds {max_cost}")
+        if max_depth is not None and policy['max_depth'] > max_depth:
+            violations.append(f"{name}: comprehension depth {policy['max_depth']} exceeds {max_depth}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the evaluation cost of ampel policy CEL code.")
+    parser.add_argument('paths', nargs='*', default=[str(DEFAULT_POLICIES)],
+                        help="policy JSON files or directories (default: %(default)s)")
+    parser.add_argument('--list-size', type=int, default=10,
+                        help="assumed length of scanned lists (default: %(default)s)")
+    parser.add_argument('--json', metavar='FILE', help="write the report as JSON ('-' for stdout)")
+    parser.add_argument('--max-cost', type=int, help="fail if a policy's estimated cost exceeds this")
+    parser.add_argument('--max-depth', type=int, help="fail if comprehensions nest deeper than this")
+    args = parser.parse_args()
+
+    try:
+        report = analyze(args.paths, args.list_size)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    violations = check_limits(report, args.max_cost, args.max_depth)
+    report['violations'] = violations
+
+    if args.json == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+        print(f"{'cost':>8} {'depth':>5}  policy")
+        for policy in report['policies']:
+            print(f"{policy['cost']:8} {policy['max_depth']:5}  {policy['id']} ({policy['file']})")
+            for shared in policy['shared_scans']:
+                print(f"{'':15}{shared['scans']} tenets ({', '.join(shared['tenets'])}) scan "
+                      f"{shared['path']}; one shared pass saves ~{shared['estimated_savings']} visits")
+        for violation in violations:
+            print(f"✗ {violation}", file=sys.stderr)
+
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Evaluate ampel policies locally against attestations, without ampel.
+
+Loads a PolicySet (or a single Policy) such as
+`ampel_policies/branch-protection-rules-04.json`, groups the in-toto
+statements of an `attestations.jsonl` file by subject and evaluates every
+tenet's CEL `code` with the subset implemented in `cel_subset.py`. Each
+subject produces an ampel ResultSet statement, written one per line, which
+`ampel2gemara/ampel-to-gemara.py --jsonl` converts to Gemara Layer 4.
+
+Usage:
+    python policy_eval.py <policy.json> <attestations.jsonl> [output.jsonl]
+                          [--subject sha256:DIGEST]... [--workers N] [--batch-size N]
+
+Examples:
+    python policy_eval.py ../ampel_policies/branch-protection-rules-04.json attestations.jsonl results.jsonl
+    python policy_eval.py policy.json attestations.jsonl | python ampel2gemara/ampel-to-gemara.py --jsonl -
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+if __package__:
+    from .cel_subset import CelError, compile_expression
+    from .tool_modules import load_ampel_to_gemara
+else:
+    from cel_subset import CelError, compile_expression
+    from tool_modules import load_ampel_to_gemara
+
+RESULT_PREDICATE_TYPE = 'https://carabiner.dev/ampel/results/v0.0.1'
+STATEMENT_TYPE = 'https://in-toto.io/Statement/v1'
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def load_policy_set(path: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Load a PolicySet, wrapping a single Policy in one; returns it with its file digests."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    policy_set = json.loads(content)
+    if not isinstance(policy_set, dict):
+        raise ValueError("expected a JSON object")
+    if 'policies' not in policy_set:
+        policy_set = {'id': policy_set.get('id', ''), 'meta': {}, 'policies': [policy_set]}
+    digest = {
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'sha512': hashlib.sha512(content).hexdigest()
+    }
+    return policy_set, digest
+
+
+def iter_attestations(
+    path: str,
+    on_error: Optional[Callable[[int, str], None]] = None
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Yield (statement, attestation reference) for each line of a JSONL file.
+
+    The reference is the `attestation` entry ampel records for evidence: the
+    digests of the line and a `jsonl:<file>#<index>` name. Lines that are not
+    JSON statements are reported through `on_error(line_number, message)`
+    (printed to stderr by default) and skipped.
+    """
+    if on_error is None:
+        def on_error(line_no: int, message: str):
+            print(f"Error: {path}:{line_no}: {message}", file=sys.stderr)
+
+    unwrap_statement = load_ampel_to_gemara().unwrap_statement
+    with open(path, 'rb') as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+                statement = unwrap_statement(record)
+                if not isinstance(statement, dict):
+                    raise ValueError(f"expected a statement object, got {type(statement).__name__}")
+            except (ValueError, TypeError) as e:
+                on_error(index + 1, str(e))
+                continue
+            name = f"jsonl:{path}#{index}"
+            yield statement, {
+                'digest': {
+                    'sha256': hashlib.sha256(line).hexdigest(),
+                    'sha512': hashlib.sha512(line).hexdigest()
+                },
+                'name': name,
+                'uri': name
+            }
+
+
+def subject_key(digest: Dict[str, str]) -> str:
+    algorithm = 'sha256' if 'sha256' in digest else min(digest)
+    return f"{algorithm}:{digest[algorithm]}"
+
+
+def group_by_subject(
+    attestations: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]
+) -> Dict[str, Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], Dict[str, Any]]]]]:
+    """Map each subject to its digest and the attestations that name it."""
+    subjects = {}
+    for statement, reference in attestations:
+        for subject in statement.get('subject') or []:
+            digest = subject.get('digest') or {}
+            if not digest:
+                continue
+            key = subject_key(digest)
+            subjects.setdefault(key, (digest, []))[1].append((statement, reference))
+    return subjects
+
+
+def _context_values(definitions: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Resolve ampel context definitions to their value or default."""
+    values = {}
+    for name, definition in (definitions or {}).items():
+        if isinstance(definition, dict):
+            values[name] = definition.get('value', definition.get('default'))
+        else:
+            values[name] = definition
+    return values
+
+
+class PolicyEvaluator:
+    """Evaluates one PolicySet against the attestations of a subject.
+
+    Tenet programs are compiled on first use and cached by code string, so
+    evaluating many subjects only pays for parsing each expression once.
+    """
+
+    def __init__(self, policy_set: Dict[str, Any], origin_digest: Optional[Dict[str, str]] = None):
+        self.policy_set = policy_set
+        self.origin_digest = origin_digest or {}
+        self.common_context = _context_values((policy_set.get('common') or {}).get('context'))
+
+    def evaluate_subject(
+        self,
+        digest: Dict[str, str],
+        attestations: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Return the ampel ResultSet statement for one subject."""
+        start = _now()
+        results = [self.evaluate_policy(policy, digest, attestations)
+                   for policy in self.policy_set.get('policies', [])]
+        meta = self.policy_set.get('meta') or {}
+        result_set = {
+            'date_end': _now(),
+            'date_start': start,
+            'meta': {
+                'enforce': meta.get('enforce', 'ON'),
+                'frameworks': meta.get('frameworks', []),
+                'origin': {'digest': self.origin_digest, 'name': self.policy_set.get('id', '')}
+            },
+            'policy_set': {'id': self.policy_set.get('id', '')},
+            'results': results,
+            'status': 'PASS' if all(r['status'] == 'PASS' for r in results) else 'FAIL',
+            'subject': {'digest': digest}
+        }
+        return {
+            '_type': STATEMENT_TYPE,
+            'predicateType': RESULT_PREDICATE_TYPE,
+            'subject': [{'digest': digest}],
+            'predicate': result_set
+        }
+
+    def evaluate_policy(
+        self,
+        policy: Dict[str, Any],
+        digest: Dict[str, str],
+        attestations: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Evaluate every tenet of a policy and combine them by its assert mode."""
+        start = _now()
+        meta = policy.get('meta') or {}
+        context = dict(self.common_context, **_context_values(policy.get('context')))
+        default_types = (policy.get('predicates') or {}).get('types')
+
+        eval_results = [
+            self.evaluate_tenet(tenet, str(index + 1).zfill(2), default_types, context, attestations)
+            for index, tenet in enumerate(policy.get('tenets', []))
+        ]
+        assert_mode = meta.get('assert_mode', 'AND')
+        passed = [r['status'] == 'PASS' for r in eval_results]
+        status = 'PASS' if (any(passed) if assert_mode == 'OR' else all(passed)) else 'FAIL'
+        if status == 'FAIL' and meta.get('enforce', 'ON') == 'OFF':
+            status = 'SOFTFAIL'
+
+        return {
+            'context': context,
+            'date_end': _now(),
+            'date_start': start,
+            'eval_results': eval_results,
+            'meta': {
+                'assert_mode': assert_mode,
+                'controls': meta.get('controls', []),
+                'description': meta.get('description', ''),
+                'enforce': meta.get('enforce', 'ON')
+            },
+            'policy': {'id': policy.get('id', '')},
+            'status': status,
+            'subject': {'digest': digest}
+        }
+
+    def evaluate_tenet(
+        self,
+        tenet: Dict[str, Any],
+        default_id: str,
+        default_types: Optional[List[str]],
+        context: Dict[str, Any],
+        attestations: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        types = (tenet.get('predicates') or {}).get('types') or default_types
+        matched = [(s, r) for s, r in attestations if not types or s.get('predicateType') in types]
+        activation = {
+            'predicates': [{'predicate_type': s.get('predicateType', ''), 'data': s.get('predicate')}
+                           for s, _ in matched],
+            'context': context
+        }
+
+        result = {
+            'date': None,
+            'id': tenet.get('id', default_id),
+            'output': {},
+            'statements': [{'attestation': r, 'type': s.get('predicateType', '')} for s, r in matched]
+        }
+        failure = None
+        try:
+            if types and not matched:
+                raise CelError(f"no attestations of type {', '.join(types)}")
+            value = compile_expression(tenet.get('code', 'false'))(activation)
+            if not isinstance(value, bool):
+                raise CelError(f"tenet evaluated to {type(value).__name__}, expected bool")
+            for name, output in (tenet.get('outputs') or {}).items():
+                result['output'][name] = compile_expression(output.get('code', 'null'))(activation)
+        except CelError as e:
+            value = False
+            failure = str(e)
+
+        result['date'] = _now()
+        result['status'] = 'PASS' if value else 'FAIL'
+        if value:
+            result['assessment'] = {'message': (tenet.get('assessment') or {}).get('message', '')}
+        else:
+            error = dict(tenet.get('error') or {'message': tenet.get('description', 'Tenet failed'), 'guidance': ''})
+            if failure:
+                error['message'] = f"{error.get('message', '')} (evaluation error: {failure})".lstrip()
+            result['error'] = error
+        return result
+
+
+_worker_evaluator = None
+
+
+def _init_worker(policy_set: Dict[str, Any], origin_digest: Dict[str, str]):
+    global _worker_evaluator
+    _worker_evaluator = PolicyEvaluator(policy_set, origin_digest)
+
+
+def _evaluate_in_worker(item: Tuple[Dict[str, str], List[Tuple[Dict[str, Any], Dict[str, Any]]]]) -> Dict[str, Any]:
+    return _worker_evaluator.evaluate_subject(*item)
+
+
+def evaluate_subjects(
+    policy_set: Dict[str, Any],
+    origin_digest: Dict[str, str],
+    subjects: Iterable[Tuple[Dict[str, str], List[Tuple[Dict[str, Any], Dict[str, Any]]]]],
+    workers: int = 1,
+    batch_size: int = 64
+) -> Iterator[Dict[str, Any]]:
+    """Yield a ResultSet statement per (digest, attestations) in input order.
+
+    With several workers, subjects are sent to a process pool in batches of
+    `batch_size`; each worker builds its evaluator (and program cache) once.
+    """
+    if workers <= 1:
+        evaluator = PolicyEvaluator(policy_set, origin_digest)
+        for digest, attestations in subjects:
+            yield evaluator.evaluate_subject(digest, attestations)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(policy_set, origin_digest)
+    ) as executor:
+        yield from executor.map(_evaluate_in_worker, subjects, chunksize=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate ampel policies locally against JSONL attestations.")
+    parser.add_argument('policy', help="ampel PolicySet or Policy JSON file")
+    parser.add_argument('attestations', help="JSONL attestations (e.g. from `bnd pack`)")
+    parser.add_argument('output', nargs='?', help="output JSONL of ampel ResultSet statements (default: stdout)")
+    parser.add_argument('--subject', action='append', default=[], metavar='ALGORITHM:DIGEST',
+                        help="only evaluate this subject (repeatable; default: every subject)")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help="subjects sent to a worker at a time (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        policy_set, origin_digest = load_policy_set(args.policy)
+        subjects = group_by_subject(iter_attestations(args.attestations))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.subject:
+        missing = [s for s in args.subject if s not in subjects]
+        if missing:
+            print(f"Error: No attestations for subject(s): {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        subjects = {key: subjects[key] for key in args.subject}
+    if not subjects:
+        print("Error: No attestation subjects found in input", file=sys.stderr)
+        sys.exit(1)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    failed = 0
+    try:
+        for statement in evaluate_subjects(policy_set, origin_digest, subjects.values(),
+                                           args.workers, args.batch_size):
+            failed += statement['predicate']['status'] != 'PASS'
+            out.write(json.dumps(statement) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Evaluated {len(subjects)} subject(s): {len(subjects) - failed} passed, {failed} failed",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
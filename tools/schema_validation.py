@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Compiled structural validation for ampel results and Gemara Layer 3 policies.
+
+Schemas are small dicts in a JSON-Schema-like subset:
+
+    {'type': 'object' | 'array' | 'string' | 'integer' | 'number' | 'boolean'
+             | 'null' | 'any', or a tuple of those,
+     'required': [field, ...], 'properties': {field: schema},
+     'values': schema,     # every value of an object
+     'items': schema,      # every element of an array
+     'enum': [value, ...]}
+
+`compile_schema` turns a schema into a validator function once, generating
+Python source with every nested check inlined, so validating a document
+costs a few isinstance tests and dict lookups per field instead of walking
+the schema again. Validators
+return None and raise `SchemaError` on the first problem, with the path to
+the offending value (`$.eval_results[0].status`).
+
+The schemas are lenient about fields the converters ignore and strict about
+the type of every field they read, so a document that validates converts
+without tripping over a wrong shape halfway through a stream.
+
+Usage:
+    python schema_validation.py result|layer3 <file>...
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+Validator = Callable[[Any], None]
+
+_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+    'null': type(None),
+}
+
+
+class SchemaError(ValueError):
+    """A value does not match its schema; `path` leads to it from the root."""
+
+    def __init__(self, message: str, path: Tuple[Union[str, int], ...] = (), record: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+        # Which document of a stream failed, e.g. "result 12"
+        self.record = record
+
+    def __str__(self) -> str:
+        location = format_path(self.path)
+        if self.record:
+            location = f"{self.record}: {location}"
+        return f"{location}: {self.message}"
+
+    def __reduce__(self):
+        return SchemaError, (self.message, self.path, self.record)
+
+
+def format_path(path: Tuple[Union[str, int], ...]) -> str:
+    return '$' + ''.join(f'[{part}]' if isinstance(part, int) else f'.{part}' for part in path)
+
+
+def _type_name(value: Any) -> str:
+    for name, python_type in _TYPES.items():
+        if type(value) is python_type:
+            return name
+    return 'number' if isinstance(value, float) else type(value).__name__
+
+
+_MISSING = object()
+
+
+def _type_check(kinds: Tuple[str, ...], var: str) -> str:
+    unknown = [kind for kind in kinds if kind not in _TYPES]
+    if unknown:
+        raise ValueError(f"unknown schema type(s): {', '.join(unknown)}")
+    python_types = []
+    for kind in kinds:
+        for python_type in (_TYPES[kind] if isinstance(_TYPES[kind], tuple) else (_TYPES[kind],)):
+            if python_type not in python_types:
+                python_types.append(python_type)
+    names = [t.__name__ if t is not type(None) else 'NoneType' for t in python_types]
+    check = f"isinstance({var}, {names[0] if len(names) == 1 else '(' + ', '.join(names) + ')'})"
+    if int in python_types and bool not in python_types:
+        # bool is an int subclass but never a valid integer or number
+        check += f" and type({var}) is not bool"
+    return check
+
+
+def _count_containers(schema: Dict[str, Any], counts: Dict[int, int]):
+    if 'properties' in schema or 'items' in schema or 'values' in schema:
+        counts[id(schema)] = counts.get(id(schema), 0) + 1
+        if counts[id(schema)] > 1:
+            return
+    for subschema in (schema.get('properties') or {}).values():
+        _count_containers(subschema, counts)
+    for key in ('items', 'values'):
+        if key in schema:
+            _count_containers(schema[key], counts)
+
+
+class _Generator:
+    """Emits the source of the validator functions for one schema.
+
+    Nested schemas become inline statements on a local variable, so a
+    document is checked with plain isinstance tests and dict lookups and no
+    function call per field. A container schema used in several places (the
+    modifications of each mapping type, say) gets one function of its own.
+    The path of a failing value is only assembled when raising.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        counts = {}
+        _count_containers(schema, counts)
+        self.shared = {key for key, count in counts.items() if count > 1}
+        self.constants = {}
+        self.functions = {}
+        self.sources = []
+        self.lines = []
+        self.root = self.function(schema)
+
+    def emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def constant(self, value: Any) -> str:
+        name = f'_c{len(self.constants)}'
+        self.constants[name] = value
+        return name
+
+    def block(self, indent: int, header: str, body: Callable[[int], None]):
+        self.emit(indent, header)
+        before = len(self.lines)
+        body(indent + 1)
+        if len(self.lines) == before:
+            self.emit(indent + 1, 'pass')
+
+    def function(self, schema: Dict[str, Any]) -> str:
+        """Return the name of the function validating `schema`, generating it once."""
+        name = self.functions.get(id(schema))
+        if name is None:
+            name = self.functions[id(schema)] = f'validate_{len(self.functions)}'
+            outer, self.lines = self.lines, []
+            self.block(0, f'def {name}(v0):', lambda indent: self.schema(schema, 'v0', [], indent, 0, inline=True))
+            self.sources.append('\n'.join(self.lines))
+            self.lines = outer
+        return name
+
+    def schema(self, schema: Dict[str, Any], var: str, path: List[str], indent: int, level: int,
+               inline: bool = False):
+        kinds = schema.get('type', 'any')
+        kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds)
+        where = f"({', '.join(path)},)" if path else '()'
+
+        if not inline and id(schema) in self.shared:
+            name = self.function(schema)
+            self.emit(indent, 'try:')
+            self.emit(indent + 1, f'{name}({var})')
+            self.emit(indent, 'except SchemaError as e:')
+            self.emit(indent + 1, f'e.path = {where} + e.path')
+            self.emit(indent + 1, 'raise')
+            return
+
+        if 'any' not in kinds:
+            self.emit(indent, f"if not ({_type_check(kinds, var)}):")
+            expected = f"expected {' or '.join(kinds)}, got "
+            self.emit(indent + 1, f"raise SchemaError({expected!r} + _type_name({var}), {where})")
+        if 'enum' in schema:
+            allowed = self.constant(tuple(schema['enum']))
+            listing = self.constant(', '.join(map(str, schema['enum'])))
+            self.emit(indent, f"if {var} not in {allowed}:")
+            self.emit(indent + 1, f"raise SchemaError(repr({var}) + ' is not one of ' + {listing}, {where})")
+
+        item = f'v{level + 1}'
+        properties = {
+            field: subschema for field, subschema in (schema.get('properties') or {}).items()
+            # Fields without constraints never need visiting
+            if subschema.get('type', 'any') != 'any' or set(subschema) - {'type'}
+        }
+
+        def object_checks(indent: int):
+            for field in schema.get('required', ()):
+                self.emit(indent, f"if {field!r} not in {var}:")
+                self.emit(indent + 1, f"raise SchemaError({f'missing required field {field!r}'!r}, {where})")
+            for field, subschema in properties.items():
+                self.emit(indent, f"{item} = {var}.get({field!r}, _MISSING)")
+                self.block(indent, f"if {item} is not _MISSING:", lambda indent: self.schema(
+                    subschema, item, path + [repr(field)], indent, level + 1))
+            if 'values' in schema:
+                key = f'k{level}'
+                self.block(indent, f"for {key}, {item} in {var}.items():", lambda indent: self.schema(
+                    schema['values'], item, path + [key], indent, level + 1))
+
+        def array_checks(indent: int):
+            index = f'i{level}'
+            self.block(indent, f"for {index}, {item} in enumerate({var}):", lambda indent: self.schema(
+                schema['items'], item, path + [index], indent, level + 1))
+
+        if schema.get('required') or properties or 'values' in schema:
+            if kinds == ('object',):
+                object_checks(indent)
+            else:
+                self.block(indent, f"if isinstance({var}, dict):", object_checks)
+        if 'items' in schema:
+            if kinds == ('array',):
+                array_checks(indent)
+            else:
+                self.block(indent, f"if isinstance({var}, list):", array_checks)
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Compile a schema dict into a validator raising SchemaError.
+
+    The generated source is kept on the function as `validate.source`.
+    """
+    generator = _Generator(schema)
+    source = '\n\n'.join(generator.sources) + '\n'
+    namespace = dict(generator.constants, SchemaError=SchemaError, _type_name=_type_name,
+                     _MISSING=_MISSING, NoneType=type(None))
+    exec(compile(source, '<schema>', 'exec'), namespace)
+    validate = namespace[generator.root]
+    validate.source = source
+    return validate
+
+
+def validate_each(records: Iterable[Any], validate: Validator, label: str = 'result') -> Iterator[Any]:
+    """Yield `records` unchanged, raising SchemaError at the first invalid one."""
+    for index, record in enumerate(records, start=1):
+        try:
+            validate(record)
+        except SchemaError as e:
+            e.record = f"{label} {index}"
+            raise
+        yield record
+
+
+STRING = {'type': 'string'}
+SCALAR = {'type': ('string', 'integer', 'number')}
+STRING_LIST = {'type': 'array', 'items': STRING}
+
+AMPEL_RESULT = {
+    'type': 'object',
+    'required': ['policy', 'status'],
+    'properties': {
+        'policy': {'type': 'object', 'properties': {'id': STRING, 'version': STRING}},
+        'status': STRING,
+        'date_start': STRING,
+        'date_end': STRING,
+        'meta': {
+            'type': 'object',
+            'properties': {
+                'description': STRING,
+                'runtime': STRING,
+                'assert_mode': STRING,
+                'controls': {
+                    'type': 'array',
+                    'items': {'type': 'object', 'properties': {'id': STRING, 'class': STRING}}
+                }
+            }
+        },
+        'subject': {
+            'type': 'object',
+            'properties': {'name': STRING, 'digest': {'type': 'object', 'values': STRING}}
+        },
+        'context': {'type': ('object', 'null')},
+        'eval_results': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'id': STRING,
+                    'status': STRING,
+                    'date': {'type': ('string', 'null')},
+                    'assessment': {'type': 'object', 'properties': {'message': STRING}},
+                    'error': {'type': 'object', 'properties': {'message': STRING, 'guidance': STRING}},
+                    'output': {'type': ('object', 'null')},
+                    'statements': {
+                        'type': 'array',
+                        'items': {'type': 'object', 'properties': {'type': STRING}}
+                    }
+                }
+            }
+        }
+    }
+}
+
+AMPEL_RESULT_SET = {
+    'type': 'object',
+    'required': ['results'],
+    'properties': {'results': {'type': 'array', 'items': AMPEL_RESULT}}
+}
+
+_SCOPE = {
+    'type': 'object',
+    'properties': {'boundaries': STRING_LIST, 'technologies': STRING_LIST, 'providers': STRING_LIST}
+}
+
+_MODIFICATION = {
+    'type': 'object',
+    'properties': {
+        'target-id': SCALAR,
+        'modification-type': STRING,
+        'modification-rationale': STRING,
+        'title': STRING,
+        'objective': STRING,
+        'text': STRING,
+        'applicability': STRING_LIST,
+        'recommendation': STRING,
+        'recommendations': STRING_LIST
+    }
+}
+
+_MAPPING = {
+    'type': 'object',
+    'properties': {
+        'reference-id': SCALAR,
+        'in-scope': _SCOPE,
+        'out-of-scope': _SCOPE,
+        'control-modifications': {'type': 'array', 'items': _MODIFICATION},
+        'assessment-requirement-modifications': {'type': 'array', 'items': _MODIFICATION},
+        'guideline-modifications': {'type': 'array', 'items': _MODIFICATION}
+    }
+}
+
+LAYER3_POLICY = {
+    'type': 'object',
+    'properties': {
+        'title': STRING,
+        'purpose': STRING,
+        'organization-id': SCALAR,
+        'metadata': {'type': 'object', 'properties': {'id': SCALAR, 'version': SCALAR}},
+        'scope': _SCOPE,
+        'contacts': {'type': 'object'},
+        'implementation-plan': {'type': 'object'},
+        'guidance-references': {'type': 'array', 'items': _MAPPING},
+        'control-references': {'type': 'array', 'items': _MAPPING}
+    }
+}
+
+_VALIDATORS = {
+    'validate_ampel_result': AMPEL_RESULT,
+    'validate_ampel_result_set': AMPEL_RESULT_SET,
+    'validate_layer3_policy': LAYER3_POLICY,
+}
+
+
+def __getattr__(name: str) -> Validator:
+    # Validators are compiled on first use, so a tool only pays for its own schema
+    if name in _VALIDATORS:
+        validator = globals()[name] = compile_schema(_VALIDATORS[name])
+        return validator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate ampel Results or Gemara Layer 3 policies.")
+    parser.add_argument('kind', choices=['result', 'layer3'],
+                        help="result: an ampel Result or ResultSet (JSON); layer3: a Layer 3 policy (YAML)")
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args()
+    import yaml
+
+    if args.kind == 'layer3':
+        validate_layer3 = compile_schema(LAYER3_POLICY)
+    else:
+        validate_result, validate_result_set = compile_schema(AMPEL_RESULT), compile_schema(AMPEL_RESULT_SET)
+
+    invalid = 0
+    for path in args.files:
+        try:
+            with open(path, 'r') as f:
+                if args.kind == 'layer3':
+                    validate_layer3(yaml.safe_load(f))
+                else:
+                    document = json.load(f)
+                    predicate = document.get('predicate', document) if isinstance(document, dict) else document
+                    if isinstance(predicate, dict) and 'results' in predicate:
+                        validate_result_set(predicate)
+                    else:
+                        validate_result(predicate)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            invalid += 1
+            print(f"✗ {path}: {e}", file=sys.stderr)
+        else:
+            print(f"✓ {path}")
+
+    if invalid:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
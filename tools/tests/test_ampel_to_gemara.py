@@ -0,0 +1,62 @@
+"""Tests for ampel2gemara/ampel_to_gemara.py."""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, TOOLS_DIR)
+
+from tool_modules import load_ampel_to_gemara  # noqa: E402
+
+ampel_to_gemara = load_ampel_to_gemara()
+
+EXAMPLE_RESULT = os.path.join(TOOLS_DIR, 'ampel2gemara', 'test-data', 'example-result.json')
+
+
+class SkippedLinesTest(unittest.TestCase):
+    """Single-file and batch runs share one policy: valid lines are converted, and the run exits 1."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        os.mkdir(os.path.join(self.directory, 'in'))
+        self.input = os.path.join(self.directory, 'in', 'results.jsonl')
+        with open(EXAMPLE_RESULT) as f:
+            statement = json.load(f)
+        with open(self.input, 'w') as f:
+            f.write(json.dumps(statement) + '\n{not json\n')
+
+    def run_main(self, *argv: str) -> int:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            try:
+                ampel_to_gemara.main(list(argv) + ['--no-cache'])
+            except SystemExit as e:
+                return e.code
+        return 0
+
+    def evaluations(self, path: str) -> int:
+        with open(path) as f:
+            return len(yaml.safe_load(f)['evaluations'])
+
+    def test_single_file(self):
+        output = os.path.join(self.directory, 'out.yaml')
+        self.assertEqual(self.run_main(self.input, output), 1)
+        self.assertEqual(self.evaluations(output), 1)
+
+    def test_batch(self):
+        output_dir = os.path.join(self.directory, 'out')
+        self.assertEqual(self.run_main(os.path.join(self.directory, 'in'), '--batch',
+                                       '--output-dir', output_dir, '--workers', '1'), 1)
+        self.assertEqual(self.evaluations(os.path.join(output_dir, 'results.yaml')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
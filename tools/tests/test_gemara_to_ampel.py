@@ -0,0 +1,86 @@
+"""Tests for gemara2ampel/gemara_to_ampel.py."""
+
+import copy
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from tool_modules import load_gemara_to_ampel  # noqa: E402
+
+gemara_to_ampel = load_gemara_to_ampel()
+
+
+def make_policy(references: int, modifications: int):
+    """A Layer 3 policy whose guideline tenets differ but share blocks between references."""
+    def mapping(kind: str, index: int):
+        reference_id = f'{kind}-{index}'
+        return {
+            'reference-id': reference_id,
+            'control-modifications': [
+                {'target-id': f'{reference_id}.C{m}', 'modification-type': 'clarify', 'title': f'Control {m}'}
+                for m in range(modifications)
+            ],
+            'assessment-requirement-modifications': [
+                {
+                    'target-id': f'{reference_id}.A{m}',
+                    'modification-type': 'clarify',
+                    'text': f'Assessment requirement {m}',
+                    'recommendation': f'Recommendation {m}'
+                }
+                for m in range(modifications)
+            ],
+            'guideline-modifications': [
+                {
+                    'target-id': f'{reference_id}.G{m}',
+                    'modification-type': 'clarify',
+                    'title': f'Guideline {m}',
+                    'recommendations': [f'Review {reference_id}']
+                }
+                for m in range(modifications)
+            ]
+        }
+
+    return {
+        'title': 'Test policy',
+        'metadata': {'id': 'TEST', 'version': '1.0.0'},
+        'guidance-references': [mapping('guidance', i) for i in range(references)],
+        'control-references': [mapping('control', i) for i in range(references)]
+    }
+
+
+class IncrementalCompactTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def full_build(self, policy) -> str:
+        converter = gemara_to_ampel.GemaraToAmpelConverter(deterministic=True, compact=True)
+        converter.save_ampel_policy(converter.convert(policy), self.path('full.json'), quiet=True)
+        with open(self.path('full.json')) as f:
+            return f.read()
+
+    def test_incremental_matches_full_build(self):
+        converter = gemara_to_ampel.GemaraToAmpelConverter(deterministic=True, compact=True)
+        output = self.path('incremental.json')
+        policy = make_policy(3, 3)
+        _, entry, _ = gemara_to_ampel.compile_incremental(converter, policy, output, quiet=True)
+
+        # The shared blocks are first met in reused policies, which come back with sorted keys
+        changed = copy.deepcopy(policy)
+        changed['control-references'][1]['assessment-requirement-modifications'][0]['text'] = 'Changed'
+        _, _, regenerated = gemara_to_ampel.compile_incremental(converter, changed, output, entry, quiet=True)
+
+        self.assertEqual(regenerated, ['control/1/control-1'])
+        with open(output) as f:
+            self.assertEqual(f.read(), self.full_build(changed))
+
+
+if __name__ == '__main__':
+    unittest.main()
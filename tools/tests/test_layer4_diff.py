@@ -0,0 +1,48 @@
+"""Tests for ampel2gemara/layer4_diff.py."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from tool_modules import import_module  # noqa: E402
+
+layer4_diff = import_module('ampel2gemara.layer4_diff')
+
+BASE = [
+    (('sha256:s', 'p', 'a'), 'PASS'),
+    (('sha256:s', 'p', 'a'), 'FAIL'),
+    (('sha256:s', 'p', 'b'), 'PASS'),
+    (('sha256:s', 'p', 'c'), 'FAIL'),
+    (('sha256:s', 'p', 'c'), 'FAIL'),
+]
+HEAD = [
+    (('sha256:s', 'p', 'a'), 'FAIL'),
+    (('sha256:s', 'p', 'd'), 'FAIL'),
+    (('sha256:s', 'p', 'd'), 'PASS'),
+    (('sha256:s', 'p', 'a'), 'PASS'),
+    (('sha256:s', 'p', 'b'), 'PASS'),
+]
+
+
+class DiffFindingsTest(unittest.TestCase):
+
+    def diff(self, index_head: bool):
+        changes = []
+        counts = layer4_diff.diff_findings(iter(BASE), iter(HEAD), lambda *change: changes.append(change), index_head)
+        return sorted(changes), counts
+
+    def test_duplicates_do_not_depend_on_the_indexed_side(self):
+        changes, counts = self.diff(index_head=False)
+        self.assertEqual(changes, [
+            ('ADDED', ('sha256:s', 'p', 'd'), '', 'FAIL'),
+            ('REGRESSION', ('sha256:s', 'p', 'a'), 'PASS', 'FAIL'),
+            ('REMOVED', ('sha256:s', 'p', 'c'), 'FAIL', ''),
+        ])
+        self.assertEqual((counts['base_duplicates'], counts['head_duplicates']), (2, 2))
+        self.assertEqual(self.diff(index_head=True), (changes, counts))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Import helpers and shared defaults for the converter scripts.
+
+Every module is imported as part of the tools package: `gemara_ampel.tools`
+once installed, and in a checkout this directory registered under the name
+`gemara_ampel_tools`. sys.path is never changed, so modules such as
+`rollup` or `evaluation_store` do not become importable top-level names.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+
+TOOLS_DIR = Path(__file__).resolve().parent
+
+# Name of this directory's package when it is used from a checkout
+CHECKOUT_PACKAGE = 'gemara_ampel_tools'
+
+
+def package() -> str:
+    """Return the name of the tools package, registering the checkout directory on first use."""
+    if __package__:
+        return __package__
+    if CHECKOUT_PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            CHECKOUT_PACKAGE, TOOLS_DIR / '__init__.py', submodule_search_locations=[str(TOOLS_DIR)]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[CHECKOUT_PACKAGE] = module
+        spec.loader.exec_module(module)
+    return CHECKOUT_PACKAGE
+
+
+def import_module(name: str) -> ModuleType:
+    """Import a module of the tools package, e.g. 'schema_validation' or 'gemara2ampel.catalog_index'."""
+    return importlib.import_module(f'{package()}.{name}')
+
+
+def default_cache_dir(tool: str) -> str:
+    """Return the default cache directory of a tool: `$XDG_CACHE_HOME/<tool>`, usually `~/.cache/<tool>`."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, tool)
+
+
+def load_ampel_to_gemara() -> ModuleType:
+    """Return the ampel_to_gemara.py converter module."""
+    return import_module('ampel2gemara.ampel_to_gemara')
+
+
+def load_gemara_to_ampel() -> ModuleType:
+    """Return the gemara_to_ampel.py converter module."""
+    return import_module('gemara2ampel.gemara_to_ampel')